@@ -0,0 +1,55 @@
+"""Benchmark for the buffered, rotating activity log.
+
+Logs many entries in the format the GUI writes, then streams an export from
+the rotated files and reports entries/sec, export throughput and the size of
+the in-memory tail. Run from the repository root:
+
+    python -m benchmarks.activity_log --entries 1000000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from project import ActivityLog
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ActivityLog logging and export")
+    parser.add_argument('--entries', type=int, default=1000000, help="entries to log")
+    parser.add_argument('--max-file-mb', type=float, default=10, help="rotate files at this size")
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix='parking-activity-')
+    activity_log = ActivityLog(os.path.join(directory, 'logs'), max_files=None,
+                               max_file_bytes=int(args.max_file_mb * 1024 * 1024))
+    
+    started = time.perf_counter()
+    for i in range(args.entries):
+        activity_log.log(f"Vehicle ABC-{i % 10000:04d} exited from slot {i % 20 + 1}. "
+                         f"Duration: 3.0 min. Fee: $3.57")
+    logged = time.perf_counter() - started
+    activity_log.flush()
+    flushed = time.perf_counter() - started
+    
+    export_path = os.path.join(directory, 'export.txt')
+    started = time.perf_counter()
+    activity_log.export(export_path)
+    exported = time.perf_counter() - started
+    size = os.path.getsize(export_path)
+    
+    with open(export_path) as f:
+        lines = sum(1 for _ in f)
+    activity_log.close()
+    
+    print(f"Logged {args.entries:,} entries in {logged:.2f} s ({args.entries / logged:,.0f}/sec), "
+          f"on disk after {flushed:.2f} s in {len(activity_log.file_numbers())} files")
+    print(f"Exported {size / 1e6:,.1f} MB in {exported:.2f} s ({size / 1e6 / exported:,.0f} MB/s)")
+    print(f"In-memory tail: {len(activity_log.tail)} entries")
+    
+    if lines != args.entries:
+        print(f"Export has {lines} lines, expected {args.entries}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark for the ANPR pipeline.
+
+Feeds bursts of synthetic camera frames into an AnprPipeline that parks each
+vehicle as its plate is read, the way the GUI's entry camera does, with pools
+of worker threads and of worker processes. For each pool it reports frames
+read per second, latency from submit to plate, frames dropped by the bounded
+queue, plates read wrongly, and the longest a submit call took, which is how
+long a burst could hold up the Tk event loop. Run from the repository root:
+
+    python -m benchmarks.anpr_pipeline --frames 2000 --burst 40 --workers 1 2 --processes 2 4
+"""
+import os
+import time
+import random
+import argparse
+import threading
+
+from project import AnprPipeline, ParkingManagementSystem, SyntheticCamera
+
+def run(frames, plates, burst, interval, workers, processes, max_pending):
+    """Submit the frames in bursts; returns (pipeline statistics, misread plates, parked, longest submit)"""
+    system = ParkingManagementSystem(total_slots=len(frames), rng=random.Random(1))
+    lock = threading.Lock()
+    misread = [0]
+    
+    def on_result(license_plate, expected, latency):
+        if license_plate != expected:
+            with lock:
+                misread[0] += 1
+        if license_plate is not None:
+            system.vehicle_entry(license_plate)
+    
+    pipeline = AnprPipeline(on_result, workers=workers, max_pending=max_pending, processes=processes)
+    longest = 0.0
+    for start in range(0, len(frames), burst):
+        for frame, license_plate in zip(frames[start:start + burst], plates[start:start + burst]):
+            submitted = time.perf_counter()
+            pipeline.submit(frame, license_plate)
+            longest = max(longest, time.perf_counter() - submitted)
+        time.sleep(interval)
+    pipeline.wait()
+    statistics = pipeline.statistics()
+    pipeline.close()
+    return statistics, misread[0], system.get_statistics()['current_occupancy'], longest
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ANPR pipeline")
+    parser.add_argument('--frames', type=int, default=2000, help="camera frames")
+    parser.add_argument('--burst', type=int, default=40, help="frames arriving together")
+    parser.add_argument('--interval', type=float, default=0.2, help="seconds between bursts")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2], help="worker thread pools to run")
+    parser.add_argument('--processes', type=int, nargs='+', default=[2], help="worker process pools to run")
+    parser.add_argument('--max-pending', type=int, default=64, help="frames the queue holds before dropping")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    camera = SyntheticCamera(rng=rng)
+    generator = ParkingManagementSystem(rng=rng)
+    plates = [generator.generate_license_plate() for _ in range(args.frames)]
+    started = time.perf_counter()
+    frames = [camera.capture(license_plate) for license_plate in plates]
+    elapsed = time.perf_counter() - started
+    print(f"{args.frames:,} frames of {camera.size[0]}x{camera.size[1]} in bursts of {args.burst} every "
+          f"{args.interval:g} s, {os.cpu_count()} CPUs; {args.frames / elapsed:,.0f} frames/s generated")
+    print(f"{'Pool':<12} {'Frames/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Dropped':>8} {'Misread':>8} "
+          f"{'Parked':>7} {'Longest submit (ms)':>20}")
+    
+    pools = [(f"{workers} threads", workers, 0) for workers in args.workers]
+    pools += [(f"{processes} processes", processes, processes) for processes in args.processes]
+    for label, workers, processes in pools:
+        statistics, misread, parked, longest = run(frames, plates, args.burst, args.interval,
+                                                   workers, processes, args.max_pending)
+        print(f"{label:<12} {statistics['throughput']:>9,.0f} {statistics['latency_p50'] * 1000:>9.1f} "
+              f"{statistics['latency_p99'] * 1000:>9.1f} {statistics['dropped']:>8,} {misread:>8,} "
+              f"{parked:>7,} {longest * 1000:>20.3f}")
+
+if __name__ == "__main__":
+    main()
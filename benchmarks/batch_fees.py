@@ -0,0 +1,51 @@
+"""Benchmark batch fee computation against per-vehicle calculate_fee.
+
+Run from the repository root:  python -m benchmarks.batch_fees [sessions]
+"""
+import sys
+import time
+import random
+
+import billing
+from project import ParkingManagementSystem, VEHICLE_TYPES
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    rng = random.Random(42)
+    
+    entry_times = [1745670000 + rng.uniform(0, 86400) for _ in range(count)]
+    exit_times = [entry_time + rng.randint(20, 7200) for entry_time in entry_times]
+    type_codes = [rng.randrange(len(VEHICLE_TYPES)) for _ in range(count)]
+    type_names = [VEHICLE_TYPES[code] for code in type_codes]
+    
+    if billing.np is not None:
+        entry_times = billing.np.asarray(entry_times)
+        exit_times = billing.np.asarray(exit_times)
+        type_codes = billing.np.asarray(type_codes)
+    
+    system = ParkingManagementSystem()
+    started = time.perf_counter()
+    expected = [system.calculate_fee(exit_time - entry_time, vehicle_type)
+                for entry_time, exit_time, vehicle_type in zip(entry_times, exit_times, type_names)]
+    sequential = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    fees = billing.calculate_fees(exit_times - entry_times if billing.np is not None else
+                                  [b - a for a, b in zip(entry_times, exit_times)], type_codes)
+    batch = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    report = billing.revenue_report(entry_times, exit_times, type_codes)
+    reporting = time.perf_counter() - started
+    
+    mismatches = sum(1 for a, b in zip(expected, list(fees)) if a != b)
+    
+    print(f"Sessions: {count} ({'NumPy' if billing.np is not None else 'pure Python'})")
+    print(f"calculate_fee loop:  {sequential:8.3f} s")
+    print(f"calculate_fees:      {batch:8.3f} s")
+    print(f"revenue_report:      {reporting:8.3f} s")
+    print(f"Fee mismatches:      {mismatches}")
+    print(f"Total revenue:       ${report['total_revenue']:.2f}")
+
+if __name__ == "__main__":
+    main()
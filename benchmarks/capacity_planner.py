@@ -0,0 +1,47 @@
+"""Benchmark for the Monte Carlo capacity planner.
+
+Runs the same set of replications with a growing number of worker processes
+and reports replications per second and the speedup over one worker, which
+should stay close to the worker count up to the number of cores. Every run
+must produce the same results, whatever the number of workers. Run from the
+repository root:
+
+    python -m benchmarks.capacity_planner --replications 400 --workers 1 2 4 8
+"""
+import os
+import time
+import argparse
+
+from capacity_planner import plan
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the capacity planner's process pool")
+    parser.add_argument('--replications', type=int, default=200, help="replications per scenario")
+    parser.add_argument('--hours', type=float, default=0.5, help="simulated hours per replication")
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help="worker counts to run (default: 1, 2, 4, ... up to the number of cores)")
+    args = parser.parse_args()
+    
+    cores = os.cpu_count()
+    workers = args.workers or [1 << n for n in range(cores.bit_length()) if 1 << n <= cores]
+    scenarios = [(20, 4.0, 'uniform:20:120'), (30, 2.0, 'exponential:70')]
+    total = len(scenarios) * args.replications
+    print(f"{total:,} replications of {args.hours:g} h, {cores} cores")
+    
+    baseline = None
+    expected = None
+    for count in workers:
+        started = time.perf_counter()
+        summaries = plan(scenarios, args.replications, args.hours * 3600, queue_limit=10, workers=count)
+        elapsed = time.perf_counter() - started
+        
+        baseline = baseline or elapsed * count / workers[0]
+        print(f"{count:>3} workers: {total / elapsed:8.1f} replications/s, speedup {baseline / elapsed:5.2f}x")
+        
+        if expected is None:
+            expected = summaries
+        elif summaries != expected:
+            raise SystemExit(f"Results with {count} workers differ from those with {workers[0]}")
+
+if __name__ == "__main__":
+    main()
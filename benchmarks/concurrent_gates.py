@@ -0,0 +1,135 @@
+"""Multithreaded stress benchmark for concurrent entry and exit gates.
+
+Runs N entry-gate and N exit-gate threads against one ParkingManagementSystem,
+reports throughput per gate count and checks that no slot was ever handed to
+two vehicles at once. Run from the repository root:
+
+    python -m benchmarks.concurrent_gates --slots 1000 --gates 1 2 4 8
+"""
+import sys
+import time
+import random
+import argparse
+import threading
+
+from project import ParkingManagementSystem
+
+def entry_gate(system, gate, stop, counts):
+    """Keep admitting new vehicles until stopped"""
+    n = 0
+    while not stop.is_set():
+        # Back off while the queue is longer than the lot so memory stays bounded
+        if len(system.entry_queue) > system.total_slots:
+            time.sleep(0)
+            continue
+        system.vehicle_entry(f"G{gate:02d}-{n:08d}")
+        n += 1
+    counts[('entry', gate)] = n
+
+def exit_gate(system, gate, stop, counts, seed):
+    """Keep exiting random parked vehicles (every tenth through the exit stack) until stopped"""
+    rng = random.Random(seed + gate)
+    n = 0
+    while not stop.is_set():
+        license_plate = system.slot_vehicles.get(rng.randrange(system.total_slots))
+        if license_plate is None:
+            continue
+        if n % 10 == 0:
+            if system.add_to_exit_stack(license_plate) and system.process_exit_stack():
+                n += 1
+        elif system.vehicle_exit(license_plate):
+            n += 1
+    counts[('exit', gate)] = n
+
+def check_invariants(system):
+    """Return a list of consistency problems (an empty list means the lot is consistent)"""
+    problems = []
+    records = dict(system.vehicle_records)
+    occupied = [slot for slot, taken in enumerate(system.slot_status) if taken]
+    
+    if len(occupied) != system.slot_allocator.occupied_count:
+        problems.append("occupied_count does not match slot_status")
+    if len(records) != len(occupied) or len(system.slot_vehicles) != len(occupied):
+        problems.append("active records, slot index and occupied slots disagree")
+    
+    slots = [record.slot for record in records.values()]
+    if len(set(slots)) != len(slots):
+        problems.append("a slot is held by more than one active vehicle")
+    for license_plate, record in records.items():
+        if system.slot_vehicles.get(record.slot) != license_plate:
+            problems.append(f"slot index out of sync for {license_plate}")
+            break
+    
+    free_slots = system.slot_allocator.free_slots
+    if len(set(free_slots)) != len(free_slots) or set(free_slots) & set(occupied):
+        problems.append("free list contains duplicate or occupied slots")
+    if len(free_slots) + len(occupied) != system.total_slots:
+        problems.append("free and occupied slots do not cover the lot")
+    
+    # Sessions that used the same slot must not overlap in time
+    sessions_by_slot = {}
+    for session in system.history:
+        sessions_by_slot.setdefault(session['slot'], []).append(session)
+    for license_plate, record in records.items():
+        sessions_by_slot.setdefault(record.slot, []).append({'entry_time': record.entry_time,
+                                                             'exit_time': float('inf')})
+    for slot, sessions in sessions_by_slot.items():
+        sessions.sort(key=lambda session: session['entry_time'])
+        for earlier, later in zip(sessions, sessions[1:]):
+            if earlier['exit_time'] > later['entry_time']:
+                problems.append(f"slot {slot + 1} was double-allocated")
+                break
+    
+    stats = system.get_statistics()
+    if stats['total_exits'] != len(system.history):
+        problems.append("exit count does not match history")
+    if stats['total_entries'] - stats['total_exits'] != len(records):
+        problems.append("entry and exit counts do not match parked vehicles")
+    return problems
+
+def run(total_slots, gates, duration, seed):
+    """Run one configuration and return (operations per second, problems)"""
+    system = ParkingManagementSystem(total_slots=total_slots, clock=time.monotonic,
+                                     rng=random.Random(seed))
+    stop = threading.Event()
+    counts = {}
+    threads = [threading.Thread(target=entry_gate, args=(system, gate, stop, counts))
+               for gate in range(gates)]
+    threads += [threading.Thread(target=exit_gate, args=(system, gate, stop, counts, seed))
+                for gate in range(gates)]
+    
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    return sum(counts.values()) / elapsed, check_invariants(system)
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress ParkingManagementSystem with concurrent gates")
+    parser.add_argument('--slots', type=int, default=1000, help="number of parking slots")
+    parser.add_argument('--gates', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="entry/exit gate pairs to run concurrently")
+    parser.add_argument('--duration', type=float, default=2.0, help="seconds per configuration")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    print(f"{'Gates':>5}  {'Ops/sec':>10}  {'Scaling':>7}  Consistency")
+    baseline = None
+    failed = False
+    for gates in args.gates:
+        ops_per_sec, problems = run(args.slots, gates, args.duration, args.seed)
+        baseline = baseline or ops_per_sec
+        status = 'OK' if not problems else '; '.join(problems)
+        failed = failed or bool(problems)
+        print(f"{gates:>5}  {ops_per_sec:>10,.0f}  {ops_per_sec / baseline:>6.2f}x  {status}")
+    
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Benchmark suite for the ParkingManagementSystem core operations.
+
+Sweeps lot sizes and history sizes and records ops/sec, p50/p99 latency and peak
+memory for each operation as JSON. Run from the repository root:
+
+    python -m benchmarks.core_ops --output bench.json
+    python -m benchmarks.core_ops --compare bench.json
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+
+from project import ParkingManagementSystem, VEHICLE_TYPES
+from simulation import SimulationClock
+
+DEFAULT_SLOTS = [20, 100, 1000, 10000, 100000]
+DEFAULT_HISTORY = [0, 10000, 100000]
+
+def build_system(total_slots, history_size, occupancy, seed):
+    """Create a lot with history_size completed sessions and the given occupancy"""
+    rng = random.Random(seed)
+    clock = SimulationClock()
+    system = ParkingManagementSystem(total_slots=total_slots, clock=clock, rng=rng)
+    
+    # Completed sessions, one after another through the same slot
+    for i in range(history_size):
+        license_plate = f"HIS-{i:07d}"
+        system.vehicle_entry(license_plate)
+        clock.advance_to(clock.now + rng.randint(20, 120))
+        system.vehicle_exit(license_plate)
+    
+    # Parked vehicles
+    for i in range(int(total_slots * occupancy)):
+        system.vehicle_entry(f"ACT-{i:07d}")
+    
+    return system, clock
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+def time_calls(func, args_list, time_budget):
+    """Call func once per args tuple (until the budget runs out) and return latencies in ns"""
+    latencies = []
+    deadline = time.perf_counter() + time_budget
+    for args in args_list:
+        start = time.perf_counter_ns()
+        func(*args)
+        latencies.append(time.perf_counter_ns() - start)
+        if time.perf_counter() > deadline:
+            break
+    return latencies
+
+def summarize(latencies):
+    """ops/sec and latency percentiles for a list of latencies in ns"""
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'iterations': len(latencies),
+        'ops_per_sec': len(latencies) / (total / 1e9) if total else float('inf'),
+        'p50_us': percentile(latencies, 0.50) / 1000,
+        'p99_us': percentile(latencies, 0.99) / 1000
+    }
+
+def bench_config(total_slots, history_size, iterations, occupancy, seed, time_budget):
+    """Benchmark every core operation for one lot/history size"""
+    tracemalloc.start()
+    system, clock = build_system(total_slots, history_size, occupancy, seed)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    free_slots = system.slot_allocator.free_count()
+    count = max(1, min(iterations, free_slots))
+    plates = [(f"BEN-{i:07d}",) for i in range(count)]
+    rng = random.Random(seed)
+    
+    results = {}
+    results['vehicle_entry'] = time_calls(system.vehicle_entry, plates, time_budget)
+    entered = plates[:len(results['vehicle_entry'])]
+    clock.advance_to(clock.now + 60)
+    results['vehicle_exit'] = time_calls(system.vehicle_exit, entered, time_budget)
+    
+    # Exit whatever the time budget did not cover so the lot is back at its base occupancy
+    for (license_plate,) in entered[len(results['vehicle_exit']):]:
+        system.vehicle_exit(license_plate)
+    
+    results['get_parking_status'] = time_calls(system.get_parking_status, [()] * iterations, time_budget)
+    results['check_vehicles_to_exit'] = time_calls(system.check_vehicles_to_exit, [()] * iterations,
+                                                   time_budget)
+    results['get_statistics'] = time_calls(system.get_statistics, [()] * iterations, time_budget)
+    
+    fee_args = [(rng.uniform(20, 7200), rng.choice(VEHICLE_TYPES))
+                for _ in range(iterations)]
+    results['calculate_fee'] = time_calls(system.calculate_fee, fee_args, time_budget)
+    
+    rows = []
+    for operation, latencies in results.items():
+        row = {
+            'slots': total_slots,
+            'history': history_size,
+            'operation': operation,
+            'peak_memory_bytes': peak_memory
+        }
+        row.update(summarize(latencies))
+        rows.append(row)
+    return rows
+
+def compare(current, baseline, threshold):
+    """Print ops/sec ratios against a baseline run and return the number of regressions"""
+    key = lambda row: (row['slots'], row['history'], row['operation'])
+    baseline_rows = {key(row): row for row in baseline['results']}
+    regressions = 0
+    
+    for row in current['results']:
+        old = baseline_rows.get(key(row))
+        if old is None:
+            continue
+        ratio = row['ops_per_sec'] / old['ops_per_sec']
+        flag = ''
+        if ratio < 1 - threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{row['operation']:<24}{row['slots']:>8}{row['history']:>8}  {ratio:6.2f}x{flag}",
+              file=sys.stderr)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ParkingManagementSystem core operations")
+    parser.add_argument('--slots', type=int, nargs='+', default=DEFAULT_SLOTS, help="lot sizes to sweep")
+    parser.add_argument('--history', type=int, nargs='+', default=DEFAULT_HISTORY,
+                        help="completed-session counts to sweep")
+    parser.add_argument('--iterations', type=int, default=1000, help="calls per operation")
+    parser.add_argument('--occupancy', type=float, default=0.5, help="fraction of slots occupied")
+    parser.add_argument('--time-budget', type=float, default=2.0, help="max seconds per operation")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    parser.add_argument('--output', help="write JSON results to this file instead of stdout")
+    parser.add_argument('--compare', help="baseline JSON file to compare ops/sec against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="slowdown fraction reported as a regression by --compare")
+    args = parser.parse_args()
+    
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'iterations': args.iterations,
+            'occupancy': args.occupancy
+        },
+        'results': []
+    }
+    
+    for total_slots in args.slots:
+        for history_size in args.history:
+            print(f"Benchmarking {total_slots} slots, {history_size} history...", file=sys.stderr)
+            report['results'].extend(bench_config(total_slots, history_size, args.iterations,
+                                                  args.occupancy, args.seed, args.time_budget))
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark for the multi-lot federation.
+
+Runs the same stream of entries and exits through one ParkingManagementSystem
+and through a ParkingFederation of lots in worker processes, with the same
+total number of slots, for each shard count. Operations go to the federation
+in batches, so shard processes work side by side; throughput grows with the
+shard count up to the number of cores. Run from the repository root:
+
+    python -m benchmarks.federation --slots 20000 --operations 200000 --shards 1 2 4 8
+"""
+import os
+import time
+import random
+import argparse
+
+from project import ParkingManagementSystem
+from federation import ParkingFederation, ProcessShard
+
+def workload(slots, operations, seed):
+    """Entries and exits keeping the lot about 80% full, as ('entry', plate) and ('exit', plate)"""
+    rng = random.Random(seed)
+    parked = []
+    stream = []
+    for n in range(operations):
+        if parked and (len(parked) >= 0.8 * slots or rng.random() < 0.5):
+            license_plate = parked.pop(rng.randrange(len(parked)))
+            stream.append(('exit', license_plate))
+        else:
+            license_plate = f"F{n:08d}"
+            parked.append(license_plate)
+            stream.append(('entry', license_plate))
+    return stream
+
+def run_single(slots, stream):
+    system = ParkingManagementSystem(total_slots=slots, rng=random.Random(1))
+    started = time.perf_counter()
+    for kind, license_plate in stream:
+        if kind == 'entry':
+            system.vehicle_entry(license_plate)
+        else:
+            system.vehicle_exit(license_plate)
+    return time.perf_counter() - started, system.get_statistics()
+
+def run_federation(slots, stream, shards, batch_size):
+    federation = ParkingFederation([ProcessShard(f"lot-{n}", total_slots=slots // shards)
+                                    for n in range(shards)])
+    operations = [('entry', license_plate, 'regular', None) if kind == 'entry' else ('exit', license_plate)
+                  for kind, license_plate in stream]
+    started = time.perf_counter()
+    for start in range(0, len(operations), batch_size):
+        federation.run_batch(operations[start:start + batch_size])
+    elapsed = time.perf_counter() - started
+    
+    # Reading the totals doesn't ask the shards
+    read_started = time.perf_counter()
+    statistics = federation.get_statistics()
+    read = time.perf_counter() - read_started
+    federation.close()
+    return elapsed, statistics, read
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the multi-lot federation")
+    parser.add_argument('--slots', type=int, default=20000, help="total parking slots over all shards")
+    parser.add_argument('--operations', type=int, default=200000, help="entries and exits")
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4], help="shard counts to run")
+    parser.add_argument('--batch-size', type=int, default=2000, help="operations per federation batch")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    stream = workload(args.slots, args.operations, args.seed)
+    print(f"{args.operations:,} operations, {args.slots:,} slots, {os.cpu_count()} CPUs")
+    
+    elapsed, expected = run_single(args.slots, stream)
+    print(f"Single lot      {args.operations / elapsed:>10,.0f} ops/s")
+    
+    for shards in args.shards:
+        elapsed, statistics, read = run_federation(args.slots, stream, shards, args.batch_size)
+        print(f"{shards:>2} shard processes {args.operations / elapsed:>10,.0f} ops/s "
+              f"({read * 1e6:.1f} us to read the totals)")
+        
+        # Every vehicle parks (the lot never fills), so the totals match the single lot
+        for key in ('total_entries', 'total_exits', 'current_occupancy'):
+            if statistics[key] != expected[key]:
+                raise SystemExit(f"Federation reports {key} = {statistics[key]}, single lot {expected[key]}")
+
+if __name__ == "__main__":
+    main()
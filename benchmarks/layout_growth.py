@@ -0,0 +1,72 @@
+"""Benchmark for changing a lot's capacity.
+
+Grows a partly occupied lot by one level (a zone of rows x columns), adds and
+removes slots at the end and closes a slot, each applied incrementally to the
+layout, its graph and the nearest-slot distances. Each change is compared with
+laying the whole lot out again and recomputing every distance, and the
+incremental distances must match the recomputed ones. Run from the repository
+root:
+
+    python -m benchmarks.layout_growth --slots 20000 --level 20 50
+"""
+import time
+import random
+import argparse
+
+from project import ParkingManagementSystem, ParkingLayout
+
+def rebuild(system):
+    """Seconds to lay the lot out from scratch and recompute the allocator's distances and heaps"""
+    allocator = system.slot_allocator
+    started = time.perf_counter()
+    layout = ParkingLayout()
+    layout.load(system.layout.zone_shapes())
+    allocator.parking_graph = layout.graph
+    for route in allocator.routes:
+        allocator.build_route(route)
+    elapsed = time.perf_counter() - started
+    allocator.parking_graph = system.parking_graph
+    return elapsed
+
+def timed(change, *args):
+    started = time.perf_counter()
+    change(*args)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental layout changes")
+    parser.add_argument('--slots', type=int, default=20000, help="number of parking slots")
+    parser.add_argument('--level', type=int, nargs=2, default=[20, 50], metavar=('ROWS', 'COLS'),
+                        help="shape of the level added")
+    parser.add_argument('--occupancy', type=float, default=0.7, help="share of slots occupied")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    system = ParkingManagementSystem(total_slots=args.slots, entry_nodes=[0], rng=rng,
+                                     destinations={'exit': [args.slots - 1]})
+    allocator = system.slot_allocator
+    for _ in range(int(args.slots * args.occupancy)):
+        allocator.allocate(rng.choice((None, 'exit')))
+    rows, cols = args.level
+    
+    changes = [
+        (f"Add a {rows}x{cols} level", system.add_zone, (rows, cols)),
+        ("Add 100 slots", system.add_slots, (100,)),
+        ("Remove 100 slots", system.remove_slots, (100,)),
+        ("Remove the level", system.remove_slots, (rows * cols,)),
+        ("Close a slot", system.close_slot, (args.slots // 2,)),
+    ]
+    print(f"Slots: {args.slots:,}, {len(system.layout.zones)} zones")
+    for label, change, change_args in changes:
+        incremental = timed(change, *change_args)
+        
+        for route, nodes in allocator.routes.items():
+            if allocator.distances[route] != allocator.route_distances(nodes):
+                raise SystemExit(f"{label}: incremental distances differ from a full recomputation")
+        
+        full = rebuild(system)
+        print(f"{label:<22} incremental {incremental * 1000:8.2f} ms, full rebuild {full * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark for the parking log parser and index.
+
+Writes synthetic parking_logs_*.txt exports in the GUI's format, builds the
+index with parallel parsers, and times plate, revenue and utilization queries
+against the index and against rescanning every file line by line. Run from the
+repository root:
+
+    python -m benchmarks.log_index --files 8 --sessions 250000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from log_index import build_index, LogIndex, parse_time
+
+def write_logs(directory, files, sessions, slots, seed):
+    """Write files of simulated sessions; returns the paths and a plate that appears in them"""
+    rng = random.Random(seed)
+    paths = []
+    clock = parse_time('2025-04-26 08:00')
+    for file_number in range(files):
+        path = os.path.join(directory, f"parking_logs_{file_number:04d}.txt")
+        free = list(range(slots))
+        parked = {}
+        lines = []
+        for n in range(sessions):
+            clock += rng.uniform(0, 20)
+            stamp = time.strftime('[%Y-%m-%d %H:%M:%S]', time.localtime(clock))
+            if free and (not parked or rng.random() < 0.5):
+                plate = f"{rng.choice('ABCDEFGH')}{rng.choice('KLMNPRST')}X-{rng.randrange(10000):04d}"
+                if plate in parked:
+                    continue
+                slot = free.pop(rng.randrange(len(free)))
+                parked[plate] = (slot, clock)
+                lines.append(f"{stamp} Vehicle {plate} entered and parked in slot {slot + 1}.\n")
+            elif parked:
+                plate = rng.choice(list(parked)) if len(parked) < 64 else next(iter(parked))
+                slot, entry_time = parked.pop(plate)
+                free.append(slot)
+                duration = (clock - entry_time) / 60
+                fee = max(1.0, round(duration / 60 * 2.5, 2))
+                lines.append(f"{stamp} Vehicle {plate} exited from slot {slot + 1}. "
+                             f"Duration: {duration:.1f} min. Fee: ${fee:.2f}\n")
+        with open(path, 'w') as f:
+            f.writelines(lines)
+        paths.append(path)
+    return paths, plate
+
+def scan_logs(paths, plate, start, end):
+    """Answer the plate and revenue queries by reading every line"""
+    sessions = 0
+    revenue = 0.0
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if ' exited' not in line:
+                    continue
+                exit_time = parse_time(line[1:20])
+                if f"Vehicle {plate} " in line:
+                    sessions += 1
+                if start <= exit_time < end:
+                    revenue += float(line.rsplit('$', 1)[1])
+    return sessions, revenue
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parking log index")
+    parser.add_argument('--files', type=int, default=8, help="log files to generate")
+    parser.add_argument('--sessions', type=int, default=250000, help="log lines per file")
+    parser.add_argument('--slots', type=int, default=200, help="slots in the simulated lot")
+    parser.add_argument('--workers', type=int, help="parser processes (default: one per CPU)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix='parking-logs-')
+    paths, plate = write_logs(directory, args.files, args.sessions, args.slots, args.seed)
+    size = sum(os.path.getsize(path) for path in paths)
+    index_path = os.path.join(directory, 'parking_logs.idx')
+    
+    started = time.perf_counter()
+    build_index(paths, index_path, workers=1)
+    serial = time.perf_counter() - started
+    os.remove(index_path)
+    started = time.perf_counter()
+    build_index(paths, index_path, workers=args.workers)
+    parallel = time.perf_counter() - started
+    started = time.perf_counter()
+    build_index(paths, index_path, workers=args.workers)
+    unchanged = time.perf_counter() - started
+    print(f"Logs: {args.files} files, {size / 1e6:,.1f} MB")
+    print(f"Build: {serial:.2f} s with 1 process ({size / 1e6 / serial:,.0f} MB/s), "
+          f"{parallel:.2f} s in parallel ({size / 1e6 / parallel:,.0f} MB/s), "
+          f"{unchanged:.2f} s when no file changed")
+    
+    started = time.perf_counter()
+    index = LogIndex(index_path)
+    opened = time.perf_counter() - started
+    start = index.exit_times[0] + 3600
+    end = start + 4 * 3600
+    
+    started = time.perf_counter()
+    sessions = index.sessions_for(plate)
+    revenue = index.revenue(start, end)
+    utilization = index.slot_utilization(start, end)
+    queried = time.perf_counter() - started
+    print(f"Index: {len(index):,} sessions, opened in {opened * 1000:.1f} ms; plate, revenue and "
+          f"utilization queries in {queried * 1000:.1f} ms ({len(utilization)} hours)")
+    
+    started = time.perf_counter()
+    expected = scan_logs(paths, plate, start, end)
+    scanned = time.perf_counter() - started
+    print(f"Rescanning the logs for plate and revenue: {scanned:.2f} s")
+    index.close()
+    
+    if (len(sessions), round(revenue, 2)) != (expected[0], round(expected[1], 2)):
+        raise SystemExit(f"Index answers {len(sessions)}, {revenue:.2f}; "
+                         f"rescan answers {expected[0]}, {expected[1]:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark for nearest-slot assignment.
+
+Fills a large lot to a target occupancy, then churns it with random exits and
+entries. Each entry gets the free slot nearest to the entry gate, once from
+NearestSlotAllocator's precomputed distances and once by a breadth-first
+search from the gate per vehicle, and the two must agree on the distance. Run
+from the repository root:
+
+    python -m benchmarks.nearest_slot --slots 50000 --operations 2000
+"""
+import time
+import random
+import argparse
+
+from project import ParkingManagementSystem
+
+def search_nearest(parking_graph, slot_status, gate):
+    """Distance of the free slot nearest to gate by searching outwards from it"""
+    seen = {gate}
+    frontier = [gate]
+    distance = 0
+    while frontier:
+        for node in frontier:
+            if not slot_status[node]:
+                return distance
+        next_frontier = []
+        for node in frontier:
+            for neighbor in parking_graph[node]:
+                if neighbor < len(slot_status) and neighbor not in seen:
+                    seen.add(neighbor)
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+        distance += 1
+    return None
+
+def percentile(values, q):
+    return sorted(values)[int(q * (len(values) - 1))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark nearest-slot assignment")
+    parser.add_argument('--slots', type=int, default=50000, help="number of parking slots")
+    parser.add_argument('--occupancy', type=float, default=0.9, help="share of slots filled before churning")
+    parser.add_argument('--operations', type=int, default=2000, help="exit and entry pairs to time")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    system = ParkingManagementSystem(total_slots=args.slots, entry_nodes=[0], rng=random.Random(args.seed))
+    allocator = system.slot_allocator
+    print(f"Slots: {args.slots:,}, distances computed in {(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    rng = random.Random(args.seed)
+    parked = [allocator.allocate() for _ in range(int(args.slots * args.occupancy))]
+    gate_distances = allocator.distances[None]
+    
+    assigned = []
+    searched = []
+    for _ in range(args.operations):
+        slot = parked.pop(rng.randrange(len(parked)))
+        allocator.release(slot)
+        
+        started = time.perf_counter()
+        expected = search_nearest(system.parking_graph, allocator.slot_status, 0)
+        searched.append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        slot = allocator.allocate()
+        assigned.append(time.perf_counter() - started)
+        parked.append(slot)
+        
+        if gate_distances[slot] != expected:
+            raise SystemExit(f"Allocator chose a slot {gate_distances[slot]} hops from the gate; "
+                             f"the nearest free slot is {expected} hops away")
+    
+    for label, times in (("Precomputed", assigned), ("Search per vehicle", searched)):
+        print(f"{label:<19} p50 {percentile(times, 0.5) * 1e6:>9.1f} us, "
+              f"p99 {percentile(times, 0.99) * 1e6:>9.1f} us, max {max(times) * 1e6:>10.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Before/after memory benchmark for vehicle records.
+
+Run from the repository root:  python -m benchmarks.record_memory [count]
+"""
+import sys
+import time
+import random
+import tracemalloc
+
+from project import VehicleRecord, VEHICLE_TYPES, VEHICLE_COLORS
+
+def make_dict_record(slot, entry_time, expected_stay, vehicle_type, color):
+    """Six-key dict record, the layout used before VehicleRecord"""
+    return {
+        'slot': slot,
+        'entry_time': entry_time,
+        'exit_time': None,
+        'expected_stay': expected_stay,
+        'vehicle_type': vehicle_type,
+        'color': color
+    }
+
+def measure(factory, count, seed=42):
+    """Return bytes allocated to hold count records built by factory"""
+    random.seed(seed)
+    now = time.time()
+    rows = [(i, now + i, random.randint(20, 120), random.choice(VEHICLE_TYPES), random.choice(VEHICLE_COLORS))
+            for i in range(count)]
+    
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    records = {f"PLT-{i:07d}": factory(*row) for i, row in enumerate(rows)}
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    
+    used = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del records
+    return used
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    
+    dict_bytes = measure(make_dict_record, count)
+    slots_bytes = measure(VehicleRecord, count)
+    
+    print(f"Records: {count}")
+    print(f"dict records:          {dict_bytes / 1e6:8.2f} MB ({dict_bytes / count:6.1f} B/record)")
+    print(f"VehicleRecord records: {slots_bytes / 1e6:8.2f} MB ({slots_bytes / count:6.1f} B/record)")
+    print(f"Reduction:             {100 * (1 - slots_bytes / dict_bytes):8.1f} %")
+
+if __name__ == "__main__":
+    main()
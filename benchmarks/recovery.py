@@ -0,0 +1,90 @@
+"""Crash-recovery benchmark for the write-ahead event log and snapshots.
+
+Logs a long run of entries and exits, stops without a clean shutdown and times
+how long a new ParkingManagementSystem takes to recover from the data
+directory (until it accepts operations, and until older history has loaded),
+with periodic snapshots and from the log alone. Run from the
+repository root:
+
+    python -m benchmarks.recovery --events 1000000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from project import ParkingManagementSystem
+from simulation import SimulationClock
+
+def run_workload(system, clock, events, seed):
+    """Drive entries and exits until about `events` state changes were made; returns ops/sec"""
+    rng = random.Random(seed)
+    parked = []
+    n = 0
+    started = time.perf_counter()
+    for _ in range(events):
+        clock.advance_to(clock.now + rng.uniform(0, 5))
+        # Keep the lot around half full
+        if parked and (len(parked) > system.total_slots // 2 or rng.random() < 0.5):
+            system.vehicle_exit(parked.pop(rng.randrange(len(parked))))
+        else:
+            license_plate = f"REC-{n:08d}"
+            n += 1
+            if system.vehicle_entry(license_plate) is not None:
+                parked.append(license_plate)
+    return events / (time.perf_counter() - started)
+
+def simulate_crash(system):
+    """Stop the group commit thread without the snapshot a clean close() would take"""
+    system.event_log.stopping.set()
+    system.event_log.flusher.join()
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def bench(total_slots, events, snapshot_every, seed):
+    """Return (ops/sec while logging, seconds until ready, seconds until history loaded, bytes on disk)"""
+    data_dir = tempfile.mkdtemp(prefix='parking-recovery-')
+    clock = SimulationClock()
+    system = ParkingManagementSystem(total_slots=total_slots, clock=clock, rng=random.Random(seed),
+                                     data_dir=data_dir, snapshot_every=snapshot_every)
+    ops_per_sec = run_workload(system, clock, events, seed)
+    simulate_crash(system)
+    expected = system.get_statistics(), len(system.history)
+    
+    started = time.perf_counter()
+    recovered = ParkingManagementSystem(total_slots=total_slots, data_dir=data_dir,
+                                        snapshot_every=snapshot_every)
+    ready = time.perf_counter() - started
+    # Completed sessions from before the snapshot keep loading in the background
+    recovered.history.loaded.wait()
+    loaded = time.perf_counter() - started
+    size = directory_size(data_dir)
+    
+    if (recovered.get_statistics(), len(recovered.history)) != expected:
+        raise SystemExit("Recovered state does not match the crashed system")
+    recovered.close()
+    return ops_per_sec, ready, loaded, size
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark crash recovery from the event log")
+    parser.add_argument('--slots', type=int, default=1000, help="number of parking slots")
+    parser.add_argument('--events', type=int, default=1000000, help="entries and exits to log")
+    parser.add_argument('--snapshot-every', type=int, default=50000, help="events between snapshots")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    clock = SimulationClock()
+    baseline = run_workload(ParkingManagementSystem(total_slots=args.slots, clock=clock,
+                                                    rng=random.Random(args.seed)),
+                            clock, args.events, args.seed)
+    print(f"In memory only:        {baseline:>10,.0f} ops/sec")
+    
+    for label, snapshot_every in (("With snapshots:", args.snapshot_every), ("Log replay only:", args.events * 10)):
+        ops_per_sec, ready, loaded, size = bench(args.slots, args.events, snapshot_every, args.seed)
+        print(f"{label:<22} {ops_per_sec:>10,.0f} ops/sec, ready after {ready * 1000:,.0f} ms, "
+              f"history loaded after {loaded * 1000:,.0f} ms, {size / 1e6:,.1f} MB on disk")
+
+if __name__ == "__main__":
+    main()
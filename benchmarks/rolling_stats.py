@@ -0,0 +1,81 @@
+"""Benchmark for the time-windowed statistics.
+
+Feeds growing volumes of simulated traffic into RollingStatistics and times
+reading the 5 minute, hour and day windows against computing the same day
+window by scanning the completed sessions. Run from the repository root:
+
+    python -m benchmarks.rolling_stats --sessions 10000 100000 1000000
+"""
+import time
+import random
+import argparse
+
+from project import RollingStatistics
+
+DAY = 86400
+
+def feed(sessions, slots, seed):
+    """Record sessions spread over two simulated days; returns the statistics, the sessions and the end time"""
+    rng = random.Random(seed)
+    now = 0.0
+    statistics = RollingStatistics(now)
+    gap = 2 * DAY / sessions
+    occupancy = 0
+    completed = []
+    started = time.perf_counter()
+    for _ in range(sessions):
+        now += rng.uniform(0, 2 * gap)
+        occupancy = min(slots, max(0, occupancy + rng.choice((-1, 1))))
+        statistics.record_entries(now, 1, occupancy)
+        duration = rng.uniform(60, 4 * 3600)
+        fee = duration / 60
+        statistics.record_exits(now, [(fee, duration)], occupancy)
+        completed.append((now, fee, duration))
+    recorded = time.perf_counter() - started
+    return statistics, completed, now, recorded
+
+def scan_day(completed, now):
+    """Exits, revenue and stay percentiles of the last day by scanning every session"""
+    durations = sorted(duration for exit_time, fee, duration in completed if exit_time > now - DAY)
+    revenue = sum(fee for exit_time, fee, duration in completed if exit_time > now - DAY)
+    percentiles = [durations[int(q * (len(durations) - 1))] for q in (0.5, 0.9, 0.99)]
+    return len(durations), revenue, percentiles
+
+def timed(function, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the time-windowed statistics")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help="sessions over two simulated days, one run each")
+    parser.add_argument('--slots', type=int, default=500, help="number of parking slots")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    for sessions in args.sessions:
+        statistics, completed, now, recorded = feed(sessions, args.slots, args.seed)
+        summary, read = timed(statistics.summary, now, args.slots)
+        (exits, revenue, percentiles), scanned = timed(scan_day, completed, now, repeat=1)
+        day = summary['24h']
+        print(f"{sessions:>9,} sessions: record {recorded / sessions * 1e6:.2f} us/session, "
+              f"read all windows {read * 1000:.3f} ms, scan one day {scanned * 1000:,.1f} ms")
+        
+        # The day window ends at a bucket boundary, so it may miss up to one bucket of the oldest exits
+        missing = exits - day['exits']
+        if not 0 <= missing <= exits * RollingStatistics.BUCKET_SECONDS / DAY * 3 + 10:
+            raise SystemExit(f"Window reports {day['exits']} exits in the last day; the scan finds {exits}")
+        if not -0.01 <= revenue - day['revenue'] <= missing * 4 * 60 + 0.01:
+            raise SystemExit(f"Window reports ${day['revenue']:,.2f} revenue in the last day; "
+                             f"the scan finds ${revenue:,.2f}")
+        for estimate, exact in zip((day['stay_p50'], day['stay_p90'], day['stay_p99']), percentiles):
+            if abs(estimate - exact) > 0.05 * exact:
+                raise SystemExit(f"Stay percentile estimate {estimate:.1f} is far from {exact:.1f}")
+
+if __name__ == "__main__":
+    main()
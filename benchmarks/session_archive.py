@@ -0,0 +1,90 @@
+"""Benchmark for the columnar session archive.
+
+Generates a year of completed sessions, writes them both as a columnar archive
+and as a text log export, then times year-long and one-day statistics from the
+archive against re-parsing the text export. Run from the repository root:
+
+    python -m benchmarks.session_archive --sessions 2000000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from project import VEHICLE_TYPES, VEHICLE_COLORS, FEE_MULTIPLIERS
+from session_archive import ArchiveWriter, SessionArchive
+from log_index import parse_log_file
+
+YEAR = 365 * 24 * 3600
+
+def write_sessions(archive_path, log_path, sessions, slots, seed):
+    """Write the same simulated year of sessions to an archive and a text export, in exit order"""
+    rng = random.Random(seed)
+    start = time.mktime((2024, 1, 1, 0, 0, 0, 0, 0, -1))
+    gap = YEAR / sessions
+    exit_time = start
+    with ArchiveWriter(archive_path) as writer, open(log_path, 'w') as log:
+        for n in range(sessions):
+            exit_time += rng.uniform(0, 2 * gap)
+            exit_time = float(int(exit_time))
+            duration = float(rng.randint(60, 4 * 3600))
+            vehicle_type = rng.choice(VEHICLE_TYPES)
+            fee = duration / 60 * FEE_MULTIPLIERS[vehicle_type]
+            plate = f"ARC-{n % 100000:05d}"
+            slot = rng.randrange(slots)
+            writer.append(plate, slot, exit_time - duration, exit_time, vehicle_type,
+                          rng.choice(VEHICLE_COLORS), fee)
+            
+            stamp = time.strftime('[%Y-%m-%d %H:%M:%S]', time.localtime(exit_time - duration))
+            log.write(f"{stamp} Vehicle {plate} entered and parked in slot {slot + 1}.\n")
+            stamp = time.strftime('[%Y-%m-%d %H:%M:%S]', time.localtime(exit_time))
+            log.write(f"{stamp} Vehicle {plate} exited from slot {slot + 1}. "
+                      f"Duration: {duration / 60:.1f} min. Fee: ${fee:.2f}\n")
+    return start
+
+def text_statistics(log_path, start=None, end=None):
+    """Exits and revenue in [start, end) from re-parsing the text export"""
+    _, _, _, exit_times, fees = parse_log_file(log_path)
+    exits = 0
+    revenue = 0.0
+    for exit_time, fee in zip(exit_times, fees):
+        if (start is None or exit_time >= start) and (end is None or exit_time < end):
+            exits += 1
+            revenue += fee
+    return exits, revenue
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar session archive")
+    parser.add_argument('--sessions', type=int, default=2000000, help="sessions in the simulated year")
+    parser.add_argument('--slots', type=int, default=500, help="number of parking slots")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix='parking-archive-')
+    archive_path = os.path.join(directory, 'sessions.parc')
+    log_path = os.path.join(directory, 'parking_logs.txt')
+    start, written = timed(write_sessions, archive_path, log_path, args.sessions, args.slots, args.seed)
+    print(f"Sessions: {args.sessions:,}  archive {os.path.getsize(archive_path) / 1e6:,.1f} MB, "
+          f"text export {os.path.getsize(log_path) / 1e6:,.1f} MB (written in {written:.1f} s)")
+    
+    day = (start + 200 * 24 * 3600, start + 201 * 24 * 3600)
+    with SessionArchive(archive_path) as archive:
+        for label, window in (("Year", (None, None)), ("One day", day)):
+            statistics, archived = timed(archive.statistics, *window)
+            (exits, revenue), parsed = timed(text_statistics, log_path, *window)
+            chunks = len(archive.matching_chunks(archive.time_ranges(*window)))
+            print(f"{label:<8} archive {archived * 1000:>8.1f} ms ({chunks}/{len(archive.chunks)} chunks), "
+                  f"text re-parse {parsed * 1000:>8.1f} ms, {parsed / archived:,.0f}x faster")
+            
+            if statistics['total_exits'] != exits or abs(statistics['revenue'] - revenue) > 0.01 * exits:
+                raise SystemExit(f"Archive reports {statistics['total_exits']} exits and "
+                                 f"${statistics['revenue']:,.2f}; text reports {exits} and ${revenue:,.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Batch fee computation and revenue reports.
+
+Fees are computed exactly as ParkingManagementSystem.calculate_fee does
+((duration / 60) * multiplier), but over whole arrays at once. NumPy is used
+when it is installed; otherwise the same results are produced in pure Python.
+Vehicle types may be given as names or as VEHICLE_TYPES indices (the fast path).
+"""
+import math
+import numbers
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from project import VEHICLE_TYPES, VEHICLE_TYPE_CODES, FEE_MULTIPLIERS
+
+def encode_vehicle_types(vehicle_types):
+    """Return (names, codes) where each code indexes names"""
+    if np is not None and isinstance(vehicle_types, np.ndarray) and vehicle_types.dtype.kind in 'iu':
+        return list(VEHICLE_TYPES), vehicle_types
+    
+    names = list(VEHICLE_TYPES)
+    lookup = dict(VEHICLE_TYPE_CODES)
+    
+    def code_of(vehicle_type):
+        # Codes may be Python or NumPy integers (e.g. taken from an array one by one)
+        if isinstance(vehicle_type, numbers.Integral):
+            return int(vehicle_type)
+        code = lookup.get(vehicle_type)
+        if code is None:
+            # Unknown types keep their own group and are billed at multiplier 1.0
+            code = lookup[vehicle_type] = len(names)
+            names.append(vehicle_type)
+        return code
+    
+    codes = [code_of(vehicle_type) for vehicle_type in vehicle_types]
+    if np is not None:
+        codes = np.asarray(codes, dtype=np.intp)
+    return names, codes
+
+def multiplier_table(names, multipliers):
+    """Fee multiplier for each vehicle type name"""
+    return [multipliers.get(name, 1.0) for name in names]
+
+def calculate_fees(durations, vehicle_types, multipliers=None):
+    """Calculate the fee of every session from its duration (in seconds) and vehicle type"""
+    if multipliers is None:
+        multipliers = FEE_MULTIPLIERS
+    
+    names, codes = encode_vehicle_types(vehicle_types)
+    table = multiplier_table(names, multipliers)
+    
+    if np is None:
+        return [duration / 60 * table[code] for duration, code in zip(durations, codes)]
+    
+    durations = np.asarray(durations, dtype=np.float64)
+    return durations / 60 * np.asarray(table)[codes]
+
+def revenue_report(entry_times, exit_times, vehicle_types, multipliers=None, bucket_seconds=3600):
+    """Fees plus revenue totals grouped by vehicle type and by exit hour"""
+    if multipliers is None:
+        multipliers = FEE_MULTIPLIERS
+    
+    names, codes = encode_vehicle_types(vehicle_types)
+    table = multiplier_table(names, multipliers)
+    
+    if np is None:
+        fees = []
+        by_type = [0.0] * len(names)
+        sessions_by_type = [0] * len(names)
+        by_bucket = {}
+        for entry_time, exit_time, code in zip(entry_times, exit_times, codes):
+            fee = (exit_time - entry_time) / 60 * table[code]
+            fees.append(fee)
+            by_type[code] += fee
+            sessions_by_type[code] += 1
+            bucket = math.floor(exit_time / bucket_seconds) * bucket_seconds
+            by_bucket[bucket] = by_bucket.get(bucket, 0.0) + fee
+        total = math.fsum(fees)
+        by_bucket = dict(sorted(by_bucket.items()))
+    else:
+        entry_times = np.asarray(entry_times, dtype=np.float64)
+        exit_times = np.asarray(exit_times, dtype=np.float64)
+        fees = (exit_times - entry_times) / 60 * np.asarray(table)[codes]
+        by_type = np.bincount(codes, weights=fees, minlength=len(names)).tolist()
+        sessions_by_type = np.bincount(codes, minlength=len(names)).tolist()
+        
+        buckets = np.floor(exit_times / bucket_seconds).astype(np.int64)
+        bucket_ids, bucket_index = np.unique(buckets, return_inverse=True)
+        bucket_sums = np.bincount(bucket_index, weights=fees, minlength=len(bucket_ids))
+        by_bucket = {int(bucket) * bucket_seconds: float(amount)
+                     for bucket, amount in zip(bucket_ids, bucket_sums)}
+        total = float(fees.sum())
+    
+    return {
+        'fees': fees,
+        'total_revenue': total,
+        'by_vehicle_type': {name: by_type[code] for code, name in enumerate(names)
+                            if sessions_by_type[code]},
+        'sessions_by_vehicle_type': {name: sessions_by_type[code] for code, name in enumerate(names)
+                                     if sessions_by_type[code]},
+        'by_hour': by_bucket
+    }
+
+def history_columns(history):
+    """Entry times, exit times and vehicle types of every session in a SessionHistory"""
+    entry_times = []
+    exit_times = []
+    vehicle_types = []
+    for record in history:
+        entry_times.append(record['entry_time'])
+        exit_times.append(record['exit_time'])
+        vehicle_types.append(record['vehicle_type'])
+    return entry_times, exit_times, vehicle_types
+
+def rerate_history(history, multipliers=None, bucket_seconds=3600):
+    """Revenue report for past sessions, optionally under a different fee structure"""
+    entry_times, exit_times, vehicle_types = history_columns(history)
+    return revenue_report(entry_times, exit_times, vehicle_types, multipliers, bucket_seconds)
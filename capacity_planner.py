@@ -0,0 +1,162 @@
+"""Monte Carlo capacity planner built on the headless simulation.
+
+Runs many seeded replications of HeadlessSimulation for every combination of
+lot size, mean time between arrivals and stay-time distribution, spread over
+a pool of worker processes. For each scenario it reports the mean and a 95%
+confidence interval of the average wait, the vehicles still waiting at the end,
+the share of arrivals turned away, the peak occupancy and the revenue. The
+average wait covers every arrival that wasn't turned away: vehicles that parked
+at once count as zero, and vehicles still waiting at the end count with their
+wait so far (a lower bound, hence the count next to it). Replications are
+independent and only their results travel back, so throughput grows with the
+number of workers up to the number of cores.
+
+Stay distributions are given as name:parameters, in seconds:
+
+    uniform:20:120      (the GUI automation's 20 to 120 s)
+    exponential:70      (mean 70 s)
+    lognormal:4.1:0.5   (mu and sigma of the log of the stay)
+
+    python capacity_planner.py --slots 20 30 40 --entry-interval 2 4 --stay uniform:20:120 exponential:70 \\
+        --replications 1000 --hours 2 --queue-limit 10 --workers 8
+"""
+import os
+import json
+import math
+import time
+import argparse
+import itertools
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+from simulation import HeadlessSimulation
+
+# Two-sided 95% quantiles of Student's t for 1 to 30 degrees of freedom; beyond that the normal 1.96
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+# Reported per scenario, in the order run_replication returns them
+METRICS = ('avg_wait', 'still_waiting', 'rejection_rate', 'peak_occupancy', 'revenue')
+
+def stay_sampler(spec):
+    """Function drawing a stay in seconds from an rng, for a 'name:parameters' distribution"""
+    name, *parameters = spec.split(':')
+    values = [float(value) for value in parameters]
+    if name == 'uniform' and len(values) == 2:
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if name == 'exponential' and len(values) == 1:
+        mean, = values
+        return lambda rng: rng.expovariate(1.0 / mean)
+    if name == 'lognormal' and len(values) == 2:
+        mu, sigma = values
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown stay distribution {spec!r} (use uniform:LOW:HIGH, exponential:MEAN "
+                     "or lognormal:MU:SIGMA)")
+
+def run_replication(task):
+    """Simulate one replication; returns (scenario index, average wait, still waiting, rejection rate, peak, revenue)"""
+    index, (slots, entry_interval, stay), seed, duration, queue_limit = task
+    simulation = HeadlessSimulation(total_slots=slots, entry_interval=entry_interval, seed=seed,
+                                    stay_sampler=stay_sampler(stay), queue_limit=queue_limit)
+    report = simulation.run(duration)
+    system = simulation.parking_system
+    
+    queue = system.get_queue_statistics()
+    total_wait = sum(waiting['avg_wait'] * waiting['served'] for waiting in queue.values())
+    rejected = sum(waiting['rejected'] for waiting in queue.values())
+    arrivals = report['counts']['arrivals']
+    
+    # Averaged over every arrival that wasn't turned away, not only those served from the queue:
+    # vehicles that parked at once waited 0 s, and those still waiting count with their wait so far
+    still_waiting = system.entry_queue.entries()
+    total_wait += sum(simulation.clock.now - queued_at for _, _, queued_at in still_waiting)
+    entered = arrivals - rejected
+    
+    return (index,
+            total_wait / entered if entered else 0.0,
+            len(still_waiting),
+            rejected / arrivals if arrivals else 0.0,
+            report['statistics']['peak_occupancy'],
+            report['statistics']['revenue'])
+
+def confidence_interval(values):
+    """(mean, half-width of the 95% confidence interval of the mean)"""
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, float('inf')
+    df = len(values) - 1
+    t = T_95[df - 1] if df <= len(T_95) else 1.96
+    return mean, t * statistics.stdev(values) / math.sqrt(len(values))
+
+def plan(scenarios, replications, duration, queue_limit=None, workers=None, seed=0):
+    """Run every scenario replications times; returns one dict of metric -> (mean, half-width) per scenario"""
+    # Replication r of every scenario uses seed + r, so scenarios are compared on the same random streams
+    tasks = [(index, scenario, seed + replication, duration, queue_limit)
+             for index, scenario in enumerate(scenarios) for replication in range(replications)]
+    
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        outcomes = list(map(run_replication, tasks))
+    else:
+        # A few chunks per worker keep the pool busy without a round trip per replication
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(run_replication, tasks,
+                                         chunksize=max(1, len(tasks) // (workers * 4))))
+    
+    results = [[] for _ in scenarios]
+    for index, *metrics in outcomes:
+        results[index].append(metrics)
+    
+    summaries = []
+    for scenario, runs in zip(scenarios, results):
+        summary = {'slots': scenario[0], 'entry_interval': scenario[1], 'stay': scenario[2],
+                   'replications': len(runs)}
+        for metric, values in zip(METRICS, zip(*runs)):
+            summary[metric] = confidence_interval(values)
+        summaries.append(summary)
+    return summaries
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo capacity planning over headless simulations")
+    parser.add_argument('--slots', type=int, nargs='+', default=[20], help="lot sizes to try")
+    parser.add_argument('--entry-interval', type=float, nargs='+', default=[4.0],
+                        help="mean seconds between arrivals to try")
+    parser.add_argument('--stay', nargs='+', default=['uniform:20:120'], help="stay distributions to try")
+    parser.add_argument('--replications', type=int, default=200, help="replications per scenario")
+    parser.add_argument('--hours', type=float, default=1.0, help="simulated hours per replication")
+    parser.add_argument('--queue-limit', type=int, default=None,
+                        help="waiting vehicles per priority class beyond which arrivals of that class are turned "
+                             "away (default: unlimited, so the rejection rate is always 0)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first replication")
+    parser.add_argument('--json', default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+    
+    for spec in args.stay:
+        stay_sampler(spec)
+    scenarios = list(itertools.product(args.slots, args.entry_interval, args.stay))
+    
+    started = time.perf_counter()
+    summaries = plan(scenarios, args.replications, args.hours * 3600, args.queue_limit, args.workers, args.seed)
+    elapsed = time.perf_counter() - started
+    
+    total = len(scenarios) * args.replications
+    print(f"{total:,} replications of {args.hours:g} h in {elapsed:.1f} s "
+          f"({total / elapsed:,.1f}/s on {args.workers or os.cpu_count()} workers); means with 95% intervals")
+    print(f"{'Slots':>5} {'Interval':>8} {'Stay':<18} {'Wait (s)':>16} {'Still waiting':>14} "
+          f"{'Rejected (%)':>14} {'Peak occupancy':>16} {'Revenue ($)':>20}")
+    for summary in summaries:
+        wait, still_waiting, rejection, peak, revenue = (summary[metric] for metric in METRICS)
+        print(f"{summary['slots']:>5} {summary['entry_interval']:>8g} {summary['stay']:<18} "
+              f"{wait[0]:>8.1f} ± {wait[1]:<5.1f} {still_waiting[0]:>6.1f} ± {still_waiting[1]:<5.1f} "
+              f"{rejection[0] * 100:>6.2f} ± {rejection[1] * 100:<5.2f} "
+              f"{peak[0]:>8.1f} ± {peak[1]:<5.1f} {revenue[0]:>11.2f} ± {revenue[1]:<6.2f}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summaries, f, indent=2)
+
+if __name__ == "__main__":
+    main()
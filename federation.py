@@ -0,0 +1,324 @@
+"""Federation of parking lots run as independent shards.
+
+A garage operator runs many lots (or levels run as separate lots). Each shard
+is a complete ParkingManagementSystem with its own slot allocator, entry queue
+and statistics, either in this process (LocalShard) or in a worker process of
+its own (ProcessShard), so shards use as many cores as there are processes
+instead of sharing one interpreter lock.
+
+ParkingFederation routes each arriving vehicle to the least-loaded shard, or
+with gate distances to the nearest shard with room, and remembers which shard
+holds which vehicle so exits go to the same one. Operations travel to shards
+in batches: every shard with work gets its part of the batch before any reply
+is awaited, so process shards work on their parts at the same time. Each
+reply carries the shard's statistics, and the federation totals are updated
+by the difference from that shard's previous reply.
+
+    shards = [ProcessShard(f"garage-{n}", total_slots=5000) for n in range(4)]
+    federation = ParkingFederation(shards)
+    federation.vehicle_entry('ABC-1234')      # ('garage-0', 0)
+    federation.vehicle_exit('ABC-1234')       # (True, fee, duration)
+    federation.get_statistics()
+    federation.close()
+"""
+import threading
+import multiprocessing
+
+from project import ParkingManagementSystem
+
+# Shard statistics summed into the federation totals
+SUMMED_STATISTICS = ('total_slots', 'total_entries', 'total_exits', 'current_occupancy', 'total_stay_time',
+                     'revenue', 'queue_length', 'available_slots')
+
+def shard_statistics(system):
+    """Statistics of one shard, as sent back with every batch"""
+    statistics = system.get_statistics()
+    statistics['total_slots'] = system.total_slots
+    statistics['total_stay_time'] = system.stats['total_stay_time']
+    return statistics
+
+def run_operations(system, operations):
+    """Apply a shard's part of a batch; returns (one result per operation, shard statistics)"""
+    results = []
+    for operation in operations:
+        kind = operation[0]
+        if kind == 'entry':
+            _, license_plate, priority_class = operation
+            if license_plate is None:
+                license_plate = system.generate_license_plate()
+            slot = system.vehicle_entry(license_plate, priority_class)
+            results.append((license_plate, slot, slot is None and license_plate in system.entry_queue))
+        elif kind == 'exit':
+            results.append(system.vehicle_exit(operation[1]))
+        elif kind == 'cancel':
+            results.append(system.cancel_queued_vehicle(operation[1]))
+        elif kind == 'priority_exit':
+            results.append(system.add_to_exit_stack(operation[1]) and system.process_exit_stack())
+        else:
+            raise ValueError(f"Unknown shard operation {kind!r}")
+    return results, shard_statistics(system)
+
+def shard_worker(connection, options):
+    """Worker process body: run one shard until a None batch arrives"""
+    system = ParkingManagementSystem(**options)
+    while True:
+        operations = connection.recv()
+        if operations is None:
+            break
+        try:
+            reply = run_operations(system, operations)
+        except Exception as error:
+            reply = error
+        connection.send(reply)
+    
+    if system.event_log is not None:
+        system.event_log.close()
+    connection.close()
+
+class LocalShard:
+    """Shard running in this process"""
+    def __init__(self, name, **options):
+        self.name = name
+        self.system = ParkingManagementSystem(**options)
+        self.pending = None
+    
+    def send(self, operations):
+        self.pending = operations
+    
+    def receive(self):
+        operations, self.pending = self.pending, None
+        return run_operations(self.system, operations)
+    
+    def close(self):
+        if self.system.event_log is not None:
+            self.system.event_log.close()
+
+class ProcessShard:
+    """Shard running in a worker process; options are passed to ParkingManagementSystem there"""
+    def __init__(self, name, **options):
+        self.name = name
+        self.connection, worker_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=shard_worker, args=(worker_connection, options),
+                                               name=f"shard-{name}", daemon=True)
+        self.process.start()
+        worker_connection.close()
+    
+    def send(self, operations):
+        self.connection.send(operations)
+    
+    def receive(self):
+        reply = self.connection.recv()
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+    
+    def close(self):
+        if self.process.is_alive():
+            self.connection.send(None)
+            self.process.join()
+        self.connection.close()
+
+class ParkingFederation:
+    """Routes vehicles across shard lots and keeps their combined statistics"""
+    POLICIES = ('least_loaded', 'nearest')
+    
+    def __init__(self, shards, policy='least_loaded', distances=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown routing policy {policy!r}")
+        self.shards = list(shards)
+        self.policy = policy
+        names = [shard.name for shard in self.shards]
+        
+        # Gate -> distance of each shard (in shard order) for the nearest policy; shards a gate
+        # doesn't list are only used once the listed ones are full
+        self.distances = {gate: [by_shard.get(name, float('inf')) for name in names]
+                          for gate, by_shard in (distances or {}).items()}
+        
+        # Hash Table (Dictionary) of the shard index holding each parked or waiting vehicle
+        self.locations = {}
+        
+        # Vehicles parked or waiting and slots in service per shard; load is raised as
+        # vehicles are routed and reset from each shard's reply
+        self.load = [0] * len(self.shards)
+        self.capacity = [0] * len(self.shards)
+        
+        # Latest statistics of each shard and their running sums
+        self.shard_stats = [None] * len(self.shards)
+        self.totals = dict.fromkeys(SUMMED_STATISTICS, 0)
+        self.peak_occupancy = 0
+        
+        # One batch is in flight at a time; process shards work on their parts of it in parallel
+        self.lock = threading.Lock()
+        
+        # An empty batch to every shard fetches its starting statistics
+        with self.lock:
+            _, error = self.dispatch([(index, []) for index in range(len(self.shards))])
+        if error is not None:
+            raise error
+    
+    def route(self, gate=None):
+        """Index of the shard the next vehicle from gate should go to"""
+        if self.policy == 'nearest' and gate in self.distances:
+            distances = self.distances[gate]
+            nearest = None
+            for index, distance in enumerate(distances):
+                if self.load[index] < self.capacity[index] and distance < float('inf') and \
+                        (nearest is None or distance < distances[nearest]):
+                    nearest = index
+            if nearest is not None:
+                return nearest
+        
+        # Least loaded: the lowest share of slots taken, counting waiting vehicles as load
+        return min(range(len(self.shards)), key=self.load_share)
+    
+    def load_share(self, index):
+        """Vehicles parked or waiting in a shard per slot in service"""
+        return self.load[index] / self.capacity[index] if self.capacity[index] else float('inf')
+    
+    def update_statistics(self, index, statistics):
+        """Fold a shard's new statistics into the totals by their difference from its previous ones"""
+        previous = self.shard_stats[index]
+        for key in SUMMED_STATISTICS:
+            self.totals[key] += statistics[key] - (previous[key] if previous else 0)
+        self.shard_stats[index] = statistics
+        
+        self.load[index] = statistics['current_occupancy'] + statistics['queue_length']
+        self.capacity[index] = statistics['current_occupancy'] + statistics['available_slots']
+        self.peak_occupancy = max(self.peak_occupancy, self.totals['current_occupancy'])
+    
+    def dispatch(self, parts):
+        """Send each (shard index, operations) part, then collect the replies
+        
+        Returns (results per part, None for a shard that failed; the first error or None). Every
+        other shard's reply is still read when one fails, as replies left in their pipes would
+        be taken as the replies to the next batch.
+        """
+        error = None
+        sent = set()
+        for index, operations in parts:
+            try:
+                self.shards[index].send(operations)
+            except Exception as failure:
+                error = error or failure
+            else:
+                sent.add(index)
+        
+        replies = [None] * len(parts)
+        for position, (index, _) in enumerate(parts):
+            if index not in sent:
+                continue
+            try:
+                results, statistics = self.shards[index].receive()
+            except Exception as failure:
+                error = error or failure
+                continue
+            self.update_statistics(index, statistics)
+            replies[position] = results
+        return replies, error
+    
+    def run_batch(self, operations):
+        """Route and apply many operations; returns one (shard name, result) per operation, in order
+
+        Operations are ('entry', license plate or None, priority class, gate), ('exit', plate),
+        ('cancel', plate) and ('priority_exit', plate). Entry results are (plate, slot or None,
+        whether it is waiting in the queue) and the other results are what the shard's
+        ParkingManagementSystem returns; an operation on an unknown plate gives (None, False).
+        """
+        with self.lock:
+            # Shard index -> (positions in the batch, operations for the shard)
+            parts = {}
+            results = [(None, False)] * len(operations)
+            # Positions of entries routed to a shard in this batch rather than to where the plate already is
+            routed = set()
+            for position, operation in enumerate(operations):
+                if operation[0] == 'entry':
+                    _, license_plate, priority_class, gate = operation
+                    index = self.locations.get(license_plate) if license_plate is not None else None
+                    if index is None:
+                        index = self.route(gate)
+                        self.load[index] += 1
+                        routed.add(position)
+                        if license_plate is not None:
+                            self.locations[license_plate] = index
+                    operation = ('entry', license_plate, priority_class)
+                else:
+                    index = self.locations.get(operation[1])
+                    if index is None:
+                        continue
+                    self.load[index] -= 1
+                
+                positions, shard_operations = parts.setdefault(index, ([], []))
+                positions.append(position)
+                shard_operations.append(operation)
+            
+            order = list(parts)
+            replies, error = self.dispatch([(index, parts[index][1]) for index in order])
+            
+            # The shards that replied are tracked even if another one failed
+            for index, shard_results in zip(order, replies):
+                if shard_results is None:
+                    continue
+                name = self.shards[index].name
+                positions, shard_operations = parts[index]
+                for position, operation, result in zip(positions, shard_operations, shard_results):
+                    results[position] = (name, result)
+                    self.track(index, operation, result, position in routed)
+        
+        if error is not None:
+            raise error
+        return results
+    
+    def track(self, index, operation, result, routed=False):
+        """Keep locations up to date with the outcome of an operation (routed: a fresh entry of this batch)"""
+        kind = operation[0]
+        if kind == 'entry':
+            license_plate, slot, queued = result
+            if slot is not None or queued:
+                self.locations[license_plate] = index
+            elif routed and self.locations.get(license_plate) == index:
+                # Turned away from a full queue; a plate already in the shard stays where it is
+                del self.locations[license_plate]
+        elif result and self.locations.get(operation[1]) == index:
+            del self.locations[operation[1]]
+    
+    def vehicle_entry(self, license_plate=None, priority_class='regular', gate=None):
+        """Park a vehicle in the shard it is routed to; returns (shard name, slot or None if not parked)"""
+        name, (_, slot, _) = self.run_batch([('entry', license_plate, priority_class, gate)])[0]
+        return name, slot
+    
+    def vehicle_exit(self, license_plate):
+        """Exit a vehicle from the shard holding it; returns what that shard's vehicle_exit returns"""
+        return self.run_batch([('exit', license_plate)])[0][1]
+    
+    def cancel_queued_vehicle(self, license_plate):
+        """Take a waiting vehicle out of its shard's queue"""
+        return self.run_batch([('cancel', license_plate)])[0][1]
+    
+    def get_statistics(self):
+        """Statistics over all shards, in the form of ParkingManagementSystem.get_statistics"""
+        with self.lock:
+            totals = self.totals
+            return {
+                'total_entries': totals['total_entries'],
+                'total_exits': totals['total_exits'],
+                'current_occupancy': totals['current_occupancy'],
+                # Seen between batches, so a peak reached and left within one batch is missed
+                'peak_occupancy': self.peak_occupancy,
+                'avg_stay_time': totals['total_stay_time'] / totals['total_exits'] if totals['total_exits'] else 0,
+                'revenue': totals['revenue'],
+                'queue_length': totals['queue_length'],
+                'available_slots': totals['available_slots'],
+                'total_slots': totals['total_slots'],
+                'shards': len(self.shards)
+            }
+    
+    def get_shard_statistics(self):
+        """Latest statistics of each shard by name"""
+        with self.lock:
+            return {shard.name: dict(statistics) for shard, statistics in zip(self.shards, self.shard_stats)}
+    
+    def close(self):
+        """Stop the shards (worker processes exit after their current batch)"""
+        with self.lock:
+            for shard in self.shards:
+                shard.close()
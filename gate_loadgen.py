@@ -0,0 +1,152 @@
+"""Load generator for the gate-event server.
+
+Opens many concurrent gate connections, each sending a mix of entry, exit and
+priority-exit requests, and reports throughput and latency percentiles.
+
+    python gate_loadgen.py --spawn-server --clients 50 --requests 2000
+    python gate_loadgen.py --port 8765 --clients 50 --requests 2000
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from project import ParkingManagementSystem
+from gate_server import GateServer
+
+class GateClient:
+    """One gate connection sending requests and matching responses by id"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.pending = {}
+        self.events = 0
+        
+        # Plates of queued vehicles the server has since parked
+        self.assigned = []
+        self.listener = asyncio.ensure_future(self.listen())
+    
+    async def listen(self):
+        """Dispatch responses to waiting requests and count server-pushed events"""
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            future = self.pending.pop(message.get('id'), None)
+            if future is not None:
+                future.set_result(message)
+            elif message.get('event') == 'assigned':
+                self.events += 1
+                self.assigned.append(message['plate'])
+    
+    async def request(self, op, plate=None):
+        """Send one request and wait for its response"""
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        message = {'id': self.next_id, 'op': op}
+        if plate is not None:
+            message['plate'] = plate
+        self.writer.write(json.dumps(message).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+    
+    async def close(self):
+        """Half-close the connection, wait for the server to finish, then close"""
+        self.writer.write_eof()
+        await self.listener
+        self.writer.close()
+
+async def open_client(args):
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    return GateClient(reader, writer)
+
+async def run_gate(client, gate, requests, exit_share, rng, latencies, counts):
+    """Drive one gate: enter new vehicles and exit vehicles it has parked"""
+    parked = []
+    for n in range(requests):
+        parked.extend(client.assigned)
+        client.assigned.clear()
+        
+        roll = rng.random()
+        if parked and roll < exit_share:
+            op = 'priority_exit' if roll < exit_share / 10 else 'exit'
+            plate = parked.pop(rng.randrange(len(parked)))
+        else:
+            op = 'entry'
+            plate = f"G{gate:03d}-{n:06d}"
+        
+        started = time.perf_counter()
+        response = await client.request(op, plate)
+        latencies.append(time.perf_counter() - started)
+        counts[op] = counts.get(op, 0) + 1
+        
+        if op == 'entry' and not response['queued']:
+            parked.append(plate)
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+async def run_load(args):
+    server = None
+    if args.spawn_server:
+        gate_server = GateServer(ParkingManagementSystem(total_slots=args.slots))
+        server = await gate_server.start(args.host, 0, args.unix)
+        if not args.unix:
+            args.port = server.sockets[0].getsockname()[1]
+    
+    clients = [await open_client(args) for _ in range(args.clients)]
+    rng = random.Random(args.seed)
+    latencies = []
+    counts = {}
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(run_gate(client, gate, args.requests, args.exit_share,
+                                    random.Random(rng.random()), latencies, counts)
+                           for gate, client in enumerate(clients)))
+    elapsed = time.perf_counter() - started
+    
+    stats = await clients[0].request('stats')
+    events = sum(client.events for client in clients)
+    for client in clients:
+        await client.close()
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+    
+    latencies.sort()
+    print(f"Clients: {args.clients}, Requests: {len(latencies)} in {elapsed:.2f} s "
+          f"({len(latencies) / elapsed:,.0f} req/sec)")
+    print(f"Latency p50: {percentile(latencies, 0.50) * 1e3:.2f} ms, "
+          f"p95: {percentile(latencies, 0.95) * 1e3:.2f} ms, "
+          f"p99: {percentile(latencies, 0.99) * 1e3:.2f} ms, "
+          f"max: {latencies[-1] * 1e3:.2f} ms")
+    print(f"Operations: {counts}, Assignment events: {events}")
+    print(f"Lot: {stats['current_occupancy']} occupied, {stats['queue_length']} queued, "
+          f"revenue ${stats['revenue']:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate gate-event load against the gate server")
+    parser.add_argument('--host', default='127.0.0.1', help="server host")
+    parser.add_argument('--port', type=int, default=8765, help="server port")
+    parser.add_argument('--unix', help="connect over this Unix socket path instead of TCP")
+    parser.add_argument('--spawn-server', action='store_true', help="run the server in this process")
+    parser.add_argument('--slots', type=int, default=1000, help="slots for a spawned server")
+    parser.add_argument('--clients', type=int, default=50, help="concurrent gate connections")
+    parser.add_argument('--requests', type=int, default=2000, help="requests per connection")
+    parser.add_argument('--exit-share', type=float, default=0.45,
+                        help="fraction of requests that are exits (a tenth of them priority exits)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+    
+    asyncio.run(run_load(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""asyncio gate-event server for the parking system.
+
+Gate clients connect over TCP (or a Unix socket) and exchange line-delimited JSON.
+Each request is one object with an "op" and an optional "id" that is echoed back:
+
+    {"id": 1, "op": "entry", "plate": "ABC-1234"}
+    {"id": 1, "ok": true, "plate": "ABC-1234", "slot": 4, "queued": false}
+
+An entry may name a priority class ("disabled", "permit", "ev" or the default
+"regular"), which decides its place in the queue when the lot is full. A
+vehicle that gives up waiting is taken out of the queue with "cancel":
+
+    {"id": 5, "op": "entry", "plate": "EVX-0001", "class": "ev"}
+    {"id": 6, "op": "cancel", "plate": "EVX-0001"}
+
+    {"id": 2, "op": "exit", "plate": "ABC-1234"}
+    {"id": 2, "ok": true, "plate": "ABC-1234", "fee": 1.25, "duration": 75.0}
+
+    {"id": 3, "op": "priority_exit", "plate": "ABC-1234"}   (through the exit stack)
+    {"id": 4, "op": "stats"}   (lifetime totals, plus "windows" for the last 5m, 1h and 24h)
+
+When an exit frees a slot for a queued vehicle, the client that sent that
+vehicle's entry receives {"event": "assigned", "plate": ..., "slot": ...}.
+
+With --data-dir, a response (and any "assigned" event it causes) is sent only
+after the group commit that fsyncs the request's event log records, so a change
+a client has seen acknowledged survives a crash. Requests waiting for the same
+commit share its fsync, and other clients are served in the meantime.
+
+A request that fails gets {"ok": false, "error": ...}, e.g. "already parked" for
+an entry whose plate is already parked, queued or on the exit stack; the
+connection stays open.
+
+    python gate_server.py --port 8765
+    python gate_server.py --unix /tmp/parking.sock
+    python gate_server.py --data-dir parking_data   (recover state and log every change)
+"""
+import json
+import asyncio
+import argparse
+from project import ParkingManagementSystem, ChangeBus, PRIORITY_CLASS_CODES
+
+class GateServer:
+    """Applies gate events from many clients to one ParkingManagementSystem"""
+    def __init__(self, parking_system):
+        self.parking_system = parking_system
+        
+        # Queued license plate -> client to notify, and queued vehicles parked since the last notification
+        self.waiting = {}
+        self.assigned = []
+        parking_system.subscribe(self.on_slot_occupied, ChangeBus.SLOT_OCCUPIED)
+        
+        self.handlers = {
+            'entry': self.handle_entry,
+            'exit': self.handle_exit,
+            'priority_exit': self.handle_priority_exit,
+            'cancel': self.handle_cancel,
+            'stats': self.handle_stats
+        }
+    
+    def send(self, writer, message):
+        """Write one JSON line to a client"""
+        if not writer.is_closing():
+            writer.write(json.dumps(message).encode() + b'\n')
+    
+    def handle_entry(self, request, writer):
+        license_plate = request.get('plate') or self.parking_system.generate_license_plate()
+        priority_class = request.get('class', 'regular')
+        if priority_class not in PRIORITY_CLASS_CODES:
+            return {'ok': False, 'plate': license_plate, 'error': "unknown priority class"}
+        if self.parking_system.is_vehicle_present(license_plate):
+            return {'ok': False, 'plate': license_plate, 'error': "already parked"}
+        
+        slot = self.parking_system.vehicle_entry(license_plate, priority_class)
+        if slot is None:
+            if license_plate not in self.parking_system.entry_queue:
+                return {'ok': False, 'plate': license_plate, 'error': "entry queue is full"}
+            self.waiting[license_plate] = writer
+            return {'ok': True, 'plate': license_plate, 'slot': None, 'queued': True}
+        
+        return {'ok': True, 'plate': license_plate, 'slot': slot, 'queued': False}
+    
+    def handle_exit(self, request, writer):
+        license_plate = request.get('plate')
+        result = self.parking_system.vehicle_exit(license_plate)
+        if not result:
+            return {'ok': False, 'plate': license_plate, 'error': "vehicle is not parked"}
+        
+        _, fee, duration = result
+        return {'ok': True, 'plate': license_plate, 'fee': fee, 'duration': duration}
+    
+    def handle_priority_exit(self, request, writer):
+        license_plate = request.get('plate')
+        if not self.parking_system.add_to_exit_stack(license_plate):
+            return {'ok': False, 'plate': license_plate, 'error': "vehicle is not parked"}
+        
+        # Another connection may have exited the vehicle in between
+        exited = self.parking_system.process_exit_stack()
+        record = self.parking_system.get_vehicle_record(exited) if exited is not None else None
+        if record is None:
+            return {'ok': False, 'plate': license_plate, 'error': "vehicle is not parked"}
+        return {'ok': True, 'plate': exited, 'fee': record['fee'],
+                'duration': record['exit_time'] - record['entry_time']}
+    
+    def handle_cancel(self, request, writer):
+        license_plate = request.get('plate')
+        if not self.parking_system.cancel_queued_vehicle(license_plate):
+            return {'ok': False, 'plate': license_plate, 'error': "vehicle is not queued"}
+        
+        self.waiting.pop(license_plate, None)
+        return {'ok': True, 'plate': license_plate}
+    
+    def handle_stats(self, request, writer):
+        return dict(self.parking_system.get_statistics(), ok=True,
+                    windows=self.parking_system.get_windowed_statistics(),
+                    queue=self.parking_system.get_queue_statistics())
+    
+    def on_slot_occupied(self, event, slot, license_plate):
+        if license_plate in self.waiting:
+            self.assigned.append((license_plate, slot))
+    
+    def notify_assigned(self, assigned):
+        """Tell clients whose queued vehicles were parked, given (license plate, slot) pairs"""
+        for license_plate, slot in assigned:
+            writer = self.waiting.pop(license_plate)
+            self.send(writer, {'event': 'assigned', 'plate': license_plate, 'slot': slot})
+    
+    def process(self, line, writer):
+        """Handle one request line and return the response"""
+        try:
+            request = json.loads(line)
+            handler = self.handlers[request['op']]
+        except (ValueError, KeyError, TypeError):
+            return {'ok': False, 'error': "invalid request"}
+        
+        # Plates and classes go into the queue and the event log as strings
+        if any(request.get(key) is not None and not isinstance(request[key], str) for key in ('plate', 'class')):
+            response = {'ok': False, 'error': "invalid request"}
+        else:
+            # A failing request gets an error response instead of dropping the client's connection
+            try:
+                response = handler(request, writer)
+            except Exception as error:
+                response = {'ok': False, 'error': f"request failed: {error}"}
+        
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+    
+    async def wait_durable(self):
+        """Wait for the group commit of everything logged so far, without blocking other clients"""
+        event_log = self.parking_system.event_log
+        if event_log is not None:
+            await asyncio.to_thread(event_log.wait_synced, event_log.appended)
+    
+    async def handle_client(self, reader, writer):
+        """Serve one gate connection until it closes"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                
+                # The vehicles parked by this request are taken before waiting, while other
+                # clients' requests run and add their own
+                response = self.process(line, writer)
+                assigned, self.assigned = self.assigned, []
+                await self.wait_durable()
+                self.send(writer, response)
+                self.notify_assigned(assigned)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        """Start listening and return the asyncio server"""
+        if unix_path is not None:
+            return await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        return await asyncio.start_server(self.handle_client, host, port)
+
+async def serve(args):
+    parking_system = ParkingManagementSystem(total_slots=args.slots, data_dir=args.data_dir)
+    server = await GateServer(parking_system).start(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Gate server listening on {where} with {parking_system.total_slots} slots")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        parking_system.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the parking gate-event server")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP host to bind")
+    parser.add_argument('--port', type=int, default=8765, help="TCP port to bind")
+    parser.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--slots', type=int, default=20, help="number of parking slots")
+    parser.add_argument('--data-dir', help="keep an event log and snapshots here and recover from them")
+    args = parser.parse_args()
+    
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""Fast parser and indexed queries for exported parking_logs_*.txt files.
+
+Each log file is memory-mapped and scanned with one compiled regular expression,
+with files parsed in parallel worker processes. Completed sessions are rebuilt
+from the exit lines (slot and entry time come from earlier lines for the same
+plate when they were logged, otherwise from the logged duration) and written
+to one binary index file: columns sorted by exit time, a plate table and a
+running revenue total. Opening the index memory-maps it, so queries never
+rescan the logs. Rebuilding reuses the sessions of files that have not changed.
+
+    python log_index.py build parking_logs.idx parking_logs_*.txt
+    python log_index.py plate parking_logs.idx FXG-1268
+    python log_index.py revenue parking_logs.idx "2025-04-26 18:00" "2025-04-26 19:00"
+    python log_index.py utilization parking_logs.idx "2025-04-26 18:00" "2025-04-26 20:00"
+"""
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import bisect
+import struct
+import argparse
+import operator
+import itertools
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+# Lines that matter for sessions: parked, automatically exiting and the three exit formats
+LINE_PATTERN = re.compile(
+    rb'^\[(\d{4}-\d\d-\d\d \d\d):(\d\d:\d\d)\] Vehicle (\S+) '
+    rb'(?:entered and parked in slot (\d+)\.|automatically exiting from slot (\d+)\.'
+    rb'|exited(?: from slot (\d+)| from exit stack)?\. Duration: ([\d.]+) min\. Fee: \$([\d.]+))',
+    re.MULTILINE)
+
+# Seconds past the hour of every 'MM:SS'
+MINUTE_SECONDS = {f"{minute:02d}:{second:02d}".encode(): minute * 60 + second
+                  for minute in range(60) for second in range(61)}
+
+MAGIC = b'PARKIDX1'
+
+# Index columns and their array type codes
+COLUMNS = {
+    'exit_times': 'd',
+    'entry_times': 'd',
+    'fees': 'd',
+    'revenue_totals': 'd',  # revenue of the first i sessions, one more entry than sessions
+    'slots': 'i',  # 0-based, -1 when the log does not say
+    'plate_ids': 'I',
+    'source_ids': 'I',
+    'plate_offsets': 'I',  # sessions of plate p are plate_sessions[plate_offsets[p]:plate_offsets[p + 1]]
+    'plate_sessions': 'I'
+}
+
+def parse_log_file(path):
+    """Extract the completed sessions of one log file as (plates, slots, entry times, exit times, fees)"""
+    plates = []
+    slots = array('i')
+    entry_times = array('d')
+    exit_times = array('d')
+    fees = array('d')
+    
+    # Local time of each 'YYYY-MM-DD HH' seen, so only one mktime call is made per hour of log
+    hour_starts = {}
+    
+    # Slot and entry time of vehicles seen parking or leaving, until their exit line
+    known = {}
+    
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return plates, slots, entry_times, exit_times, fees
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            matches = LINE_PATTERN.findall(data)
+    
+    # Plates stay bytes here; only the distinct ones are decoded when the index is written
+    for hour, minute_second, plate, parked_slot, exiting_slot, exit_slot, duration, fee in matches:
+        hour_start = hour_starts.get(hour)
+        if hour_start is None:
+            year, month, day, hour_of_day = map(int, hour.replace(b' ', b'-').split(b'-'))
+            hour_start = hour_starts[hour] = time.mktime((year, month, day, hour_of_day, 0, 0, 0, 0, -1))
+        timestamp = hour_start + MINUTE_SECONDS[minute_second]
+        
+        if parked_slot:
+            known[plate] = (int(parked_slot) - 1, timestamp)
+            continue
+        if exiting_slot:
+            known[plate] = (int(exiting_slot) - 1, known.get(plate, (None, None))[1])
+            continue
+        
+        slot, entry_time = known.pop(plate, (-1, None))
+        if exit_slot:
+            slot = int(exit_slot) - 1
+        if entry_time is None:
+            # Vehicles admitted from the queue have no parked line; durations are rounded to 0.1 min
+            entry_time = timestamp - float(duration) * 60
+        
+        plates.append(plate)
+        slots.append(slot)
+        entry_times.append(entry_time)
+        exit_times.append(timestamp)
+        fees.append(float(fee))
+    
+    return plates, slots, entry_times, exit_times, fees
+
+def source_info(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+def write_index(index_path, sources, sessions):
+    """Sort sessions (plate, slot, entry time, exit time, fee, source id) by exit time and write the index"""
+    sessions.sort(key=lambda session: session[3])
+    plates, slots, entry_times, exit_times, fees, source_ids = zip(*sessions) if sessions else ([],) * 6
+    
+    # Plates are UTF-8 bytes, whose order matches the decoded strings'
+    plate_table = sorted(set(plates))
+    plate_numbers = {plate: plate_id for plate_id, plate in enumerate(plate_table)}
+    plate_ids = list(map(plate_numbers.__getitem__, plates))
+    
+    # Session numbers grouped by plate; the stable sort keeps each group in exit order
+    counts = [0] * (len(plate_table) + 1)
+    for plate_id in plate_ids:
+        counts[plate_id + 1] += 1
+    
+    columns = {
+        'exit_times': exit_times,
+        'entry_times': entry_times,
+        'fees': fees,
+        'revenue_totals': itertools.accumulate(fees, initial=0.0),
+        'slots': slots,
+        'plate_ids': plate_ids,
+        'source_ids': source_ids,
+        'plate_offsets': itertools.accumulate(counts),
+        'plate_sessions': sorted(range(len(plate_ids)), key=plate_ids.__getitem__)
+    }
+    blobs = {name: array(COLUMNS[name], values).tobytes() for name, values in columns.items()}
+    blobs['plates'] = b'\n'.join(plate_table)
+    
+    # Header first, then every column 8-byte aligned so it can be mapped in place
+    layout = {}
+    header = {'sessions': len(sessions), 'sources': sources, 'layout': layout,
+              'max_duration': max(map(operator.sub, exit_times, entry_times), default=0.0)}
+    for _ in range(2):
+        # The header's own length moves the offsets, so lay out twice
+        offset = len(MAGIC) + 8 + len(json.dumps(header).encode())
+        for name, blob in blobs.items():
+            offset += -offset % 8
+            layout[name] = [offset, len(blob)]
+            offset += len(blob)
+    encoded_header = json.dumps(header).encode()
+    
+    temp_path = index_path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(encoded_header)) + encoded_header)
+        for name, blob in blobs.items():
+            f.write(bytes(layout[name][0] - f.tell()))
+            f.write(blob)
+    os.replace(temp_path, index_path)
+
+def build_index(paths, index_path, workers=None):
+    """Parse log files in parallel and write the index; returns (files parsed, files reused)"""
+    sources = [source_info(path) for path in paths]
+    
+    # Sessions of files unchanged since the last build are taken from the existing index
+    sessions = []
+    reused = set()
+    if os.path.exists(index_path):
+        with LogIndex(index_path) as old_index:
+            if old_index.sources == sources:
+                return 0, len(sources)
+            
+            new_ids = {(source['path'], source['size'], source['mtime']): source_id
+                       for source_id, source in enumerate(sources)}
+            old_to_new = [new_ids.get((source['path'], source['size'], source['mtime']))
+                          for source in old_index.sources]
+            reused.update(source_id for source_id in old_to_new if source_id is not None)
+            for session in old_index.raw_sessions():
+                source_id = old_to_new[session[5]]
+                if source_id is not None:
+                    sessions.append(session[:5] + (source_id,))
+    
+    to_parse = [source_id for source_id in range(len(sources)) if source_id not in reused]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parsed = executor.map(parse_log_file, [sources[source_id]['path'] for source_id in to_parse])
+        for source_id, (plates, slots, entry_times, exit_times, fees) in zip(to_parse, parsed):
+            sessions.extend(zip(plates, slots, entry_times, exit_times, fees, [source_id] * len(plates)))
+    
+    write_index(index_path, sources, sessions)
+    return len(to_parse), len(reused)
+
+class LogIndex:
+    """Memory-mapped session index with lookups by plate and time range"""
+    def __init__(self, index_path):
+        self.file = open(index_path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{index_path} is not a parking log index")
+        
+        header_length = struct.unpack_from('<Q', self.data, len(MAGIC))[0]
+        start = len(MAGIC) + 8
+        header = json.loads(self.data[start:start + header_length])
+        self.sources = header['sources']
+        self.max_duration = header['max_duration']
+        
+        # Columns are read in place from the mapping
+        view = memoryview(self.data)
+        self.views = [view]
+        for name, typecode in COLUMNS.items():
+            offset, length = header['layout'][name]
+            column = view[offset:offset + length].cast(typecode)
+            self.views.append(column)
+            setattr(self, name, column)
+        
+        offset, length = header['layout']['plates']
+        self.plates = self.data[offset:offset + length].decode().split('\n') if length else []
+    
+    def __len__(self):
+        return len(self.exit_times)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def session(self, session_id):
+        """One session as a record dict"""
+        slot = self.slots[session_id]
+        return {
+            'license': self.plates[self.plate_ids[session_id]],
+            'slot': slot if slot >= 0 else None,
+            'entry_time': self.entry_times[session_id],
+            'exit_time': self.exit_times[session_id],
+            'fee': self.fees[session_id],
+            'source': self.sources[self.source_ids[session_id]]['path']
+        }
+    
+    def sessions_for(self, license_plate):
+        """Every session of a vehicle, oldest first"""
+        plate_id = bisect.bisect_left(self.plates, license_plate)
+        if plate_id == len(self.plates) or self.plates[plate_id] != license_plate:
+            return []
+        start, end = self.plate_offsets[plate_id], self.plate_offsets[plate_id + 1]
+        return [self.session(session_id) for session_id in self.plate_sessions[start:end]]
+    
+    def raw_sessions(self):
+        """(plate bytes, slot, entry time, exit time, fee, source id) of every session, in exit order"""
+        plates = [plate.encode() for plate in self.plates]
+        return zip(map(plates.__getitem__, self.plate_ids), self.slots, self.entry_times, self.exit_times,
+                   self.fees, self.source_ids)
+    
+    def revenue(self, start, end):
+        """Revenue of the sessions that exited in [start, end)"""
+        lo = bisect.bisect_left(self.exit_times, start)
+        hi = bisect.bisect_left(self.exit_times, end)
+        return self.revenue_totals[hi] - self.revenue_totals[lo]
+    
+    def slot_utilization(self, start, end, bucket_seconds=3600):
+        """Fraction of each bucket (from start) that each slot was occupied: {bucket start: {slot: fraction}}"""
+        utilization = {}
+        
+        # Only sessions that exited after start, and at most max_duration after end, can overlap
+        lo = bisect.bisect_left(self.exit_times, start)
+        hi = bisect.bisect_right(self.exit_times, end + self.max_duration)
+        for session_id in range(lo, hi):
+            slot = self.slots[session_id]
+            entry_time = max(self.entry_times[session_id], start)
+            exit_time = min(self.exit_times[session_id], end)
+            if slot < 0 or entry_time >= exit_time:
+                continue
+            
+            bucket = start + (entry_time - start) // bucket_seconds * bucket_seconds
+            while bucket < exit_time:
+                overlap = min(exit_time, bucket + bucket_seconds) - max(entry_time, bucket)
+                slots = utilization.setdefault(bucket, {})
+                slots[slot] = slots.get(slot, 0.0) + overlap / bucket_seconds
+                bucket += bucket_seconds
+        
+        return dict(sorted(utilization.items()))
+    
+    def close(self):
+        # Column views must be released before the mapping can close
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        self.data.close()
+        self.file.close()
+
+def parse_time(text):
+    """Parse a local 'YYYY-MM-DD HH:MM[:SS]' time into a timestamp"""
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"invalid time: {text!r}")
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and query exported parking logs")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    build = commands.add_parser('build', help="build or refresh an index from log files")
+    build.add_argument('index', help="index file")
+    build.add_argument('logs', nargs='+', help="parking_logs_*.txt files")
+    build.add_argument('--workers', type=int, help="parser processes (default: one per CPU)")
+    
+    plate = commands.add_parser('plate', help="all sessions of a vehicle")
+    plate.add_argument('index', help="index file")
+    plate.add_argument('plate', help="license plate")
+    
+    for name, help_text in (('revenue', "revenue of sessions that exited in a time range"),
+                            ('utilization', "slot utilization by hour over a time range")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('index', help="index file")
+        command.add_argument('start', type=parse_time, help="start time (YYYY-MM-DD HH:MM)")
+        command.add_argument('end', type=parse_time, help="end time (YYYY-MM-DD HH:MM)")
+    
+    args = parser.parse_args()
+    
+    if args.command == 'build':
+        started = time.perf_counter()
+        parsed, reused = build_index(args.logs, args.index, args.workers)
+        with LogIndex(args.index) as index:
+            print(f"Indexed {len(index):,} sessions of {len(index.plates):,} vehicles from {parsed} parsed "
+                  f"and {reused} unchanged files in {time.perf_counter() - started:.2f} s")
+        return
+    
+    with LogIndex(args.index) as index:
+        if args.command == 'plate':
+            sessions = index.sessions_for(args.plate)
+            if not sessions:
+                print(f"No sessions found for {args.plate}")
+                sys.exit(1)
+            for session in sessions:
+                slot = session['slot'] + 1 if session['slot'] is not None else '?'
+                print(f"{format_time(session['entry_time'])} -> {format_time(session['exit_time'])}  "
+                      f"slot {slot}  ${session['fee']:.2f}  {os.path.basename(session['source'])}")
+        elif args.command == 'revenue':
+            print(f"Revenue: ${index.revenue(args.start, args.end):,.2f}")
+        else:
+            for bucket, slots in index.slot_utilization(args.start, args.end).items():
+                busiest = ', '.join(f"{slot + 1}: {fraction:.0%}"
+                                    for slot, fraction in sorted(slots.items(), key=lambda item: -item[1])[:5])
+                print(f"{format_time(bucket)}  {len(slots)} slots used, busiest {busiest}")
+
+if __name__ == "__main__":
+    main()
@@ -2,46 +2,1624 @@ import time
 import random
 import string
 import threading
-from collections import deque
+import heapq
+import bisect
+import os
+import zlib
+import struct
+import pickle
+import contextlib
+import itertools
+import queue
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import tkinter as tk
 from tkinter import ttk, messagebox, font
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 import math
 
-class ParkingManagementSystem:
-    def __init__(self, total_slots=20):
+from session_archive import write_archive
+
+# Vehicle types and colors; records store their index as a small-int code
+VEHICLE_TYPES = ['Car', 'SUV', 'Truck', 'Motorcycle']
+VEHICLE_COLORS = ['Red', 'Blue', 'Green', 'Yellow', 'Black', 'White', 'Silver']
+VEHICLE_TYPE_CODES = {name: code for code, name in enumerate(VEHICLE_TYPES)}
+VEHICLE_COLOR_CODES = {name: code for code, name in enumerate(VEHICLE_COLORS)}
+
+# Priority classes of waiting vehicles, highest priority first
+PRIORITY_CLASSES = ['disabled', 'permit', 'ev', 'regular']
+PRIORITY_CLASS_CODES = {name: code for code, name in enumerate(PRIORITY_CLASSES)}
+
+# Canvas fill of each vehicle color, and the colors light enough to need dark text
+VEHICLE_FILL_COLORS = {
+    'Red': '#ff6666', 'Blue': '#6666ff', 'Green': '#66ff66',
+    'Yellow': '#ffff66', 'Black': '#333333', 'White': '#f0f0f0',
+    'Silver': '#cccccc'
+}
+LIGHT_VEHICLE_COLORS = {'Yellow', 'White', 'Silver'}
+
+# Fee multipliers per vehicle type (base rate is $1 per minute)
+FEE_MULTIPLIERS = {
+    'Car': 1.0,
+    'SUV': 1.2,
+    'Truck': 1.5,
+    'Motorcycle': 0.8
+}
+
+# Characters PlateReader knows, and the font size and margins plates are drawn with
+PLATE_CHARACTERS = string.ascii_uppercase + string.digits + '-'
+PLATE_FONT_SIZE = 24
+PLATE_PADDING = (10, 6)
+PLATE_FONTS = {}
+
+# Reader of each ANPR worker process, set when the process starts
+PROCESS_PLATE_READER = None
+
+class VehicleRecord:
+    """Compact record of a parked vehicle"""
+    __slots__ = ('slot', 'entry_time', 'exit_time', 'expected_stay', 'type_code', 'color_code')
+    
+    def __init__(self, slot, entry_time, expected_stay, vehicle_type, color, exit_time=None):
+        self.slot = slot
+        self.entry_time = entry_time
+        self.exit_time = exit_time
+        self.expected_stay = expected_stay
+        self.type_code = VEHICLE_TYPE_CODES[vehicle_type]
+        self.color_code = VEHICLE_COLOR_CODES[color]
+    
+    @property
+    def vehicle_type(self):
+        return VEHICLE_TYPES[self.type_code]
+    
+    @vehicle_type.setter
+    def vehicle_type(self, vehicle_type):
+        self.type_code = VEHICLE_TYPE_CODES[vehicle_type]
+    
+    @property
+    def color(self):
+        return VEHICLE_COLORS[self.color_code]
+    
+    @color.setter
+    def color(self, color):
+        self.color_code = VEHICLE_COLOR_CODES[color]
+    
+    # Dictionary-style access keeps record['slot'] working for existing callers
+    def __getitem__(self, key):
+        return getattr(self, key)
+    
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+class ParkingZone:
+    """A block of slots (a level or area) filled row by row from its first slot"""
+    def __init__(self, first, rows, cols, x, y):
+        self.first = first
+        self.count = 0
+        self.rows = rows
+        self.cols = cols
+        
+        # Top-left cell of the zone on the lot's grid
+        self.x = x
+        self.y = y
+    
+    def capacity(self):
+        return self.rows * self.cols
+
+class ParkingLayout:
+    """Zones of slots in rows and columns, with the adjacency list of neighbouring slots"""
+    # Shape of the zones add_slots opens once the last zone is full (a 20-slot lot is 4 rows of 5)
+    ZONE_ROWS = 20
+    ZONE_COLS = 5
+    
+    # Zones are placed left to right, one cell apart, in bands at most this many cells wide
+    BAND_WIDTH = 240
+    
+    def __init__(self, total_slots=0):
+        self.zones = []
+        self.zone_starts = []
+        self.total_slots = 0
+        
+        # Graph representation (Adjacency List) of adjacent slots, changed in place as slots come and go
+        self.graph = {}
+        
+        self.add_slots(total_slots)
+    
+    def next_origin(self, cols):
+        """Top-left cell for a new zone cols wide"""
+        if not self.zones:
+            return 0, 0
+        last = self.zones[-1]
+        x = last.x + last.cols + 1
+        if x + cols <= self.BAND_WIDTH:
+            return x, last.y
+        # Start a new band below the tallest zone of the last one
+        band_height = max(zone.rows for zone in self.zones if zone.y == last.y)
+        return 0, last.y + band_height + 1
+    
+    def link(self, a, b):
+        self.graph[a].append(b)
+        self.graph[b].append(a)
+    
+    def fill(self, zone, count):
+        """Add count slots to a zone, connecting each to its left and upper neighbour"""
+        graph = self.graph
+        cols = zone.cols
+        for k in range(zone.count, zone.count + count):
+            slot = zone.first + k
+            graph[slot] = []
+            row, col = divmod(k, cols)
+            if col > 0:
+                self.link(slot, slot - 1)
+            if row > 0:
+                self.link(slot, slot - cols)
+            # Zones are joined through their first slots (the lane or ramp between them)
+            if k == 0 and len(self.zones) > 1:
+                self.link(slot, self.zones[-2].first)
+        zone.count += count
+        self.total_slots += count
+    
+    def add_zone(self, rows=None, cols=None, count=None):
+        """Open a zone of rows x cols after the last one and put count slots (default: all) in it"""
+        rows = rows or self.ZONE_ROWS
+        cols = cols or self.ZONE_COLS
+        count = rows * cols if count is None else count
+        if not 0 < count <= rows * cols:
+            raise ValueError(f"A {rows}x{cols} zone holds 1 to {rows * cols} slots, not {count}")
+        
+        start = self.total_slots
+        x, y = self.next_origin(cols)
+        self.zones.append(ParkingZone(start, rows, cols, x, y))
+        self.zone_starts.append(start)
+        self.fill(self.zones[-1], count)
+        return range(start, self.total_slots)
+    
+    def add_slots(self, count):
+        """Add count slots, filling the last zone before opening new ones; returns the new slots"""
+        start = self.total_slots
+        if self.zones and count > 0:
+            zone = self.zones[-1]
+            self.fill(zone, min(count, zone.capacity() - zone.count))
+        while self.total_slots < start + count:
+            self.add_zone(count=min(start + count - self.total_slots, self.ZONE_ROWS * self.ZONE_COLS))
+        return range(start, self.total_slots)
+    
+    def remove_slots(self, count):
+        """Remove the last count slots and their edges, dropping zones that empty; returns the removed slots"""
+        end = self.total_slots
+        count = min(count, end)
+        graph = self.graph
+        for slot in range(end - 1, end - count - 1, -1):
+            for neighbor in graph.pop(slot):
+                graph[neighbor].remove(slot)
+            zone = self.zones[-1]
+            zone.count -= 1
+            if not zone.count:
+                self.zones.pop()
+                self.zone_starts.pop()
+        self.total_slots -= count
+        return range(self.total_slots, end)
+    
+    def zone_index(self, slot):
+        """Index in zones of the zone holding slot"""
+        return bisect.bisect_right(self.zone_starts, slot) - 1
+    
+    def cell(self, slot):
+        """(column, row) of a slot on the lot's grid"""
+        zone = self.zones[self.zone_index(slot)]
+        row, col = divmod(slot - zone.first, zone.cols)
+        return zone.x + col, zone.y + row
+    
+    def size(self):
+        """(columns, rows) of the grid covering every slot"""
+        return (max((zone.x + min(zone.count, zone.cols) for zone in self.zones), default=0),
+                max((zone.y + -(-zone.count // zone.cols) for zone in self.zones), default=0))
+    
+    def zone_shapes(self):
+        """(rows, cols, slots) of each zone, enough to lay the lot out again"""
+        return [(zone.rows, zone.cols, zone.count) for zone in self.zones]
+    
+    def load(self, shapes):
+        """Lay the lot out again from zone_shapes() (the graph is rebuilt in place)"""
+        self.zones.clear()
+        self.zone_starts.clear()
+        self.graph.clear()
+        self.total_slots = 0
+        for rows, cols, count in shapes:
+            self.add_zone(rows, cols, count)
+
+class SlotAllocator:
+    """Free-slot allocator with a maintained occupancy counter"""
+    def __init__(self, total_slots=20, lowest_first=True):
         # Boolean flags for each parking slot (True = occupied, False = empty)
         self.slot_status = [False] * total_slots
         
-        # Queue (FIFO) for vehicles waiting to entry
-        self.entry_queue = deque()
+        # Min-heap of free slots (lowest free index first, O(log N)) or
+        # a free-list used as a stack (most recently freed first, O(1))
+        self.lowest_first = lowest_first
+        self.free_slots = list(range(total_slots))
+        if not lowest_first:
+            self.free_slots.reverse()
+        
+        # Bitmap of the slots in free_slots, so membership is checked in O(1)
+        self.listed = bytearray(b'\x01') * total_slots
+        
+        self.occupied_count = 0
+        
+        # Decommissioned slots; they stay in free_slots until they reach the top and are dropped
+        self.closed = set()
+        
+        # Guards slot_status, free_slots, listed, occupied_count and closed
+        self.lock = threading.Lock()
+    
+    def free_count(self):
+        """Number of free slots that can be handed out"""
+        return (len(self.slot_status) - self.occupied_count
+                - sum(1 for slot in self.closed if not self.slot_status[slot]))
+    
+    def next_free(self, take):
+        """Drop closed or already taken slots from the top of free_slots and return (or take) the next one, or -1"""
+        free_slots = self.free_slots
+        while free_slots:
+            slot = free_slots[0] if self.lowest_first else free_slots[-1]
+            if not self.slot_status[slot] and slot not in self.closed:
+                if take:
+                    if self.lowest_first:
+                        heapq.heappop(free_slots)
+                    else:
+                        free_slots.pop()
+                    self.listed[slot] = 0
+                return slot
+            if self.lowest_first:
+                heapq.heappop(free_slots)
+            else:
+                free_slots.pop()
+            self.listed[slot] = 0
+        return -1
+    
+    def peek(self, destination=None):
+        """Return the slot the next allocation would use, or -1 if full"""
+        if destination is not None:
+            raise ValueError(f"Destination {destination!r} needs nearest-slot assignment (entry_nodes)")
+        with self.lock:
+            return self.next_free(False)
+    
+    def allocate(self, destination=None):
+        """Take a free slot and mark it occupied, or return -1 if full (destinations need NearestSlotAllocator)"""
+        if destination is not None:
+            raise ValueError(f"Destination {destination!r} needs nearest-slot assignment (entry_nodes)")
+        with self.lock:
+            if self.closed:
+                slot = self.next_free(True)
+                if slot == -1:
+                    return -1
+            elif not self.free_slots:
+                return -1
+            elif self.lowest_first:
+                slot = heapq.heappop(self.free_slots)
+            else:
+                slot = self.free_slots.pop()
+            
+            self.listed[slot] = 0
+            self.slot_status[slot] = True
+            self.occupied_count += 1
+            return slot
+    
+    def release(self, slot):
+        """Mark a slot free again; releasing a free slot is a no-op"""
+        with self.lock:
+            if not self.slot_status[slot]:
+                return False
+            
+            self.slot_status[slot] = False
+            self.occupied_count -= 1
+            
+            if slot in self.closed:
+                return True
+            if self.lowest_first:
+                heapq.heappush(self.free_slots, slot)
+            else:
+                self.free_slots.append(slot)
+            self.listed[slot] = 1
+            return True
+    
+    def set_occupied(self, slot, occupied):
+        """Flip a slot's flag and the counter without touching the free slots (call rebuild() afterwards)"""
+        if self.slot_status[slot] != occupied:
+            self.slot_status[slot] = occupied
+            self.occupied_count += 1 if occupied else -1
+    
+    def rebuild(self):
+        """Recompute the free slots and occupancy counter from slot_status"""
+        with self.lock:
+            # A sorted list is already a valid min-heap
+            self.free_slots = [slot for slot, occupied in enumerate(self.slot_status)
+                               if not occupied and slot not in self.closed]
+            if not self.lowest_first:
+                self.free_slots.reverse()
+            self.listed = bytearray(len(self.slot_status))
+            for slot in self.free_slots:
+                self.listed[slot] = 1
+            self.occupied_count = self.slot_status.count(True)
+    
+    def add_slots(self, count):
+        """Append new free slots at the end of the lot"""
+        with self.lock:
+            start = len(self.slot_status)
+            new_slots = range(start, start + count)
+            self.slot_status.extend([False] * count)
+            self.listed.extend(b'\x01' * count)
+            
+            if self.lowest_first:
+                # New indices are larger than every existing one, so appending keeps the heap valid
+                self.free_slots.extend(new_slots)
+            else:
+                # Keep lower indices on top of the stack
+                self.free_slots[:0] = reversed(new_slots)
+    
+    def remove_slots(self, count):
+        """Drop the last count slots if all of them are free; returns whether they were dropped"""
+        with self.lock:
+            size = len(self.slot_status) - count
+            if count > len(self.slot_status) or any(self.slot_status[size:]):
+                return False
+            
+            del self.slot_status[size:]
+            del self.listed[size:]
+            self.closed = {slot for slot in self.closed if slot < size}
+            self.free_slots = [slot for slot in self.free_slots if slot < size]
+            if self.lowest_first:
+                heapq.heapify(self.free_slots)
+            return True
+    
+    def close_slot(self, slot):
+        """Stop handing out a slot (a vehicle parked in it stays until it leaves); returns False if already closed"""
+        with self.lock:
+            if slot in self.closed:
+                return False
+            self.closed.add(slot)
+            return True
+    
+    def open_slot(self, slot):
+        """Hand out a closed slot again; returns False if it wasn't closed"""
+        with self.lock:
+            if slot not in self.closed:
+                return False
+            self.closed.discard(slot)
+            # A slot closed while free may not have reached the top of free_slots yet
+            if not self.slot_status[slot] and not self.listed[slot]:
+                if self.lowest_first:
+                    heapq.heappush(self.free_slots, slot)
+                else:
+                    self.free_slots.append(slot)
+                self.listed[slot] = 1
+            return True
+
+class NearestSlotAllocator(SlotAllocator):
+    """Free-slot allocator that hands out the free slot nearest to the entry gates or to a destination"""
+    # Distance of slots the graph doesn't connect to a route, after every connected one
+    UNREACHABLE = math.inf
+    
+    def __init__(self, parking_graph, entry_nodes=(0,), destinations=None):
+        super().__init__(len(parking_graph))
+        self.free_slots = None
+        self.listed = None
+        
+        # Adjacency list of the slots; holders update it in place and call add_slots when it grows
+        # and remove_slots before it shrinks
+        self.parking_graph = parking_graph
+        
+        # Slots next to the entry gates (route None) and to each named destination (exits, lifts, ...)
+        self.routes = {None: list(entry_nodes)}
+        self.routes.update(destinations or {})
+        
+        # Per route, hop distance of every slot from the route's nodes and a min-heap of
+        # (distance, slot) of free slots; entries for taken, closed or removed slots, or with a
+        # distance that has since changed, are dropped when they reach the top
+        self.distances = {}
+        self.heaps = {}
+        for route in self.routes:
+            self.build_route(route)
+    
+    def route_distances(self, nodes):
+        """Hop distance of every slot from the nearest of nodes (multi-source BFS)"""
+        size = len(self.slot_status)
+        distances = [self.UNREACHABLE] * size
+        frontier = [node for node in nodes if node < size]
+        for node in frontier:
+            distances[node] = 0
+        
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = []
+            for node in frontier:
+                for neighbor in self.parking_graph[node]:
+                    if neighbor < size and distances[neighbor] == self.UNREACHABLE:
+                        distances[neighbor] = distance
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return distances
+    
+    def relax(self, distances, frontier):
+        """Spread the shorter distances in the (distance, slot) heap frontier; returns the slots that changed"""
+        size = len(self.slot_status)
+        changed = set()
+        while frontier:
+            distance, node = heapq.heappop(frontier)
+            if distance > distances[node]:
+                continue
+            changed.add(node)
+            for neighbor in self.parking_graph[node]:
+                if neighbor < size and distance + 1 < distances[neighbor]:
+                    distances[neighbor] = distance + 1
+                    heapq.heappush(frontier, (distance + 1, neighbor))
+        return changed
+    
+    def build_route(self, route):
+        """Compute a route's distances and its heap (caller holds the lock or owns the allocator)"""
+        self.distances[route] = self.route_distances(self.routes[route])
+        self.fill_heap(route)
+    
+    def fill_heap(self, route):
+        """Rebuild a route's heap from the free slots (caller holds the lock or owns the allocator)"""
+        distances = self.distances[route]
+        self.heaps[route] = heap = [(distances[slot], slot) for slot, occupied in enumerate(self.slot_status)
+                                    if not occupied and slot not in self.closed]
+        heapq.heapify(heap)
+    
+    def push_free(self, route, slots):
+        """Add heap entries with the current distances of the free slots among slots"""
+        distances = self.distances[route]
+        heap = self.heaps[route]
+        for slot in slots:
+            if not self.slot_status[slot] and slot not in self.closed:
+                heapq.heappush(heap, (distances[slot], slot))
+        if len(heap) > 2 * len(self.slot_status):
+            self.fill_heap(route)
+    
+    def extend_route(self, route, start):
+        """Give the slots from start on their distances and let them shorten paths through the older slots"""
+        distances = self.distances[route]
+        size = len(self.slot_status)
+        distances.extend([self.UNREACHABLE] * (size - len(distances)))
+        
+        # Each new slot starts one hop past its nearest older neighbour (or at 0 next to the route)
+        sources = set(self.routes[route])
+        frontier = []
+        for slot in range(start, size):
+            if slot in sources:
+                distance = 0
+            else:
+                distance = min((distances[neighbor] + 1 for neighbor in self.parking_graph[slot]
+                                if neighbor < start), default=self.UNREACHABLE)
+            if distance < distances[slot]:
+                distances[slot] = distance
+                frontier.append((distance, slot))
+        heapq.heapify(frontier)
+        
+        changed = self.relax(distances, frontier)
+        self.push_free(route, changed.union(range(start, size)))
+    
+    def shrink_route(self, route, size):
+        """Drop the distances of slots from size on and repair those that had their shortest path through them"""
+        distances = self.distances[route]
+        graph = self.parking_graph
+        sources = {node for node in self.routes[route] if node < size}
+        
+        # Nearest first, a slot keeps its distance if a remaining neighbour is one hop nearer;
+        # otherwise it is affected and so may be each neighbour it was one hop nearer than
+        candidates = [(distances[neighbor], neighbor) for slot in range(size, len(distances))
+                      for neighbor in graph[slot] if neighbor < size]
+        heapq.heapify(candidates)
+        del distances[size:]
+        checked = set()
+        affected = set()
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if node in checked or distance == self.UNREACHABLE:
+                continue
+            checked.add(node)
+            if node in sources or any(neighbor < size and neighbor not in affected
+                                      and distances[neighbor] == distance - 1 for neighbor in graph[node]):
+                continue
+            affected.add(node)
+            for neighbor in graph[node]:
+                if neighbor < size and distances[neighbor] == distance + 1:
+                    heapq.heappush(candidates, (distance + 1, neighbor))
+        
+        # Affected slots restart from their nearest unaffected neighbour
+        for node in affected:
+            distances[node] = self.UNREACHABLE
+        frontier = []
+        for node in affected:
+            distance = min((distances[neighbor] + 1 for neighbor in graph[node] if neighbor < size),
+                           default=self.UNREACHABLE)
+            if distance < self.UNREACHABLE:
+                distances[node] = distance
+                frontier.append((distance, node))
+        heapq.heapify(frontier)
+        self.relax(distances, frontier)
+        self.push_free(route, affected)
+    
+    def add_destination(self, name, nodes):
+        """Let vehicles ask for the free slot nearest to nodes by name"""
+        with self.lock:
+            self.routes[name] = list(nodes)
+            self.build_route(name)
+    
+    def next_free(self, take, destination=None):
+        """Drop stale entries from the top of a route's heap and return (or take) its nearest free slot, or -1"""
+        if destination not in self.heaps:
+            raise ValueError(f"Unknown destination {destination!r}")
+        heap = self.heaps[destination]
+        distances = self.distances[destination]
+        slot_status = self.slot_status
+        size = len(slot_status)
+        while heap:
+            distance, slot = heap[0]
+            if slot < size and not slot_status[slot] and slot not in self.closed and distances[slot] == distance:
+                if take:
+                    heapq.heappop(heap)
+                return slot
+            heapq.heappop(heap)
+        return -1
+    
+    def peek(self, destination=None):
+        """Return the slot the next allocation would use, or -1 if full"""
+        with self.lock:
+            return self.next_free(False, destination)
+    
+    def allocate(self, destination=None):
+        """Take the free slot nearest to the entry gates (or destination), or return -1 if full"""
+        with self.lock:
+            slot = self.next_free(True, destination)
+            if slot == -1:
+                return -1
+            
+            self.slot_status[slot] = True
+            self.occupied_count += 1
+            return slot
+    
+    def release(self, slot):
+        """Mark a slot free again; releasing a free slot is a no-op"""
+        with self.lock:
+            if not self.slot_status[slot]:
+                return False
+            
+            self.slot_status[slot] = False
+            self.occupied_count -= 1
+            
+            if slot in self.closed:
+                return True
+            for route, heap in self.heaps.items():
+                heapq.heappush(heap, (self.distances[route][slot], slot))
+                # A slot taken through another route stays in this heap, so compact it now and then
+                if len(heap) > 2 * len(self.slot_status):
+                    self.fill_heap(route)
+            return True
+    
+    def rebuild(self):
+        """Recompute the free slots and occupancy counter from slot_status"""
+        with self.lock:
+            for route in self.routes:
+                self.fill_heap(route)
+            self.occupied_count = self.slot_status.count(True)
+    
+    def add_slots(self, count):
+        """Add free slots at the end of the lot once parking_graph includes them"""
+        with self.lock:
+            start = len(self.slot_status)
+            self.slot_status.extend([False] * count)
+            for route in self.routes:
+                self.extend_route(route, start)
+    
+    def remove_slots(self, count):
+        """Drop the last count slots if all of them are free, while parking_graph still has their edges"""
+        with self.lock:
+            size = len(self.slot_status) - count
+            if count > len(self.slot_status) or any(self.slot_status[size:]):
+                return False
+            
+            del self.slot_status[size:]
+            self.closed = {slot for slot in self.closed if slot < size}
+            for route in self.routes:
+                self.shrink_route(route, size)
+            return True
+    
+    def open_slot(self, slot):
+        """Hand out a closed slot again; returns False if it wasn't closed"""
+        with self.lock:
+            if slot not in self.closed:
+                return False
+            self.closed.discard(slot)
+            # Entries left over from before it closed are harmless duplicates
+            for route in self.routes:
+                self.push_free(route, (slot,))
+            return True
+
+class SessionHistory:
+    """Append-only store of completed parking sessions"""
+    FIELDS = ('license', 'slot', 'entry_time', 'exit_time', 'vehicle_type', 'color', 'fee')
+    
+    def __init__(self, max_in_memory=None, spill_path=None):
+        # Completed sessions as compact tuples, oldest first
+        self.sessions = deque()
+        self.first_seq = 0
+        
+        # Hash Tables (license plate -> sequence numbers / file offsets) for lookups
+        self.memory_index = {}
+        self.disk_index = {}
+        
+        # Sessions beyond max_in_memory are spilled to spill_path (or dropped without one)
+        self.max_in_memory = max_in_memory
+        self.spill_path = spill_path
+        self.spill_file = None
+        self.spilled_count = 0
+        
+        # Guards the sessions, both indexes and the spill file
+        self.lock = threading.Lock()
+        
+        # Sessions numbered below saved_seq are in snapshot history chunks; after a restart
+        # they load in the background and readers wait until loaded is set
+        self.saved_seq = 0
+        self.loaded = threading.Event()
+        self.loaded.set()
+    
+    def __len__(self):
+        self.loaded.wait()
+        return self.spilled_count + len(self.sessions)
+    
+    def append(self, license_plate, slot, entry_time, exit_time, vehicle_type, color, fee):
+        """Record a completed session"""
+        with self.lock:
+            seq = self.first_seq + len(self.sessions)
+            self.sessions.append((license_plate, slot, entry_time, exit_time, vehicle_type, color, fee))
+            self.memory_index.setdefault(license_plate, []).append(seq)
+            
+            # Eviction waits until older sessions have loaded so the oldest go first
+            if (self.max_in_memory is not None and len(self.sessions) > self.max_in_memory
+                    and self.loaded.is_set()):
+                self.evict_oldest()
+    
+    def evict_oldest(self):
+        """Move the oldest in-memory session to disk (or drop it); caller holds the lock"""
+        session = self.sessions.popleft()
+        self.first_seq += 1
+        
+        license_plate = session[0]
+        seqs = self.memory_index[license_plate]
+        seqs.pop(0)
+        if not seqs:
+            del self.memory_index[license_plate]
+        
+        if self.spill_path is None:
+            return
+        
+        if self.spill_file is None:
+            self.spill_file = open(self.spill_path, 'a+')
+        
+        offset = self.spill_file.seek(0, 2)
+        self.spill_file.write('\t'.join(repr(v) if isinstance(v, float) else str(v)
+                                         for v in session) + '\n')
+        self.disk_index.setdefault(license_plate, []).append(offset)
+        self.spilled_count += 1
+    
+    def parse_spilled(self, line):
+        """Parse one spilled session line back into a session tuple"""
+        plate, slot, entry_time, exit_time, vehicle_type, color, fee = line.rstrip('\n').split('\t')
+        return (plate, int(slot), float(entry_time), float(exit_time), vehicle_type, color, float(fee))
+    
+    def read_spilled(self, offset):
+        """Read one spilled session back from disk"""
+        self.spill_file.flush()
+        self.spill_file.seek(offset)
+        return self.parse_spilled(self.spill_file.readline())
+    
+    def to_record(self, session):
+        """Expand a compact session tuple into a record dict"""
+        return dict(zip(self.FIELDS, session))
+    
+    def sessions_for(self, license_plate):
+        """Return every completed session of a vehicle, oldest first"""
+        self.loaded.wait()
+        with self.lock:
+            sessions = [self.read_spilled(offset) for offset in self.disk_index.get(license_plate, [])]
+            sessions.extend(self.sessions[seq - self.first_seq]
+                            for seq in self.memory_index.get(license_plate, []))
+        return [self.to_record(session) for session in sessions]
+    
+    def latest(self, license_plate):
+        """Return the most recent completed session of a vehicle, or None"""
+        self.loaded.wait()
+        with self.lock:
+            seqs = self.memory_index.get(license_plate)
+            if seqs:
+                return self.to_record(self.sessions[seqs[-1] - self.first_seq])
+            
+            offsets = self.disk_index.get(license_plate)
+            if offsets:
+                return self.to_record(self.read_spilled(offsets[-1]))
+            return None
+    
+    def __iter__(self):
+        """Iterate over all completed sessions as record dicts, oldest first"""
+        # Snapshot under the lock; sessions appended while iterating are not included
+        self.loaded.wait()
+        with self.lock:
+            spilled_count = self.spilled_count
+            if self.spill_file is not None:
+                self.spill_file.flush()
+            sessions = list(self.sessions)
+        
+        if spilled_count:
+            with open(self.spill_path) as f:
+                for _, line in zip(range(spilled_count), f):
+                    yield self.to_record(self.parse_spilled(line))
+        
+        for session in sessions:
+            yield self.to_record(session)
+    
+    def snapshot_state(self):
+        """Return (counters for a snapshot, (first seq, sessions) completed since the last saved one)"""
+        self.loaded.wait()
+        with self.lock:
+            spill_size = 0
+            if self.spill_file is not None:
+                self.spill_file.flush()
+                spill_size = self.spill_file.seek(0, 2)
+            
+            end_seq = self.first_seq + len(self.sessions)
+            start_seq = max(self.saved_seq, self.first_seq)
+            unsaved = [self.sessions[seq - self.first_seq] for seq in range(start_seq, end_seq)]
+            
+            state = {
+                'first_seq': self.first_seq,
+                'end_seq': end_seq,
+                'spilled_count': self.spilled_count,
+                'spill_size': spill_size
+            }
+            return state, (start_seq, unsaved)
+    
+    def restore_state(self, state):
+        """Continue numbering after a snapshot's sessions; readers wait until load_in_background finishes"""
+        with self.lock:
+            self.first_seq = self.saved_seq = state['end_seq']
+            self.loaded.clear()
+    
+    def load_in_background(self, state, saved_sessions):
+        """Load a snapshot's sessions from saved_sessions(first seq, end seq) on a background thread"""
+        loader = threading.Thread(target=self.load_saved, args=(state, saved_sessions), daemon=True)
+        loader.start()
+    
+    def load_saved(self, state, saved_sessions):
+        """Load a snapshot's sessions, then put the sessions appended since the restart after them"""
+        sessions = deque()
+        memory_index = {}
+        for seq, session in enumerate(saved_sessions(state['first_seq'], state['end_seq']), state['first_seq']):
+            sessions.append(session)
+            memory_index.setdefault(session[0], []).append(seq)
+        
+        disk_index = {}
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            # Sessions spilled after the snapshot are spilled again as the log tail is replayed
+            with open(self.spill_path, 'r+b') as f:
+                f.truncate(state['spill_size'])
+                offset = 0
+                for line in f:
+                    disk_index.setdefault(line.split(b'\t', 1)[0].decode(), []).append(offset)
+                    offset += len(line)
+        
+        with self.lock:
+            for seq, session in enumerate(self.sessions, self.first_seq):
+                memory_index.setdefault(session[0], []).append(seq)
+            sessions.extend(self.sessions)
+            
+            self.sessions = sessions
+            self.first_seq = state['first_seq']
+            self.memory_index = memory_index
+            self.disk_index = disk_index
+            self.spilled_count = state['spilled_count']
+            while self.max_in_memory is not None and len(self.sessions) > self.max_in_memory:
+                self.evict_oldest()
+        self.loaded.set()
+    
+    def clear_spilled(self):
+        """Empty the spill file left by an earlier run, whose sessions are about to be replayed"""
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            open(self.spill_path, 'w').close()
+    
+    def close(self):
+        """Close the spill file"""
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+class DepartureScheduler:
+    """Min-heap of expected departures keyed on entry_time + expected_stay"""
+    def __init__(self):
+        # Heap of (due_time, sequence, license_plate); cancelled entries are skipped lazily
+        self.heap = []
+        self.sequence = 0
+        
+        # Hash Table (license plate -> sequence of its live heap entry)
+        self.scheduled = {}
+        
+        # Guards the heap and the scheduled table
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.scheduled)
+    
+    def schedule(self, license_plate, due_time):
+        """Schedule (or reschedule) a vehicle's departure"""
+        with self.lock:
+            self.sequence += 1
+            self.scheduled[license_plate] = self.sequence
+            heapq.heappush(self.heap, (due_time, self.sequence, license_plate))
+    
+    def cancel(self, license_plate):
+        """Cancel a vehicle's departure in O(1); its heap entry is dropped when it surfaces"""
+        with self.lock:
+            if self.scheduled.pop(license_plate, None) is None:
+                return False
+            
+            # Rebuild once cancelled entries dominate the heap
+            if len(self.heap) > 2 * len(self.scheduled) + 64:
+                self.heap = [entry for entry in self.heap if self.scheduled.get(entry[2]) == entry[1]]
+                heapq.heapify(self.heap)
+            return True
+    
+    def next_due_time(self):
+        """Return the earliest live due time, or None if nothing is scheduled"""
+        with self.lock:
+            while self.heap and self.scheduled.get(self.heap[0][2]) != self.heap[0][1]:
+                heapq.heappop(self.heap)
+            return self.heap[0][0] if self.heap else None
+    
+    def pop_due(self, current_time):
+        """Remove and return the vehicles due at or before current_time, earliest first"""
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= current_time:
+                due_time, sequence, license_plate = heapq.heappop(self.heap)
+                if self.scheduled.get(license_plate) == sequence:
+                    del self.scheduled[license_plate]
+                    due.append(license_plate)
+        return due
+
+class EntryQueue:
+    """Waiting vehicles in priority classes, highest class first and first come first served within a class"""
+    
+    def __init__(self, limits=None, max_wait=900):
+        # Per class, an ordered dict of license plate -> time queued; its linked list gives O(1)
+        # appends, pops of the longest waiting vehicle and removal of any plate
+        self.classes = {name: OrderedDict() for name in PRIORITY_CLASSES}
+        
+        # License plate -> class, so a cancellation goes straight to the vehicle's queue
+        self.index = {}
+        
+        # Maximum number of waiting vehicles per class (classes not listed are unbounded)
+        self.limits = dict(limits or {})
+        
+        # Vehicles waiting max_wait seconds or more go ahead of higher classes, longest waiting first,
+        # so lower classes wait a bounded time however busy the higher ones are (None turns this off)
+        self.max_wait = max_wait
+        
+        # Per-class outcomes and wait times of vehicles that left the queue
+        self.counters = {name: {'served': 0, 'cancelled': 0, 'rejected': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+                         for name in PRIORITY_CLASSES}
+    
+    def __len__(self):
+        return len(self.index)
+    
+    def __contains__(self, license_plate):
+        return license_plate in self.index
+    
+    def __iter__(self):
+        """Waiting license plates by class, then by time queued"""
+        return itertools.chain.from_iterable(self.classes.values())
+    
+    def push(self, license_plate, priority_class, now):
+        """Queue a vehicle; returns False if it is already waiting or its class is full"""
+        if priority_class not in self.classes:
+            raise ValueError(f"Unknown priority class {priority_class!r}")
+        if license_plate in self.index:
+            return False
+        
+        waiting = self.classes[priority_class]
+        limit = self.limits.get(priority_class)
+        if limit is not None and len(waiting) >= limit:
+            self.counters[priority_class]['rejected'] += 1
+            return False
+        
+        waiting[license_plate] = now
+        self.index[license_plate] = priority_class
+        return True
+    
+    def next_class(self, now):
+        """Class whose longest waiting vehicle is served next, or None if nobody is waiting"""
+        chosen = None
+        overdue = None
+        for name, waiting in self.classes.items():
+            if not waiting:
+                continue
+            if chosen is None:
+                chosen = name
+            if self.max_wait is not None:
+                queued_at = waiting[next(iter(waiting))]
+                if now - queued_at >= self.max_wait and (overdue is None or queued_at < overdue_since):
+                    overdue, overdue_since = name, queued_at
+        return overdue or chosen
+    
+    def pop(self, now):
+        """Remove and return the license plate of the vehicle served next (None if nobody is waiting)"""
+        priority_class = self.next_class(now)
+        if priority_class is None:
+            return None
+        
+        license_plate, queued_at = self.classes[priority_class].popitem(last=False)
+        del self.index[license_plate]
+        
+        counters = self.counters[priority_class]
+        wait = now - queued_at
+        counters['served'] += 1
+        counters['total_wait'] += wait
+        counters['max_wait'] = max(counters['max_wait'], wait)
+        return license_plate
+    
+    def cancel(self, license_plate):
+        """Remove a vehicle whose driver gave up waiting; returns False if it is not queued"""
+        priority_class = self.discard(license_plate)
+        if priority_class is None:
+            return False
+        self.counters[priority_class]['cancelled'] += 1
+        return True
+    
+    def discard(self, license_plate):
+        """Remove a vehicle without counting it; returns its class, or None if it is not queued"""
+        priority_class = self.index.pop(license_plate, None)
+        if priority_class is not None:
+            del self.classes[priority_class][license_plate]
+        return priority_class
+    
+    def restore(self, license_plate, priority_class, queued_at):
+        """Queue a recovered vehicle, regardless of the limits"""
+        self.classes[priority_class][license_plate] = queued_at
+        self.index[license_plate] = priority_class
+    
+    def entries(self):
+        """(license plate, class, time queued) of every waiting vehicle, in iteration order"""
+        return [(license_plate, name, queued_at)
+                for name, waiting in self.classes.items() for license_plate, queued_at in waiting.items()]
+    
+    def statistics(self, now):
+        """Per class: vehicles waiting, the longest current wait, and outcomes and wait times of those that left"""
+        statistics = {}
+        for name, waiting in self.classes.items():
+            counters = self.counters[name]
+            statistics[name] = {
+                'waiting': len(waiting),
+                'limit': self.limits.get(name),
+                'longest_wait': now - waiting[next(iter(waiting))] if waiting else 0.0,
+                'served': counters['served'],
+                'cancelled': counters['cancelled'],
+                'rejected': counters['rejected'],
+                'avg_wait': counters['total_wait'] / counters['served'] if counters['served'] else 0.0,
+                'max_wait': counters['max_wait']
+            }
+        return statistics
+
+class EventLog:
+    """Append-only binary log of state changes, written in segments with group-commit fsync
+
+    append only buffers a record and returns its sequence number; the flusher thread writes
+    everything buffered with one fsync every sync_interval seconds. A record is durable once
+    wait_synced(its sequence) returns, so a caller that acknowledges a change (the gate server
+    replying to a client) waits for it first and a crash can only lose unacknowledged changes.
+    """
+    # Event types (QUEUE records from older logs carry no priority class and join the regular class)
+    PARK, QUEUE, DEQUEUE, EXIT, PUSH, POP, ADD_SLOTS, ENQUEUE, CANCEL = range(1, 10)
+    ADD_ZONE, REMOVE_SLOTS, CLOSE_SLOT, OPEN_SLOT = range(10, 14)
+    
+    # Each record is a header (payload length, CRC-32 of payload) followed by the payload:
+    # the event type byte, its fixed-size fields, then the license plate as UTF-8
+    HEADER = struct.Struct('<II')
+    PARK_FIELDS = struct.Struct('<BIdiBB')  # slot, entry_time, expected_stay, type code, color code
+    EXIT_FIELDS = struct.Struct('<Bdd')  # exit_time, fee
+    ADD_SLOTS_FIELDS = struct.Struct('<BI')  # count (also REMOVE_SLOTS)
+    ADD_ZONE_FIELDS = struct.Struct('<BIII')  # rows, cols, count
+    SLOT_FIELDS = struct.Struct('<BI')  # slot (CLOSE_SLOT, OPEN_SLOT)
+    ENQUEUE_FIELDS = struct.Struct('<BBd')  # priority class code, time queued
+    
+    def __init__(self, directory, sync_interval=0.005, snapshot_every=50000):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, 'snapshot.pkl')
+        
+        # Appended records are buffered and written with one fsync every sync_interval seconds
+        self.sync_interval = sync_interval
+        self.buffer = bytearray()
+        
+        # Sequence numbers of the last record appended and the last one fsynced; synced is
+        # signalled on the condition after every group commit
+        self.appended = 0
+        self.synced = 0
+        self.synced_condition = threading.Condition()
+        
+        # Called from the flusher thread once snapshot_every events were logged since the last snapshot
+        self.snapshot_every = snapshot_every
+        self.since_snapshot = 0
+        self.snapshot_callback = None
+        
+        self.segment = None
+        self.file = None
+        self.flusher = None
+        self.stopping = threading.Event()
+        
+        # lock guards the buffer and counter; io_lock serializes writes, fsyncs and rotation
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
+    
+    def segment_path(self, segment):
+        return os.path.join(self.directory, f"events-{segment:06d}.log")
+    
+    def segments(self):
+        """Numbers of the log segments on disk, oldest first"""
+        return sorted(int(name[7:-4]) for name in os.listdir(self.directory)
+                      if name.startswith('events-') and name.endswith('.log'))
+    
+    def append(self, payload):
+        """Buffer one record; returns its sequence number (durable at the next group commit)"""
+        record = self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self.lock:
+            self.buffer += record
+            self.since_snapshot += 1
+            self.appended += 1
+            return self.appended
+    
+    def log_park(self, license_plate, record):
+        self.append(self.PARK_FIELDS.pack(self.PARK, record.slot, record.entry_time, record.expected_stay,
+                                          record.type_code, record.color_code) + license_plate.encode())
+    
+    def log_exit(self, license_plate, exit_time, fee):
+        self.append(self.EXIT_FIELDS.pack(self.EXIT, exit_time, fee) + license_plate.encode())
+    
+    def log_enqueue(self, license_plate, priority_class, queued_at):
+        self.append(self.ENQUEUE_FIELDS.pack(self.ENQUEUE, PRIORITY_CLASS_CODES[priority_class], queued_at)
+                    + license_plate.encode())
+    
+    def log_plate(self, event_type, license_plate):
+        self.append(bytes((event_type,)) + license_plate.encode())
+    
+    def log_add_slots(self, count):
+        self.append(self.ADD_SLOTS_FIELDS.pack(self.ADD_SLOTS, count))
+    
+    def log_add_zone(self, rows, cols, count):
+        self.append(self.ADD_ZONE_FIELDS.pack(self.ADD_ZONE, rows, cols, count))
+    
+    def log_remove_slots(self, count):
+        self.append(self.ADD_SLOTS_FIELDS.pack(self.REMOVE_SLOTS, count))
+    
+    def log_slot(self, event_type, slot):
+        self.append(self.SLOT_FIELDS.pack(event_type, slot))
+    
+    def decode(self, payload):
+        """Turn a record payload back into an event tuple (event type first)"""
+        event_type = payload[0]
+        if event_type == self.PARK:
+            fields = self.PARK_FIELDS.unpack_from(payload)
+            return fields[:1] + (payload[self.PARK_FIELDS.size:].decode(),) + fields[1:]
+        if event_type == self.EXIT:
+            fields = self.EXIT_FIELDS.unpack_from(payload)
+            return fields[:1] + (payload[self.EXIT_FIELDS.size:].decode(),) + fields[1:]
+        if event_type == self.ENQUEUE:
+            fields = self.ENQUEUE_FIELDS.unpack_from(payload)
+            return fields[:1] + (payload[self.ENQUEUE_FIELDS.size:].decode(),) + fields[1:]
+        if event_type in (self.ADD_SLOTS, self.REMOVE_SLOTS):
+            return self.ADD_SLOTS_FIELDS.unpack_from(payload)
+        if event_type == self.ADD_ZONE:
+            return self.ADD_ZONE_FIELDS.unpack_from(payload)
+        if event_type in (self.CLOSE_SLOT, self.OPEN_SLOT):
+            return self.SLOT_FIELDS.unpack_from(payload)
+        return (event_type, payload[1:].decode())
+    
+    def replay(self, first_segment):
+        """Yield every logged event from first_segment on, dropping a torn write at the tail"""
+        segments = [segment for segment in self.segments() if segment >= first_segment]
+        for segment in segments:
+            path = self.segment_path(segment)
+            with open(path, 'rb') as f:
+                data = f.read()
+            
+            offset = 0
+            while offset + self.HEADER.size <= len(data):
+                length, checksum = self.HEADER.unpack_from(data, offset)
+                start = offset + self.HEADER.size
+                payload = data[start:start + length]
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                yield self.decode(payload)
+                offset = start + length
+            
+            if offset < len(data):
+                if segment != segments[-1]:
+                    raise ValueError(f"Event log segment {path} is corrupt at byte {offset}")
+                # A crash mid-write leaves a partial record at the end of the last segment
+                with open(path, 'r+b') as f:
+                    f.truncate(offset)
+    
+    def open(self, segment):
+        """Start appending to a segment and start the background group commit"""
+        self.segment = segment
+        self.file = open(self.segment_path(segment), 'ab')
+        self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+        self.flusher.start()
+    
+    def write_buffer(self):
+        """Write and fsync the buffered records; caller holds io_lock"""
+        with self.lock:
+            data = self.buffer
+            self.buffer = bytearray()
+            sequence = self.appended
+        
+        # One fsync commits every record appended since the last one
+        if data:
+            self.file.write(data)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        
+        with self.synced_condition:
+            self.synced = sequence
+            self.synced_condition.notify_all()
+    
+    def sync(self):
+        """Make every record appended so far durable before returning"""
+        with self.io_lock:
+            self.write_buffer()
+    
+    def wait_synced(self, sequence):
+        """Wait until the record numbered sequence is durable; False if the log closed first"""
+        with self.synced_condition:
+            while self.synced < sequence and self.file is not None:
+                self.synced_condition.wait()
+            return self.synced >= sequence
+    
+    def flush_loop(self):
+        while not self.stopping.wait(self.sync_interval):
+            self.sync()
+            if self.snapshot_callback is not None and self.since_snapshot >= self.snapshot_every:
+                self.snapshot_callback()
+        self.sync()
+    
+    def rotate(self):
+        """Finish the current segment and continue in a new one; returns the new segment number"""
+        with self.io_lock:
+            self.write_buffer()
+            self.file.close()
+            self.segment += 1
+            self.file = open(self.segment_path(self.segment), 'ab')
+            self.since_snapshot = 0
+            return self.segment
+    
+    def write_file(self, path, data):
+        """Atomically replace a file with data"""
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    
+    def load_snapshot(self):
+        """Return the latest snapshot, or None if there is none"""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        with open(self.snapshot_path, 'rb') as f:
+            return pickle.load(f)
+    
+    def write_snapshot(self, state, segment, first_seq):
+        """Replace the snapshot, then delete the segments and history chunks it no longer needs"""
+        self.write_file(self.snapshot_path, pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+        
+        for old_segment in self.segments():
+            if old_segment < segment:
+                os.remove(self.segment_path(old_segment))
+        for start_seq, end_seq in self.history_chunks():
+            if end_seq <= first_seq:
+                os.remove(self.history_path(start_seq, end_seq))
+    
+    def history_path(self, start_seq, end_seq):
+        return os.path.join(self.directory, f"history-{start_seq:010d}-{end_seq:010d}.pkl")
+    
+    def history_chunks(self):
+        """(first seq, end seq) of the saved history chunks, oldest first"""
+        return sorted(tuple(int(seq) for seq in name[8:-4].split('-')) for name in os.listdir(self.directory)
+                      if name.startswith('history-') and name.endswith('.pkl'))
+    
+    def write_history(self, start_seq, sessions):
+        """Save the sessions numbered from start_seq as one history chunk"""
+        # Chunks reaching past start_seq were written before a crash and are replaced
+        for old_start, old_end in self.history_chunks():
+            if old_end > start_seq:
+                os.remove(self.history_path(old_start, old_end))
+        
+        self.write_file(self.history_path(start_seq, start_seq + len(sessions)),
+                        pickle.dumps(sessions, pickle.HIGHEST_PROTOCOL))
+    
+    def saved_sessions(self, first_seq, end_seq):
+        """Yield the saved sessions numbered first_seq to end_seq - 1, oldest first"""
+        for start_seq, chunk_end in self.history_chunks():
+            if chunk_end <= first_seq or start_seq >= end_seq:
+                continue
+            with open(self.history_path(start_seq, chunk_end), 'rb') as f:
+                sessions = pickle.load(f)
+            yield from sessions[max(0, first_seq - start_seq):end_seq - start_seq]
+    
+    def close(self):
+        """Stop the group commit thread after a final fsync and close the segment"""
+        if self.file is None:
+            return
+        self.stopping.set()
+        self.flusher.join()
+        self.file.close()
+        with self.synced_condition:
+            self.file = None
+            self.synced_condition.notify_all()
+
+class OperationGate:
+    """Lets state-changing operations run concurrently until a snapshot closes it"""
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.active = 0
+        self.closed = False
+    
+    def __enter__(self):
+        with self.condition:
+            while self.closed:
+                self.condition.wait()
+            self.active += 1
+    
+    def __exit__(self, *exc_info):
+        with self.condition:
+            self.active -= 1
+            if self.closed and not self.active:
+                self.condition.notify_all()
+    
+    def close(self):
+        """Stop new operations and wait for the running ones to finish"""
+        with self.condition:
+            while self.closed:
+                self.condition.wait()
+            self.closed = True
+            while self.active:
+                self.condition.wait()
+    
+    def open(self):
+        """Let operations run again"""
+        with self.condition:
+            self.closed = False
+            self.condition.notify_all()
+
+class QuantileSketch:
+    """Log-bucketed histogram answering quantiles within a fixed relative error"""
+    RELATIVE_ERROR = 0.02
+    GAMMA = (1 + RELATIVE_ERROR) / (1 - RELATIVE_ERROR)
+    LOG_GAMMA = math.log(GAMMA)
+    
+    def __init__(self):
+        # Bucket key -> count; bucket k holds values in (GAMMA ** (k - 1), GAMMA ** k]
+        self.counts = {}
+    
+    @classmethod
+    def key(cls, value):
+        """Bucket key of value (values under a millisecond share the lowest bucket)"""
+        return math.ceil(math.log(max(value, 0.001)) / cls.LOG_GAMMA)
+    
+    def add(self, counts):
+        """Add a key -> count mapping"""
+        for key, count in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+    
+    def remove(self, counts):
+        """Subtract a key -> count mapping that was added earlier"""
+        for key, count in counts.items():
+            remaining = self.counts[key] - count
+            if remaining:
+                self.counts[key] = remaining
+            else:
+                del self.counts[key]
+    
+    def quantiles(self, qs, pending=None):
+        """Estimates of the ascending qs quantiles, counting pending (key -> count) too; costs O(buckets used)"""
+        counts = self.counts
+        if pending:
+            counts = dict(counts)
+            for key, count in pending.items():
+                counts[key] = counts.get(key, 0) + count
+        
+        total = sum(counts.values())
+        if not total:
+            return [0.0] * len(qs)
+        
+        estimates = []
+        keys = sorted(counts)
+        index = 0
+        seen = counts[keys[0]]
+        for q in qs:
+            rank = q * (total - 1)
+            while seen <= rank:
+                index += 1
+                seen += counts[keys[index]]
+            # Midpoint of the bucket in relative terms, so the estimate is within RELATIVE_ERROR
+            estimates.append(2 * self.GAMMA ** keys[index] / (self.GAMMA + 1))
+        return estimates
+
+class RollingWindow:
+    """Stay times and peak occupancy over the most recent closed buckets of a RollingStatistics ring"""
+    
+    def __init__(self, buckets):
+        # Closed buckets in the window; the open bucket completes it
+        self.buckets = buckets - 1
+        self.stay_sketch = QuantileSketch()
+        
+        # (bucket number, peak occupancy) with decreasing peaks, so the window's peak comes first
+        self.peaks = deque()
+
+class RollingStatistics:
+    """Occupancy, arrivals, turnover, revenue and stay times over the last 5 minutes, hour and day"""
+    BUCKET_SECONDS = 10
+    # (name, span in seconds); each window is the latest run of buckets in one ring
+    WINDOWS = (('5m', 300), ('1h', 3600), ('24h', 86400))
+    
+    def __init__(self, now, occupancy=0):
+        self.occupancy = occupancy
+        self.reset(now)
+    
+    def reset(self, now):
+        """Start with empty windows at now"""
+        size = max(span for _, span in self.WINDOWS) // self.BUCKET_SECONDS
+        
+        # Running totals over every closed bucket, and a ring of them as of each of the last closed
+        # buckets, so a window's total is the difference of two entries
+        self.total_arrivals = 0
+        self.total_exits = 0
+        self.total_revenue = 0.0
+        self.total_stay_time = 0.0
+        self.total_occupied_time = 0.0  # slot-seconds
+        self.arrivals = [0] * size
+        self.exits = [0] * size
+        self.revenue = [0.0] * size
+        self.stay_time = [0.0] * size
+        self.occupied_time = [0.0] * size
+        self.stays = [None] * size  # quantile sketch key -> count of each bucket, None without exits
+        self.closed = 0  # buckets closed so far; bucket n is kept at n % size
+        
+        self.windows = {name: RollingWindow(span // self.BUCKET_SECONDS) for name, span in self.WINDOWS}
+        
+        # The open bucket, with occupancy accounted up to last_time
+        self.started = now
+        self.bucket_start = now - now % self.BUCKET_SECONDS
+        self.last_time = now
+        self.open_bucket()
+    
+    def open_bucket(self):
+        self.bucket_arrivals = 0
+        self.bucket_exits = 0
+        self.bucket_revenue = 0.0
+        self.bucket_stay_time = 0.0
+        self.bucket_occupied_time = 0.0
+        self.bucket_peak = self.occupancy
+        self.bucket_stays = {}
+    
+    def close_bucket(self):
+        """Add the open bucket to the ring, dropping the buckets that left each window from its sketch and peaks"""
+        number = self.closed
+        position = number % len(self.stays)
+        stays = self.bucket_stays or None
+        peak = self.bucket_peak
+        
+        for window in self.windows.values():
+            if stays:
+                window.stay_sketch.add(stays)
+            peaks = window.peaks
+            while peaks and peaks[-1][1] <= peak:
+                peaks.pop()
+            peaks.append((number, peak))
+            
+            expired = number - window.buckets
+            if expired >= 0:
+                old = self.stays[expired % len(self.stays)]
+                if old:
+                    window.stay_sketch.remove(old)
+                if peaks[0][0] <= expired:
+                    peaks.popleft()
+        
+        self.total_arrivals += self.bucket_arrivals
+        self.total_exits += self.bucket_exits
+        self.total_revenue += self.bucket_revenue
+        self.total_stay_time += self.bucket_stay_time
+        self.total_occupied_time += self.bucket_occupied_time
+        self.arrivals[position] = self.total_arrivals
+        self.exits[position] = self.total_exits
+        self.revenue[position] = self.total_revenue
+        self.stay_time[position] = self.total_stay_time
+        self.occupied_time[position] = self.total_occupied_time
+        self.stays[position] = stays
+        self.closed += 1
+        self.open_bucket()
+    
+    def advance(self, now, occupancy):
+        """Account the occupancy up to now, then switch to the new occupancy"""
+        bucket_end = self.bucket_start + self.BUCKET_SECONDS
+        if now >= bucket_end:
+            if now - bucket_end >= len(self.stays) * self.BUCKET_SECONDS:
+                # Every bucket would expire over so long a gap
+                self.reset(now)
+                bucket_end = self.bucket_start + self.BUCKET_SECONDS
+            
+            while now >= bucket_end:
+                self.bucket_occupied_time += self.occupancy * (bucket_end - self.last_time)
+                self.last_time = bucket_end
+                self.close_bucket()
+                self.bucket_start = bucket_end
+                bucket_end += self.BUCKET_SECONDS
+        
+        if now > self.last_time:
+            self.bucket_occupied_time += self.occupancy * (now - self.last_time)
+            self.last_time = now
+        self.occupancy = occupancy
+        if occupancy > self.bucket_peak:
+            self.bucket_peak = occupancy
+    
+    def record_entries(self, now, count, occupancy):
+        self.advance(now, occupancy)
+        self.bucket_arrivals += count
+    
+    def record_exits(self, now, sessions, occupancy):
+        """Add (fee, duration) sessions that ended at now"""
+        self.advance(now, occupancy)
+        stays = self.bucket_stays
+        for fee, duration in sessions:
+            self.bucket_revenue += fee
+            self.bucket_stay_time += duration
+            key = QuantileSketch.key(duration)
+            stays[key] = stays.get(key, 0) + 1
+        self.bucket_exits += len(sessions)
+    
+    def summary(self, now, total_slots):
+        """Window name -> metrics, from the running totals and the open bucket"""
+        self.advance(now, self.occupancy)
+        
+        summary = {}
+        for name, window in self.windows.items():
+            # Totals of the closed buckets before the window, if any, come off the running totals
+            arrivals = self.total_arrivals + self.bucket_arrivals
+            exits = self.total_exits + self.bucket_exits
+            revenue = self.total_revenue + self.bucket_revenue
+            stay_time = self.total_stay_time + self.bucket_stay_time
+            occupied_time = self.total_occupied_time + self.bucket_occupied_time
+            before = self.closed - 1 - window.buckets
+            if before >= 0:
+                position = before % len(self.stays)
+                arrivals -= self.arrivals[position]
+                exits -= self.exits[position]
+                revenue -= self.revenue[position]
+                stay_time -= self.stay_time[position]
+                occupied_time -= self.occupied_time[position]
+            
+            # Until the window has filled it only covers the time since the statistics started
+            covered = min(window.buckets * self.BUCKET_SECONDS + now - self.bucket_start, now - self.started)
+            p50, p90, p99 = window.stay_sketch.quantiles((0.5, 0.9, 0.99), self.bucket_stays)
+            summary[name] = {
+                'span': (window.buckets + 1) * self.BUCKET_SECONDS,
+                'arrivals': arrivals,
+                'exits': exits,
+                # Rates need a bucket of history so the first few arrivals don't extrapolate wildly
+                'arrival_rate': arrivals * 3600 / max(covered, self.BUCKET_SECONDS),
+                'avg_occupancy': occupied_time / covered if covered > 0 else self.occupancy,
+                'peak_occupancy': max(window.peaks[0][1] if window.peaks else 0, self.bucket_peak),
+                'turnover': exits / total_slots if total_slots else 0.0,
+                'revenue': revenue if exits else 0.0,
+                'avg_stay_time': stay_time / exits if exits else 0.0,
+                'stay_p50': p50,
+                'stay_p90': p90,
+                'stay_p99': p99
+            }
+        return summary
+
+class ChangeBus:
+    """Publish/subscribe notifications of parking state changes"""
+    SLOT_OCCUPIED = 'slot_occupied'  # (slot, license plate)
+    SLOT_FREED = 'slot_freed'  # (slot, license plate)
+    QUEUE_CHANGED = 'queue_changed'
+    STACK_CHANGED = 'stack_changed'
+    STATS_CHANGED = 'stats_changed'
+    LAYOUT_CHANGED = 'layout_changed'  # (total slots)
+    EVENTS = (SLOT_OCCUPIED, SLOT_FREED, QUEUE_CHANGED, STACK_CHANGED, STATS_CHANGED, LAYOUT_CHANGED)
+    
+    def __init__(self):
+        # Event -> tuple of callbacks; tuples are replaced rather than changed so publishing needs no lock
+        self.subscribers = {event: () for event in self.EVENTS}
+        self.lock = threading.Lock()
+    
+    def subscribe(self, callback, *events):
+        """Call callback(event, *details) for each of events (default: all) on the publishing thread"""
+        with self.lock:
+            for event in events or self.EVENTS:
+                self.subscribers[event] += (callback,)
+    
+    def unsubscribe(self, callback):
+        """Stop calling callback"""
+        with self.lock:
+            for event, callbacks in self.subscribers.items():
+                self.subscribers[event] = tuple(c for c in callbacks if c != callback)
+    
+    def publish(self, event, *details):
+        for callback in self.subscribers[event]:
+            callback(event, *details)
+
+class ParkingManagementSystem:
+    def __init__(self, total_slots=20, lowest_first=True, history_in_memory=None, history_spill_path=None,
+                 clock=time.time, rng=random, data_dir=None, snapshot_every=50000, entry_queue=None,
+                 entry_nodes=None, destinations=None, stay_sampler=None):
+        # Injectable time source and random generator (wall clock and module-level random by default)
+        self.clock = clock
+        self.rng = rng
+        
+        # Draws a vehicle's expected stay in seconds from rng (20 to 120 s uniformly by default)
+        self.stay_sampler = stay_sampler
+        
+        # Zones, rows and columns of slots, and the graph (Adjacency List) of adjacent slots
+        self.total_slots = total_slots
+        self.layout = ParkingLayout(total_slots)
+        self.parking_graph = self.layout.graph
+        
+        # Slot allocator keeps the free slots and occupancy counter in sync with slot_status;
+        # with entry_nodes (the slots next to the entry gates) it hands out the nearest free slot,
+        # to the gates or to one of the destinations, which need entry_nodes
+        if destinations and entry_nodes is None:
+            raise ValueError("destinations need entry_nodes (nearest-slot assignment)")
+        if entry_nodes is not None:
+            self.slot_allocator = NearestSlotAllocator(self.parking_graph, entry_nodes, destinations)
+        else:
+            self.slot_allocator = SlotAllocator(total_slots, lowest_first)
+        
+        # Boolean flags for each parking slot (True = occupied, False = empty)
+        self.slot_status = self.slot_allocator.slot_status
+        
+        # Queue of vehicles waiting to enter, by priority class (any object with EntryQueue's methods)
+        self.entry_queue = entry_queue if entry_queue is not None else EntryQueue()
         
         # Stack (LIFO) for priority exit in compact areas
         self.exit_stack = []
         
-        # Hash Table (Dictionary) for vehicle records
+        # Hash Table (Dictionary) for active vehicle records (vehicles currently parked)
         self.vehicle_records = {}
         
-        # Graph representation (Adjacency List) for visualization
-        self.parking_graph = {i: [] for i in range(total_slots)}
+        # Append-only history of completed sessions
+        self.history = SessionHistory(history_in_memory, history_spill_path)
         
-        # Connect adjacent parking spots in the graph
-        rows = 4
-        cols = total_slots // rows
-        for i in range(total_slots):
-            row, col = i // cols, i % cols
-            # Connect to spots in same row
-            if col > 0:
-                self.parking_graph[i].append(i-1)
-            if col < cols - 1:
-                self.parking_graph[i].append(i+1)
-            # Connect to spots in same column
-            if row > 0:
-                self.parking_graph[i].append(i-cols)
-            if row < rows - 1:
-                self.parking_graph[i].append(i+cols)
+        # Scheduler (Min-Heap) of expected departures for automatic exits
+        self.departures = DepartureScheduler()
+        
+        # Reverse index (slot -> license plate) of currently parked vehicles
+        self.slot_vehicles = {}
+        
+        # Change tracking for incremental status queries (slot -> version of last change)
+        self.status_version = 0
+        self.slot_changes = {}
+        
+        # Change notifications, published after the locks below are released
+        self.changes = ChangeBus()
+        
+        # Per-structure locks so concurrent gates only contend on the structures they touch
+        # (the allocator, history and departure scheduler carry their own locks)
+        self.records_lock = threading.Lock()  # vehicle_records and slot_vehicles
+        self.queue_lock = threading.Lock()  # entry_queue
+        self.stack_lock = threading.Lock()  # exit_stack
+        self.status_lock = threading.Lock()  # status_version and slot_changes
+        self.stats_lock = threading.Lock()  # stats and revenue
         
-        self.total_slots = total_slots
         self.revenue = 0.0
         self.stats = {
             'total_entries': 0,
@@ -50,182 +1628,1512 @@ class ParkingManagementSystem:
             'avg_stay_time': 0,
             'total_stay_time': 0
         }
+        
+        # Write-ahead event log and snapshots for crash recovery (state is in memory only without data_dir)
+        self.event_log = None
+        self.operation_gate = contextlib.nullcontext()
+        if data_dir is not None:
+            self.operation_gate = OperationGate()
+            self.snapshot_lock = threading.Lock()
+            event_log = EventLog(data_dir, snapshot_every=snapshot_every)
+            segment = self.recover(event_log)
+            
+            self.event_log = event_log
+            event_log.snapshot_callback = self.save_snapshot
+            event_log.open(segment)
+        
+        # Time-windowed statistics, kept up to date with each entry and exit from here on
+        self.rolling_stats = RollingStatistics(self.clock(), self.slot_allocator.occupied_count)
+    
+    def add_slots(self, count):
+        """Increase the lot's capacity by count slots, filling the last zone before opening new ones"""
+        with self.operation_gate:
+            # Logged first so no entry into a new slot can precede it in the log
+            if self.event_log is not None:
+                self.event_log.log_add_slots(count)
+            self.layout.add_slots(count)
+            self.total_slots += count
+            self.slot_allocator.add_slots(count)
+        
+        self.changes.publish(ChangeBus.LAYOUT_CHANGED, self.total_slots)
+    
+    def add_zone(self, rows, cols, count=None):
+        """Add a zone (a level or area) of rows x cols slots holding count slots (default: all of them)"""
+        count = rows * cols if count is None else count
+        with self.operation_gate:
+            if self.event_log is not None:
+                self.event_log.log_add_zone(rows, cols, count)
+            self.layout.add_zone(rows, cols, count)
+            self.total_slots += count
+            self.slot_allocator.add_slots(count)
+        
+        self.changes.publish(ChangeBus.LAYOUT_CHANGED, self.total_slots)
+    
+    def remove_slots(self, count):
+        """Shrink the lot by its last count slots; returns False, changing nothing, if any of them is occupied"""
+        with self.operation_gate:
+            # Once the allocator agreed none of the slots can be handed out again
+            if not self.slot_allocator.remove_slots(count):
+                return False
+            if self.event_log is not None:
+                self.event_log.log_remove_slots(count)
+            self.layout.remove_slots(count)
+            self.total_slots -= count
+        
+        self.changes.publish(ChangeBus.LAYOUT_CHANGED, self.total_slots)
+        return True
+    
+    def close_slot(self, slot):
+        """Decommission a slot (e.g. for maintenance); a vehicle parked in it stays until it leaves"""
+        return self.set_slot_open(slot, False)
+    
+    def open_slot(self, slot):
+        """Put a decommissioned slot back in service"""
+        return self.set_slot_open(slot, True)
+    
+    def set_slot_open(self, slot, is_open):
+        """Close or reopen a slot; returns False if it already was"""
+        with self.operation_gate:
+            if is_open:
+                changed = self.slot_allocator.open_slot(slot)
+            else:
+                changed = self.slot_allocator.close_slot(slot)
+            if changed and self.event_log is not None:
+                self.event_log.log_slot(EventLog.OPEN_SLOT if is_open else EventLog.CLOSE_SLOT, slot)
+        
+        if changed:
+            self.mark_slot_changed(slot)
+            self.changes.publish(ChangeBus.LAYOUT_CHANGED, self.total_slots)
+        return changed
+    
+    def load_layout(self, shapes):
+        """Lay an empty lot out again from ParkingLayout.zone_shapes() (used by recovery)"""
+        self.slot_allocator.remove_slots(self.total_slots)
+        self.layout.load(shapes)
+        self.total_slots = self.layout.total_slots
+        self.slot_allocator.add_slots(self.total_slots)
+    
+    def subscribe(self, callback, *events):
+        """Call callback(event, *details) after each change of the given ChangeBus events (default: all)"""
+        self.changes.subscribe(callback, *events)
+    
+    def unsubscribe(self, callback):
+        """Stop sending change notifications to callback"""
+        self.changes.unsubscribe(callback)
+    
+    def generate_license_plate(self):
+        """String processing to generate random license plate"""
+        letters = ''.join(self.rng.choices(string.ascii_uppercase, k=3))
+        numbers = ''.join(self.rng.choices(string.digits, k=4))
+        return f"{letters}-{numbers}"
+    
+    def is_slot_available(self):
+        """Check if any parking slot is available"""
+        return self.slot_allocator.free_count() > 0
+    
+    def get_available_slot(self, destination=None):
+        """Get the index of the parking slot the next vehicle (heading for destination) would get"""
+        return self.slot_allocator.peek(destination)
+    
+    def park_vehicle(self, license_plate, slot):
+        """Record a vehicle in an allocated slot (caller updates statistics); False if the plate is already parked"""
+        entry_time = self.clock()
+        
+        # Generate a random vehicle type
+        vehicle_type = self.rng.choice(VEHICLE_TYPES)
+        color = self.rng.choice(VEHICLE_COLORS)
+        # Random stay duration in whole seconds
+        if self.stay_sampler is None:
+            expected_stay = self.rng.randint(20, 120)
+        else:
+            expected_stay = max(1, round(self.stay_sampler(self.rng)))
+        
+        # Store vehicle record in hash table
+        record = VehicleRecord(slot, entry_time, expected_stay, vehicle_type, color)
+        with self.records_lock:
+            # Two gates entering the same plate at once: the second gives its slot back
+            duplicate = license_plate in self.vehicle_records
+            if not duplicate:
+                if self.event_log is not None:
+                    self.event_log.log_park(license_plate, record)
+                self.vehicle_records[license_plate] = record
+                self.slot_vehicles[slot] = license_plate
+                
+                # Scheduled under the lock so an exit racing this entry cannot leave a stale departure
+                self.departures.schedule(license_plate, entry_time + expected_stay)
+        
+        if duplicate:
+            self.slot_allocator.release(slot)
+            return False
+        
+        self.mark_slot_changed(slot)
+        self.changes.publish(ChangeBus.SLOT_OCCUPIED, slot, license_plate)
+        return True
+    
+    def release_vehicle(self, license_plate):
+        """Free a parked vehicle's slot and move it to history (caller updates statistics)"""
+        # Removing the record is what claims the exit, so only one gate can exit a vehicle
+        with self.records_lock:
+            record = self.vehicle_records.pop(license_plate, None)
+            if record is None:
+                return None
+            
+            slot = record.slot
+            if self.slot_vehicles.get(slot) == license_plate:
+                del self.slot_vehicles[slot]
+            
+            record.exit_time = self.clock()
+            duration = record.exit_time - record.entry_time
+            fee = self.calculate_fee(duration, record.vehicle_type)
+            
+            # Logged under the lock so a re-entry of the same plate cannot precede it in the log
+            if self.event_log is not None:
+                self.event_log.log_exit(license_plate, record.exit_time, fee)
+            
+            # Cancelled under the lock too, or it could cancel the departure of a re-entry of the plate
+            self.departures.cancel(license_plate)
+        
+        # Move the session from the active table to history
+        self.history.append(license_plate, slot, record.entry_time, record.exit_time,
+                            record.vehicle_type, record.color, fee)
+        
+        # Free up the slot last so it cannot be handed out while still indexed
+        self.slot_allocator.release(slot)
+        self.mark_slot_changed(slot)
+        self.changes.publish(ChangeBus.SLOT_FREED, slot, license_plate)
+        return fee, duration
+    
+    def is_vehicle_present(self, license_plate):
+        """Check if a vehicle is parked, waiting in the entry queue or on the exit stack"""
+        return (license_plate in self.vehicle_records or license_plate in self.entry_queue
+                or license_plate in self.exit_stack)
+    
+    def admit_vehicle(self, license_plate, priority_class='regular', destination=None):
+        """Park a vehicle in a free slot or add it to the entry queue; returns the slot or None"""
+        # A plate already in the lot is a duplicate (or misread) entry and is turned away; it
+        # would otherwise overwrite the parked vehicle's record and leak its slot
+        if self.is_vehicle_present(license_plate):
+            return None
+        
+        slot = self.slot_allocator.allocate(destination)
+        if slot == -1:
+            # Retry under the queue lock: a concurrent exit either frees a slot this
+            # retry gets, or drains the queue after this vehicle has joined it
+            with self.queue_lock:
+                slot = self.slot_allocator.allocate(destination)
+                if slot == -1:
+                    queued_at = self.clock()
+                    queued = self.entry_queue.push(license_plate, priority_class, queued_at)
+                    if queued and self.event_log is not None:
+                        self.event_log.log_enqueue(license_plate, priority_class, queued_at)
+            
+            if slot == -1:
+                # A vehicle that didn't fit in its class's queue is turned away
+                if queued:
+                    self.changes.publish(ChangeBus.QUEUE_CHANGED)
+                return None
+        
+        if not self.park_vehicle(license_plate, slot):
+            return None
+        return slot
+    
+    def admit_waiting_vehicle(self):
+        """Park the next vehicle from the entry queue if a slot is free; returns True if one was parked"""
+        with self.queue_lock:
+            if not self.entry_queue:
+                return False
+            
+            slot = self.slot_allocator.allocate()
+            if slot == -1:
+                return False
+            license_plate = self.entry_queue.pop(self.clock())
+            if self.event_log is not None:
+                self.event_log.log_plate(EventLog.DEQUEUE, license_plate)
+        
+        self.changes.publish(ChangeBus.QUEUE_CHANGED)
+        return self.park_vehicle(license_plate, slot)
+    
+    def cancel_queued_vehicle(self, license_plate):
+        """Remove a vehicle whose driver gave up waiting from the entry queue; returns False if it is not queued"""
+        with self.queue_lock:
+            if not self.entry_queue.cancel(license_plate):
+                return False
+            if self.event_log is not None:
+                self.event_log.log_plate(EventLog.CANCEL, license_plate)
+        
+        self.changes.publish(ChangeBus.QUEUE_CHANGED)
+        return True
+    
+    def update_peak_occupancy(self):
+        """Record the current occupancy if it is a new peak (caller holds stats_lock)"""
+        current_occupancy = self.slot_allocator.occupied_count
+        if current_occupancy > self.stats['peak_occupancy']:
+            self.stats['peak_occupancy'] = current_occupancy
+    
+    def record_entries(self, count):
+        """Add entries to the statistics"""
+        with self.stats_lock:
+            self.stats['total_entries'] += count
+            self.update_peak_occupancy()
+            self.rolling_stats.record_entries(self.clock(), count, self.slot_allocator.occupied_count)
+        self.changes.publish(ChangeBus.STATS_CHANGED)
+    
+    def record_exits(self, sessions):
+        """Add (fee, duration) of exited vehicles to revenue and statistics"""
+        with self.stats_lock:
+            for fee, duration in sessions:
+                self.revenue += fee
+                self.stats['total_exits'] += 1
+                self.stats['total_stay_time'] += duration
+            if self.stats['total_exits'] > 0:
+                self.stats['avg_stay_time'] = self.stats['total_stay_time'] / self.stats['total_exits']
+            self.rolling_stats.record_exits(self.clock(), sessions, self.slot_allocator.occupied_count)
+        self.changes.publish(ChangeBus.STATS_CHANGED)
+    
+    def vehicle_entry(self, license_plate=None, priority_class='regular', destination=None):
+        """Process vehicle entry with ANPR simulation; a vehicle that finds the lot full waits in its priority class
+        
+        The vehicle gets the free slot nearest to destination, one of the destinations the lot was
+        created with. Nearest-slot assignment needs entry_nodes; without them the lowest (or most
+        recently freed) slot is used and any destination raises ValueError.
+        """
+        if license_plate is None:
+            license_plate = self.generate_license_plate()
+        
+        with self.operation_gate:
+            slot = self.admit_vehicle(license_plate, priority_class, destination)
+            if slot is None:
+                return None
+            
+            # Update statistics
+            self.record_entries(1)
+        
+        return slot
+    
+    def vehicle_entry_batch(self, license_plates, priority_class='regular'):
+        """Process many entries in one pass; returns the slot (or None if not parked) for each vehicle"""
+        slots = []
+        with self.operation_gate:
+            for license_plate in license_plates:
+                if license_plate is None:
+                    license_plate = self.generate_license_plate()
+                slots.append(self.admit_vehicle(license_plate, priority_class))
+            
+            # Update statistics once for the whole batch
+            self.record_entries(len(slots) - slots.count(None))
+        
+        return slots
+    
+    def vehicle_exit(self, license_plate):
+        """Process vehicle exit"""
+        with self.operation_gate:
+            session = self.release_vehicle(license_plate)
+            if session is None:
+                return False
+            
+            # Update statistics
+            self.record_exits([session])
+            
+            # Process waiting vehicles if any
+            if self.admit_waiting_vehicle():
+                self.record_entries(1)
+        
+        fee, duration = session
+        return True, fee, duration
+    
+    def vehicle_exit_batch(self, license_plates):
+        """Process many exits in one pass; returns what vehicle_exit would for each vehicle"""
+        results = []
+        sessions = []
+        entries = 0
+        
+        with self.operation_gate:
+            for license_plate in license_plates:
+                session = self.release_vehicle(license_plate)
+                if session is None:
+                    results.append(False)
+                    continue
+                
+                sessions.append(session)
+                results.append((True,) + session)
+                
+                # Waiting vehicles take freed slots in the same order as sequential exits
+                if self.admit_waiting_vehicle():
+                    entries += 1
+            
+            # Update revenue and statistics once for the whole batch
+            self.record_exits(sessions)
+            if entries:
+                self.record_entries(entries)
+        
+        return results
+    
+    def calculate_fee(self, duration, vehicle_type):
+        """Calculate parking fee based on duration (in seconds) and vehicle type"""
+        # Base rate: $1 per minute
+        base_rate = duration / 60
+        
+        # Apply multiplier based on vehicle type
+        return base_rate * FEE_MULTIPLIERS.get(vehicle_type, 1.0)
+    
+    def add_to_exit_stack(self, license_plate):
+        """Add vehicle to priority exit stack"""
+        if license_plate in self.vehicle_records:
+            with self.operation_gate, self.stack_lock:
+                if self.event_log is not None:
+                    self.event_log.log_plate(EventLog.PUSH, license_plate)
+                self.exit_stack.append(license_plate)
+            self.changes.publish(ChangeBus.STACK_CHANGED)
+            return True
+        return False
+    
+    def process_exit_stack(self):
+        """Process vehicles in the exit stack (LIFO)"""
+        with self.operation_gate, self.stack_lock:
+            if not self.exit_stack:
+                return None
+            license_plate = self.exit_stack.pop()
+            if self.event_log is not None:
+                self.event_log.log_plate(EventLog.POP, license_plate)
+        
+        self.changes.publish(ChangeBus.STACK_CHANGED)
+        result = self.vehicle_exit(license_plate)
+        return license_plate if result else None
+    
+    def get_vehicle_record(self, license_plate):
+        """Look up a vehicle in the active table, falling back to its latest completed session"""
+        record = self.vehicle_records.get(license_plate)
+        if record is not None:
+            return record
+        return self.history.latest(license_plate)
+    
+    def get_slot_status(self, slot):
+        """Return the visualization status of a single slot"""
+        vehicle_info = None
+        license_plate = self.slot_vehicles.get(slot)
+        # Lock-free read; a vehicle leaving concurrently simply shows up without details
+        rec = self.vehicle_records.get(license_plate) if license_plate is not None else None
+        if rec is not None:
+            vehicle_info = {
+                'license': license_plate,
+                'type': rec.vehicle_type,
+                'color': rec.color,
+                'entry_time': rec.entry_time
+            }
+        
+        return {
+            'slot': slot,
+            'occupied': self.slot_status[slot],
+            'closed': slot in self.slot_allocator.closed,
+            'vehicle': vehicle_info
+        }
+    
+    def get_parking_status(self):
+        """Return current parking status for visualization"""
+        return [self.get_slot_status(i) for i in range(len(self.slot_status))]
+    
+    def mark_slot_changed(self, slot):
+        """Record that a slot changed so incremental views can repaint it"""
+        with self.status_lock:
+            self.status_version += 1
+            # Re-insert so the dict stays ordered by the version of the last change
+            self.slot_changes.pop(slot, None)
+            self.slot_changes[slot] = self.status_version
+    
+    def get_changed_slots(self, since_version):
+        """Return (current version, slots changed after since_version)"""
+        changed = []
+        with self.status_lock:
+            for slot in reversed(self.slot_changes):
+                if self.slot_changes[slot] <= since_version:
+                    break
+                changed.append(slot)
+            version = self.status_version
+        
+        changed.sort()
+        return version, changed
+    
+    def check_vehicles_to_exit(self):
+        """Check if any vehicles should exit based on their expected stay time"""
+        # Only vehicles that became due are popped, so each overdue vehicle is reported once
+        current_time = self.clock()
+        return self.departures.pop_due(current_time)
+    
+    def get_statistics(self):
+        """Get current parking statistics"""
+        with self.stats_lock:
+            return {
+                'total_entries': self.stats['total_entries'],
+                'total_exits': self.stats['total_exits'],
+                'current_occupancy': self.slot_allocator.occupied_count,
+                'peak_occupancy': self.stats['peak_occupancy'],
+                'avg_stay_time': self.stats['avg_stay_time'],
+                'revenue': self.revenue,
+                'queue_length': len(self.entry_queue),
+                'available_slots': self.slot_allocator.free_count()
+            }
+    
+    def get_queue_statistics(self):
+        """Waiting vehicles, current and past wait times and outcomes of the entry queue, per priority class"""
+        with self.queue_lock:
+            return self.entry_queue.statistics(self.clock())
+    
+    def get_windowed_statistics(self):
+        """Statistics over the last 5 minutes, hour and day ('5m', '1h', '24h'), read from running totals"""
+        with self.stats_lock:
+            return self.rolling_stats.summary(self.clock(), self.total_slots)
+    
+    def snapshot_state(self, segment):
+        """Return (compact copy of the state, unsaved history); recovery replays the log from segment on"""
+        history_state, unsaved = self.history.snapshot_state()
+        state = {
+            'segment': segment,
+            'total_slots': self.total_slots,
+            'layout': self.layout.zone_shapes(),
+            'closed': sorted(self.slot_allocator.closed),
+            'records': [(license_plate, record.slot, record.entry_time, record.expected_stay,
+                         record.type_code, record.color_code)
+                        for license_plate, record in self.vehicle_records.items()],
+            'entry_queue': self.entry_queue.entries(),
+            'exit_stack': list(self.exit_stack),
+            'revenue': self.revenue,
+            'stats': dict(self.stats),
+            'history': history_state
+        }
+        return state, unsaved
+    
+    def save_snapshot(self):
+        """Snapshot the system so recovery only replays the events logged after it"""
+        if self.event_log is None:
+            return False
+        
+        with self.snapshot_lock:
+            # Wait for running operations so the snapshot and the log split at the same point
+            self.operation_gate.close()
+            try:
+                segment = self.event_log.rotate()
+                state, (start_seq, sessions) = self.snapshot_state(segment)
+            finally:
+                self.operation_gate.open()
+            
+            # Only the sessions completed since the last snapshot are written out
+            if sessions:
+                self.event_log.write_history(start_seq, sessions)
+            self.event_log.write_snapshot(state, segment, state['history']['first_seq'])
+            self.history.saved_seq = state['history']['end_seq']
+        return True
+    
+    def restore_vehicle(self, license_plate, slot, entry_time, expected_stay, type_code, color_code):
+        """Put a parked vehicle back during recovery"""
+        record = VehicleRecord(slot, entry_time, expected_stay, VEHICLE_TYPES[type_code],
+                               VEHICLE_COLORS[color_code])
+        self.vehicle_records[license_plate] = record
+        self.slot_vehicles[slot] = license_plate
+        self.slot_allocator.set_occupied(slot, True)
+    
+    def restore_state(self, state):
+        """Load a snapshot into a freshly created system"""
+        # Older snapshots only have the number of slots
+        if 'layout' in state:
+            if state['layout'] != self.layout.zone_shapes():
+                self.load_layout(state['layout'])
+            for slot in state['closed']:
+                self.slot_allocator.close_slot(slot)
+        elif state['total_slots'] > self.total_slots:
+            self.add_slots(state['total_slots'] - self.total_slots)
+        
+        for record in state['records']:
+            self.restore_vehicle(*record)
+        for entry in state['entry_queue']:
+            # Older snapshots list plates only, in FIFO order
+            if isinstance(entry, str):
+                entry = (entry, 'regular', self.clock())
+            self.entry_queue.restore(*entry)
+        self.exit_stack.extend(state['exit_stack'])
+        self.revenue = state['revenue']
+        self.stats.update(state['stats'])
+        self.history.restore_state(state['history'])
+    
+    def apply_event(self, event):
+        """Re-apply one logged event during recovery (single-threaded, so statistics skip their lock)"""
+        event_type = event[0]
+        if event_type == EventLog.PARK:
+            self.restore_vehicle(*event[1:])
+            self.stats['total_entries'] += 1
+            self.update_peak_occupancy()
+        elif event_type == EventLog.EXIT:
+            _, license_plate, exit_time, fee = event
+            record = self.vehicle_records.pop(license_plate)
+            if self.slot_vehicles.get(record.slot) == license_plate:
+                del self.slot_vehicles[record.slot]
+            self.slot_allocator.set_occupied(record.slot, False)
+            
+            self.history.append(license_plate, record.slot, record.entry_time, exit_time,
+                                record.vehicle_type, record.color, fee)
+            self.revenue += fee
+            self.stats['total_exits'] += 1
+            self.stats['total_stay_time'] += exit_time - record.entry_time
+        elif event_type == EventLog.ENQUEUE:
+            _, license_plate, class_code, queued_at = event
+            self.entry_queue.restore(license_plate, PRIORITY_CLASSES[class_code], queued_at)
+        elif event_type == EventLog.QUEUE:
+            self.entry_queue.restore(event[1], 'regular', self.clock())
+        elif event_type in (EventLog.DEQUEUE, EventLog.CANCEL):
+            self.entry_queue.discard(event[1])
+        elif event_type == EventLog.PUSH:
+            self.exit_stack.append(event[1])
+        elif event_type == EventLog.POP:
+            self.exit_stack.pop()
+        elif event_type == EventLog.ADD_SLOTS:
+            self.add_slots(event[1])
+        elif event_type == EventLog.ADD_ZONE:
+            self.add_zone(*event[1:])
+        elif event_type == EventLog.REMOVE_SLOTS:
+            self.remove_slots(event[1])
+        elif event_type == EventLog.CLOSE_SLOT:
+            self.slot_allocator.close_slot(event[1])
+        elif event_type == EventLog.OPEN_SLOT:
+            self.slot_allocator.open_slot(event[1])
+    
+    def recover(self, event_log):
+        """Load the latest snapshot, replay the log tail and return the segment to continue in"""
+        segment = 1
+        snapshot = event_log.load_snapshot()
+        if snapshot is not None:
+            self.restore_state(snapshot)
+            segment = snapshot['segment']
+        else:
+            # Without a snapshot the whole log is replayed and spills its sessions again
+            self.history.clear_spilled()
+        
+        for event in event_log.replay(segment):
+            self.apply_event(event)
+        
+        # Averages, free slots and departures are rebuilt once instead of after every event
+        if self.stats['total_exits'] > 0:
+            self.stats['avg_stay_time'] = self.stats['total_stay_time'] / self.stats['total_exits']
+        self.slot_allocator.rebuild()
+        for license_plate, record in self.vehicle_records.items():
+            self.departures.schedule(license_plate, record.entry_time + record.expected_stay)
+        
+        # Older completed sessions are only needed for lookups, so they load after the lot is ready
+        if snapshot is not None:
+            self.history.load_in_background(snapshot['history'], event_log.saved_sessions)
+        
+        return max([segment] + event_log.segments())
+    
+    def close(self):
+        """Snapshot and close the event log, then close the history's spill file"""
+        if self.event_log is not None:
+            self.save_snapshot()
+            self.event_log.close()
+            self.event_log = None
+        self.history.close()
+
+class ActivityLog:
+    """Activity log with a bounded in-memory tail and buffered, rotating files written in the background"""
+    def __init__(self, directory='activity_logs', tail_size=1000, max_file_bytes=10 * 1024 * 1024,
+                 max_files=20, flush_interval=0.5):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        
+        # Ring buffer of the most recent entries for the UI, and the number of entries ever logged
+        self.tail = deque(maxlen=tail_size)
+        self.count = 0
+        
+        # Entries waiting for the writer thread
+        self.pending = []
+        
+        # Each run writes new files that rotate at max_file_bytes, keeping the newest max_files;
+        # exports cover the files from export_from on (this run, or since the last clear)
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.file_number = max(self.file_numbers(), default=0) + 1
+        self.export_from = self.file_number
+        self.file = open(self.file_path(self.file_number), 'a', encoding='utf-8')
+        
+        # lock guards the tail and pending entries; io_lock serializes file writes, rotation and exports
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
+        
+        self.flush_interval = flush_interval
+        self.stopping = threading.Event()
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+    
+    def file_path(self, number):
+        return os.path.join(self.directory, f"activity-{number:06d}.log")
+    
+    def file_numbers(self):
+        """Numbers of the log files on disk, oldest first"""
+        return sorted(int(name[9:-4]) for name in os.listdir(self.directory)
+                      if name.startswith('activity-') and name.endswith('.log'))
+    
+    def log(self, message):
+        """Record one activity and return the formatted entry"""
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        entry = f"[{timestamp}] {message}\n"
+        with self.lock:
+            self.tail.append(entry)
+            self.pending.append(entry)
+            self.count += 1
+        return entry
+    
+    def entries_since(self, seen):
+        """Return (entries logged so far, entries logged after the first `seen` that are still in the tail)"""
+        with self.lock:
+            new = min(self.count - seen, len(self.tail))
+            return self.count, [self.tail[i] for i in range(len(self.tail) - new, len(self.tail))]
+    
+    def write_pending(self):
+        """Append pending entries to the current file in one write; caller holds io_lock"""
+        with self.lock:
+            entries = self.pending
+            self.pending = []
+        
+        if entries:
+            self.file.write(''.join(entries))
+            self.file.flush()
+            if self.file.tell() >= self.max_file_bytes:
+                self.rotate()
+    
+    def rotate(self):
+        """Continue in a new file and delete files beyond max_files; caller holds io_lock"""
+        self.file.close()
+        self.file_number += 1
+        self.file = open(self.file_path(self.file_number), 'a', encoding='utf-8')
+        
+        if self.max_files is not None:
+            for number in self.file_numbers()[:-self.max_files]:
+                os.remove(self.file_path(number))
+    
+    def flush(self):
+        """Write every pending entry to disk"""
+        with self.io_lock:
+            self.write_pending()
+    
+    def write_loop(self):
+        while not self.stopping.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+    
+    def clear(self):
+        """Empty the in-memory tail and start exports from the next entry"""
+        with self.io_lock:
+            self.write_pending()
+            self.rotate()
+            self.export_from = self.file_number
+        with self.lock:
+            self.tail.clear()
+    
+    def export(self, path, chunk_size=1024 * 1024):
+        """Stream the entries logged since startup (or the last clear) from the log files into path"""
+        with self.io_lock:
+            self.write_pending()
+            numbers = [number for number in self.file_numbers() if number >= self.export_from]
+            current_number = self.file_number
+            current_size = self.file.tell()
+        
+        # Copied in chunks without the lock; the current file only up to its size at the export
+        with open(path, 'wb') as out:
+            for number in numbers:
+                remaining = current_size if number == current_number else None
+                with open(self.file_path(number), 'rb') as f:
+                    while remaining is None or remaining > 0:
+                        chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                        if remaining is not None:
+                            remaining -= len(chunk)
+    
+    def close(self):
+        """Stop the writer thread after a final flush and close the current file"""
+        self.stopping.set()
+        self.writer.join()
+        self.file.close()
+
+def plate_font(size=PLATE_FONT_SIZE):
+    """Pillow's built-in font at size (its fixed bitmap font on Pillow before 10.1), loaded once"""
+    if size not in PLATE_FONTS:
+        try:
+            PLATE_FONTS[size] = ImageFont.load_default(size=size)
+        except TypeError:
+            PLATE_FONTS[size] = ImageFont.load_default()
+    return PLATE_FONTS[size]
+
+def render_plate(text, font, paper=255, ink=0):
+    """Grayscale image of a plate reading text; every plate drawn with font has the same height"""
+    pad_x, pad_y = PLATE_PADDING
+    width = math.ceil(font.getlength(text)) + 2 * pad_x
+    height = font.getbbox(PLATE_CHARACTERS)[3] + 2 * pad_y
+    plate = Image.new('L', (width, height), paper)
+    ImageDraw.Draw(plate).text((pad_x, pad_y), text, font=font, fill=ink)
+    return plate
+
+def ink_columns(image, level):
+    """Each column of a grayscale image as a bitmask of its pixels darker than level"""
+    # Transposed, each column is a row of packed bits
+    ink = image.point(lambda value: 255 if value < level else 0, '1').transpose(Image.TRANSPOSE)
+    data = ink.tobytes()
+    stride = (image.height + 7) // 8
+    return [int.from_bytes(data[i:i + stride], 'big') for i in range(0, len(data), stride)]
+
+def start_plate_reader(reader):
+    """ANPR process pool initializer: keep the reader (and the templates it builds) for every frame"""
+    global PROCESS_PLATE_READER
+    PROCESS_PLATE_READER = reader
+
+def read_plate(frame):
+    """Read a frame with this worker process's reader"""
+    return PROCESS_PLATE_READER(frame)
+
+class SyntheticCamera:
+    """Camera frames of plates on a noisy scene, to drive the ANPR pipeline without a camera"""
+    def __init__(self, size=(320, 160), rng=None):
+        self.size = size
+        self.rng = rng or random.Random()
+        self.font = plate_font()
     
-    def generate_license_plate(self):
-        """String processing to generate random license plate"""
-        letters = ''.join(random.choices(string.ascii_uppercase, k=3))
-        numbers = ''.join(random.choices(string.digits, k=4))
-        return f"{letters}-{numbers}"
+    def capture(self, license_plate):
+        """RGB frame with the plate at a random position, in a random shade of paper and ink"""
+        rng = self.rng
+        plate = render_plate(license_plate, self.font, paper=rng.randint(215, 255), ink=rng.randint(0, 60))
+        width, height = max(self.size[0], plate.width), max(self.size[1], plate.height)
+        
+        # Gaussian noise halved, so the scene stays darker than any plate
+        frame = Image.effect_noise((width, height), 40).point(lambda value: value // 2)
+        frame.paste(plate, (rng.randint(0, width - plate.width), rng.randint(0, height - plate.height)))
+        return frame.convert('RGB')
+
+class PlateReader:
+    """Reads the plate in a camera frame by locating the bright plate and matching character templates
     
-    def is_slot_available(self):
-        """Check if any parking slot is available"""
-        return False in self.slot_status
+    Characters are split where a column has no ink, and each piece is compared with templates of
+    PLATE_CHARACTERS drawn in the plate font; a piece that matches no template well (touching
+    characters) is split at the points that read best. Frames without a readable plate give None.
+    Any callable taking a PIL image and returning a plate or None can stand in for it.
+    """
+    PLATE_LEVEL = 180  # plates are at least this bright, the scene around them darker
+    MAX_MISMATCH = 0.3  # share of a character's ink that may differ from its template
     
-    def get_available_slot(self):
-        """Get the index of an available parking slot"""
-        for i, occupied in enumerate(self.slot_status):
-            if not occupied:
-                return i
-        return -1
+    def __init__(self, font_size=PLATE_FONT_SIZE, characters=PLATE_CHARACTERS):
+        self.font_size = font_size
+        self.characters = characters
+        
+        # (character, column bitmasks, ink pixels) per character, built on first use in each process
+        self.templates = None
+        self.plate_height = None
+        self.narrowest = self.widest = None
     
-    def vehicle_entry(self, license_plate=None):
-        """Process vehicle entry with ANPR simulation"""
-        if license_plate is None:
-            license_plate = self.generate_license_plate()
+    def load_templates(self):
+        font = plate_font(self.font_size)
+        templates = []
+        for character in self.characters:
+            plate = render_plate(character, font)
+            columns = ink_columns(plate, 128)
+            inked = [i for i, column in enumerate(columns) if column]
+            templates.append((character, columns[inked[0]:inked[-1] + 1],
+                              sum(bin(column).count('1') for column in columns)))
+        
+        self.plate_height = plate.height
+        self.narrowest = min(len(columns) for _, columns, _ in templates)
+        self.widest = max(len(columns) for _, columns, _ in templates)
+        self.templates = templates
+    
+    def __call__(self, frame):
+        if self.templates is None:
+            self.load_templates()
         
-        if not self.is_slot_available():
-            self.entry_queue.append(license_plate)
+        gray = frame.convert('L')
+        box = gray.point(lambda value: 255 if value >= self.PLATE_LEVEL else 0).getbbox()
+        if box is None:
             return None
         
-        slot = self.get_available_slot()
-        self.slot_status[slot] = True
-        entry_time = time.time()
-        
-        # Generate a random vehicle type
-        vehicle_type = random.choice(['Car', 'SUV', 'Truck', 'Motorcycle'])
-        color = random.choice(['Red', 'Blue', 'Green', 'Yellow', 'Black', 'White', 'Silver'])
-        
-        # Store vehicle record in hash table
-        self.vehicle_records[license_plate] = {
-            'slot': slot,
-            'entry_time': entry_time,
-            'exit_time': None,
-            'expected_stay': random.randint(20, 120),  # Random stay duration in seconds
-            'vehicle_type': vehicle_type,
-            'color': color
-        }
-        
-        # Update statistics
-        self.stats['total_entries'] += 1
-        current_occupancy = sum(self.slot_status)
-        if current_occupancy > self.stats['peak_occupancy']:
-            self.stats['peak_occupancy'] = current_occupancy
-        
-        return slot
+        # Scaled to the template plate height, and thresholded halfway between paper and ink
+        plate = gray.crop(box)
+        if plate.height != self.plate_height:
+            plate = plate.resize((max(1, round(plate.width * self.plate_height / plate.height)),
+                                  self.plate_height))
+        darkest, brightest = plate.getextrema()
+        
+        text = []
+        piece = []
+        for column in ink_columns(plate, (darkest + brightest + 1) // 2) + [0]:
+            if column:
+                piece.append(column)
+            elif piece:
+                read = self.read_piece(piece)
+                if read is None:
+                    return None
+                text.append(read[0])
+                piece = []
+        return ''.join(text) or None
     
-    def vehicle_exit(self, license_plate):
-        """Process vehicle exit"""
-        if license_plate not in self.vehicle_records:
+    def match(self, piece):
+        """(character, mismatch) of the template closest to a piece, aligned on its left or right edge"""
+        best = (None, math.inf)
+        piece_ink = sum(bin(column).count('1') for column in piece)
+        for character, template, template_ink in self.templates:
+            extra = len(template) - len(piece)
+            if abs(extra) > max(2, len(piece) // 4):
+                continue
+            for shift in {0, extra}:
+                wrong = sum(bin(a ^ b).count('1') for a, b in
+                            itertools.zip_longest([0] * shift + piece, [0] * -shift + template, fillvalue=0))
+                mismatch = wrong / (piece_ink + template_ink)
+                if mismatch < best[1]:
+                    best = (character, mismatch)
+        return best
+    
+    def read_piece(self, piece):
+        """(characters, worst mismatch) for a piece of touching characters, or None if unreadable"""
+        character, mismatch = self.match(piece)
+        if mismatch <= self.MAX_MISMATCH:
+            return character, mismatch
+        
+        # Best reading of the first end columns, over the character widths ending there
+        best = [('', 0.0)] + [None] * len(piece)
+        for end in range(1, len(piece) + 1):
+            for start in range(max(0, end - self.widest - 2), end - self.narrowest + 1):
+                if best[start] is None:
+                    continue
+                character, mismatch = self.match(piece[start:end])
+                mismatch = max(mismatch, best[start][1])
+                if mismatch <= self.MAX_MISMATCH and (best[end] is None or mismatch < best[end][1]):
+                    best[end] = (best[start][0] + character, mismatch)
+        return best[-1]
+
+class AnprPipeline:
+    """Reads plates from camera frames on a pool of workers behind a bounded queue
+    
+    submit never waits by default: when max_pending frames are already waiting it returns False and
+    the frame is dropped, so a burst of arrivals can't stall the caller (the Tk event loop). Each
+    worker thread runs the reader, or with processes hands the frame to a process pool and waits,
+    so recognition uses several cores. on_result(plate or None, context, seconds since submit) is
+    called on the worker thread as each frame is read.
+    """
+    LATENCY_SAMPLES = 10000
+    
+    def __init__(self, on_result, reader=None, workers=2, max_pending=32, processes=0):
+        self.on_result = on_result
+        self.reader = reader if reader is not None else PlateReader()
+        self.frames = queue.Queue(maxsize=max_pending)
+        self.executor = None
+        if processes:
+            self.executor = ProcessPoolExecutor(max_workers=processes, initializer=start_plate_reader,
+                                                initargs=(self.reader,))
+        
+        # Frame counts and the latencies of the most recent frames
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(('submitted', 'dropped', 'recognized', 'unreadable', 'failed'), 0)
+        self.latencies = deque(maxlen=self.LATENCY_SAMPLES)
+        self.first_submitted = None
+        self.last_finished = None
+        
+        # Enough threads to keep every process busy
+        self.workers = [threading.Thread(target=self.work, name=f"anpr-{n}", daemon=True)
+                        for n in range(max(workers, processes))]
+        for worker in self.workers:
+            worker.start()
+    
+    def submit(self, frame, context=None, block=False, timeout=None):
+        """Queue a frame for recognition; returns False if the queue is full (the frame is dropped)"""
+        submitted = time.perf_counter()
+        try:
+            self.frames.put((frame, context, submitted), block, timeout)
+        except queue.Full:
+            with self.lock:
+                self.counts['dropped'] += 1
             return False
         
-        record = self.vehicle_records[license_plate]
-        slot = record['slot']
+        with self.lock:
+            self.counts['submitted'] += 1
+            if self.first_submitted is None:
+                self.first_submitted = submitted
+        return True
+    
+    def recognize(self, frame):
+        if self.executor is None:
+            return self.reader(frame)
+        return self.executor.submit(read_plate, frame).result()
+    
+    def work(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                self.frames.task_done()
+                return
+            
+            frame, context, submitted = item
+            try:
+                plate = self.recognize(frame)
+                outcome = 'recognized' if plate else 'unreadable'
+            except Exception:
+                plate, outcome = None, 'failed'
+            finished = time.perf_counter()
+            
+            with self.lock:
+                self.counts[outcome] += 1
+                self.latencies.append(finished - submitted)
+                self.last_finished = finished
+            try:
+                self.on_result(plate, context, finished - submitted)
+            finally:
+                self.frames.task_done()
+    
+    def wait(self):
+        """Block until every queued frame has been read"""
+        self.frames.join()
+    
+    def statistics(self):
+        """Frame counts, frames read per second and latency percentiles in seconds over recent frames"""
+        with self.lock:
+            statistics = dict(self.counts)
+            latencies = sorted(self.latencies)
+            span = (self.last_finished - self.first_submitted) if self.last_finished is not None else 0
+        
+        read = statistics['recognized'] + statistics['unreadable'] + statistics['failed']
+        statistics['pending'] = self.frames.qsize()
+        statistics['throughput'] = read / span if span > 0 else 0.0
+        for name, share in (('latency_p50', 0.5), ('latency_p99', 0.99)):
+            statistics[name] = latencies[min(len(latencies) - 1, int(share * len(latencies)))] if latencies else 0.0
+        statistics['latency_max'] = latencies[-1] if latencies else 0.0
+        return statistics
+    
+    def close(self):
+        """Read the frames already queued, then stop the workers"""
+        for _ in self.workers:
+            self.frames.put(None)
+        for worker in self.workers:
+            worker.join()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+class TkNotifier:
+    """Collects change notifications from any thread and repaints on the Tk thread at most once per frame
+
+    Only the Tk thread makes Tk calls: other threads just add their events to pending under the
+    lock, and a poll on the Tk thread picks them up, every frame while events keep arriving and
+    every IDLE_MS otherwise.
+    """
+    FRAME_MS = 16
+    IDLE_MS = 50
+    
+    def __init__(self, root, repaint):
+        self.root = root
+        self.repaint = repaint  # called on the Tk thread with the set of events since the last frame
+        self.tk_thread = threading.get_ident()
+        self.lock = threading.Lock()
+        self.pending = set()
+        
+        # Whether the next poll is a frame away rather than IDLE_MS
+        self.scheduled = False
+        self.closed = False
+        self.poll_id = root.after(self.IDLE_MS, self.poll)
+    
+    def notify(self, event, *details):
+        """ChangeBus callback"""
+        with self.lock:
+            self.pending.add(event)
+            if self.scheduled or threading.get_ident() != self.tk_thread:
+                return
+            self.scheduled = True
         
-        # Free up the slot
-        self.slot_status[slot] = False
-        record['exit_time'] = time.time()
+        # On the Tk thread an idle poll is brought forward to the next frame
+        self.root.after_cancel(self.poll_id)
+        self.poll_id = self.root.after(self.FRAME_MS, self.poll)
+    
+    def poll(self):
+        with self.lock:
+            events = self.pending
+            self.pending = set()
+            self.scheduled = bool(events)
+        if self.closed:
+            return
+        if events:
+            self.repaint(events)
+        self.poll_id = self.root.after(self.FRAME_MS if events else self.IDLE_MS, self.poll)
+    
+    def close(self):
+        self.closed = True
+        self.root.after_cancel(self.poll_id)
+
+class CarStrip:
+    """Row of vehicles on a canvas (entry queue or exit stack) that keeps its canvas items between updates"""
+    def __init__(self, canvas, fill, empty_text, min_car_width=40, more_first=False):
+        self.canvas = canvas
+        self.fill = fill
+        self.empty_text = empty_text
+        self.min_car_width = min_car_width
+        
+        # Where the "+N more" label goes when not every vehicle fits: before the cars or after them
+        self.more_first = more_first
+        
+        # (rectangle, text) items of each car position and the plate each one shows
+        self.cars = []
+        self.plates = []
+        self.layout = None
+        self.empty_item = None
+        self.more_item = None
+    
+    def visible_count(self, total):
+        """How many of total vehicles to draw at the canvas's current width"""
+        capacity = max(1, int(self.canvas.winfo_width() / self.min_car_width) - 1)
+        if total <= capacity:
+            return total
+        # Leave one position for the "+N more" label
+        return max(0, capacity - 1)
+    
+    def place(self, width, height, count, more):
+        """Move, create or hide car items for a new number of positions or canvas size"""
+        positions = count + (1 if more else 0)
+        car_width = min(80, width / (positions + 1))
+        margin = (width - (positions * car_width)) / (positions + 1)
+        y = height / 2
+        first = 1 if more and self.more_first else 0
+        
+        while len(self.cars) < count:
+            self.cars.append((self.canvas.create_rectangle(0, 0, 0, 0, fill=self.fill, outline="black"),
+                              self.canvas.create_text(0, 0, font=('Arial', 8))))
+            self.plates.append(None)
+        
+        for i, (rect, text) in enumerate(self.cars):
+            if i >= count:
+                self.canvas.itemconfig(rect, state=tk.HIDDEN)
+                self.canvas.itemconfig(text, state=tk.HIDDEN)
+                continue
+            x = margin + (i + first) * (car_width + margin)
+            self.canvas.coords(rect, x, y - 20, x + car_width, y + 20)
+            self.canvas.coords(text, x + car_width / 2, y)
+            self.canvas.itemconfig(rect, state=tk.NORMAL)
+            self.canvas.itemconfig(text, state=tk.NORMAL)
+        
+        more_position = 0 if self.more_first else count
+        self.canvas.coords(self.more_item, margin + more_position * (car_width + margin) + car_width / 2, y)
+        self.canvas.itemconfig(self.more_item, state=tk.NORMAL if more else tk.HIDDEN)
+        self.canvas.coords(self.empty_item, width / 2, y)
+        self.canvas.itemconfig(self.empty_item, state=tk.HIDDEN if count or more else tk.NORMAL)
+    
+    def update(self, plates, total):
+        """Show plates (the visible part of total vehicles), changing only what differs from the last update"""
+        width = self.canvas.winfo_width()
+        if width <= 1:  # Canvas not fully initialized yet
+            return
         
-        duration = record['exit_time'] - record['entry_time']
-        fee = self.calculate_fee(duration, record['vehicle_type'])
-        self.revenue += fee
+        if self.empty_item is None:
+            self.empty_item = self.canvas.create_text(0, 0, text=self.empty_text, fill="gray")
+            self.more_item = self.canvas.create_text(0, 0, fill="gray", font=('Arial', 8))
         
-        # Update statistics
-        self.stats['total_exits'] += 1
-        self.stats['total_stay_time'] += duration
-        if self.stats['total_exits'] > 0:
-            self.stats['avg_stay_time'] = self.stats['total_stay_time'] / self.stats['total_exits']
+        more = total > len(plates)
+        layout = (width, self.canvas.winfo_height(), len(plates), more)
+        if layout != self.layout:
+            self.place(*layout)
+            self.layout = layout
         
-        # Process waiting vehicles if any
-        if self.entry_queue:
-            waiting_vehicle = self.entry_queue.popleft()
-            self.vehicle_entry(waiting_vehicle)
+        for i, license_plate in enumerate(plates):
+            if self.plates[i] != license_plate:
+                self.canvas.itemconfig(self.cars[i][1], text=license_plate)
+                self.plates[i] = license_plate
         
-        return True, fee, duration
+        if more:
+            self.canvas.itemconfig(self.more_item, text=f"+{total - len(plates)} more")
+
+class ParkingMapView:
+    """Scrollable, zoomable parking map that only creates canvas items for what is in view"""
+    # World size of one slot (gap included) and where the slot grid starts
+    SLOT_WIDTH = 100
+    SLOT_HEIGHT = 80
+    GRID_X = 120
+    GRID_Y = 100
     
-    def calculate_fee(self, duration, vehicle_type):
-        """Calculate parking fee based on duration (in seconds) and vehicle type"""
-        # Base rate: $1 per minute
-        base_rate = duration / 60
+    # Below DETAIL_ZOOM each zone of the lot's layout is drawn as one heatmap image
+    DETAIL_ZOOM = 0.75
+    MIN_ZOOM = 0.02
+    MAX_ZOOM = 2.0
+    
+    # Heatmap pixels per slot before scaling, and cell colors
+    CELL_WIDTH = 10
+    CELL_HEIGHT = 8
+    FREE_HEAT = "#d3d3d3"
+    OCCUPIED_HEAT = "#e04848"
+    CLOSED_HEAT = "#707070"
+    
+    def __init__(self, canvas, parking_system, xscrollbar, yscrollbar):
+        self.canvas = canvas
+        self.parking_system = parking_system
+        self.xscrollbar = xscrollbar
+        self.yscrollbar = yscrollbar
+        self.zoom = 1.0
+        self.layout_model = parking_system.layout
+        self.total_slots = 0
+        
+        # Columns and rows of the lot's grid, and the zone shapes the map was laid out for
+        self.cols = 0
+        self.rows = 0
+        self.zone_shapes = []
+        
+        # Slots drawn in detail: slot -> (rect, label, info, road) items, and what each shows
+        self.slot_items = {}
+        self.shown = {}
+        
+        # Zones drawn as heatmaps: zone index -> (image item, label item, PhotoImage);
+        # unscaled images are kept per zone until one of its slots changes
+        self.zone_items = {}
+        self.zone_images = {}
+        
+        # status_version the map was last brought up to date with
+        self.version = None
+        self.refresh_pending = False
+        
+        # Any scroll, from scrollbars, the wheel or zooming, redraws what came into view
+        canvas.config(xscrollcommand=self.on_xscroll, yscrollcommand=self.on_yscroll)
+        xscrollbar.config(command=canvas.xview)
+        yscrollbar.config(command=canvas.yview)
+        canvas.bind('<Configure>', self.on_resize)
+        canvas.bind('<MouseWheel>', self.on_wheel)
+        canvas.bind('<Button-4>', self.on_wheel)
+        canvas.bind('<Button-5>', self.on_wheel)
+    
+    def world_size(self):
+        return (self.GRID_X + self.cols * self.SLOT_WIDTH + 120,
+                self.GRID_Y + self.rows * self.SLOT_HEIGHT + 20)
+    
+    def detailed(self):
+        """Whether slots are drawn individually at the current zoom"""
+        return self.zoom >= self.DETAIL_ZOOM
+    
+    def layout(self, fit=True):
+        """Rebuild the map for the current layout"""
+        width = self.canvas.winfo_width()
+        if width <= 1:  # Canvas not fully initialized yet
+            self.canvas.after(100, lambda: self.layout(fit))
+            return
         
-        # Apply multiplier based on vehicle type
-        multipliers = {
-            'Car': 1.0,
-            'SUV': 1.2,
-            'Truck': 1.5,
-            'Motorcycle': 0.8
-        }
+        self.read_layout()
+        self.zone_images.clear()
         
-        return base_rate * multipliers.get(vehicle_type, 1.0)
+        # Items created from here on read the status at least this new
+        self.version = self.parking_system.status_version
+        
+        if fit:
+            self.zoom = self.fit_zoom()
+        self.apply_zoom()
     
-    def add_to_exit_stack(self, license_plate):
-        """Add vehicle to priority exit stack"""
-        if license_plate in self.vehicle_records:
-            self.exit_stack.append(license_plate)
-            return True
-        return False
+    def read_layout(self):
+        """Take the grid size and zone shapes from the layout; returns (first zone that changed, previous shapes)"""
+        shapes = self.layout_model.zone_shapes()
+        changed = 0
+        while changed < min(len(shapes), len(self.zone_shapes)) and shapes[changed] == self.zone_shapes[changed]:
+            changed += 1
+        
+        self.total_slots = self.layout_model.total_slots
+        self.cols, self.rows = self.layout_model.size()
+        old_shapes, self.zone_shapes = self.zone_shapes, shapes
+        return changed, old_shapes
     
-    def process_exit_stack(self):
-        """Process vehicles in the exit stack (LIFO)"""
-        if not self.exit_stack:
-            return None
+    def relayout(self):
+        """Follow slots and zones added or removed since the last layout, leaving the rest of the map as drawn"""
+        if self.version is None:
+            return
         
-        license_plate = self.exit_stack.pop()
-        result = self.vehicle_exit(license_plate)
-        return license_plate if result[0] else None
+        changed, old_shapes = self.read_layout()
+        
+        # Slots of zones before the first changed one kept their place; so did the slots a changed
+        # zone had and still has if only its number of slots changed
+        first_moved = sum(count for _, _, count in old_shapes[:changed])
+        if changed < min(len(old_shapes), len(self.zone_shapes)) and \
+                old_shapes[changed][:2] == self.zone_shapes[changed][:2]:
+            first_moved += min(old_shapes[changed][2], self.zone_shapes[changed][2])
+        for slot in [slot for slot in self.slot_items if slot >= first_moved]:
+            self.canvas.delete(*self.slot_items.pop(slot))
+            self.shown.pop(slot, None)
+        for zone in range(changed, max(len(old_shapes), len(self.zone_shapes))):
+            self.zone_images.pop(zone, None)
+            if zone in self.zone_items:
+                image_item, label_item, _ = self.zone_items.pop(zone)
+                self.canvas.delete(image_item, label_item)
+        
+        # The lot may have grown wider or taller, which moves the exit
+        self.update_scrollregion()
+        self.draw_fixed()
+        self.refresh()
+        self.update()
     
-    def get_parking_status(self):
-        """Return current parking status for visualization"""
-        status = []
-        for i, occupied in enumerate(self.slot_status):
-            vehicle_info = None
-            if occupied:
-                for lp, rec in self.vehicle_records.items():
-                    if rec['slot'] == i and rec['exit_time'] is None:
-                        vehicle_info = {
-                            'license': lp,
-                            'type': rec['vehicle_type'],
-                            'color': rec['color'],
-                            'entry_time': rec['entry_time']
-                        }
-                        break
-            
-        #     class ModernParkingGUI:
-        #         def __init__(self, root):
-        #             self.root = root
-        #             self.root.title("Smart Parking Management System")
-        #             self.root.geometry("1100x750")
-        #             self.root.configure(bg="#f0f0f0")
-
-        #             # Load Figma Dashboard design as an image
-        #             self.dashboard_image = Image.open("path_to_your_figma_dashboard_image.png")
-        #             self.dashboard_photo = ImageTk.PhotoImage(self.dashboard_image)
-
-        #             # Add the image to the dashboard tab
-        #             self.dashboard_tab = ttk.Frame(self.tab_control, padding=10)
-        #             self.tab_control.add(self.dashboard_tab, text="Dashboard")
-        #             self.dashboard_label = tk.Label(self.dashboard_tab, image=self.dashboard_photo)
-        #             self.dashboard_label.pack(fill=tk.BOTH, expand=True)
-
-        #             # Continue with the rest of your GUI setup...
-        # return status
+    def fit_zoom(self):
+        """Zoom that shows the whole lot, at most the normal size"""
+        world_width, world_height = self.world_size()
+        zoom = min(self.canvas.winfo_width() / world_width, self.canvas.winfo_height() / world_height, 1.0)
+        return max(self.MIN_ZOOM, zoom)
     
-    def check_vehicles_to_exit(self):
-        """Check if any vehicles should exit based on their expected stay time"""
-        current_time = time.time()
-        vehicles_to_exit = []
+    def update_scrollregion(self):
+        """Scroll over the zoomed lot, centred when it is smaller than the canvas"""
+        world_width, world_height = self.world_size()
+        width = world_width * self.zoom
+        height = world_height * self.zoom
+        pad_x = max(0, (self.canvas.winfo_width() - width) / 2)
+        pad_y = max(0, (self.canvas.winfo_height() - height) / 2)
+        self.canvas.config(scrollregion=(-pad_x, -pad_y, width + pad_x, height + pad_y))
+    
+    def apply_zoom(self):
+        """Redraw the fixed features and drop items placed for the previous zoom"""
+        self.canvas.delete("all")
+        self.slot_items.clear()
+        self.shown.clear()
+        self.zone_items.clear()
+        self.update_scrollregion()
+        self.draw_fixed()
+        self.refresh()
+    
+    def draw_fixed(self):
+        """Draw the entry and exit points joined by the road, below everything else"""
+        self.canvas.delete('fixed')
+        z = self.zoom
+        world_width, _ = self.world_size()
+        exit_x = world_width - 100
+        
+        self.canvas.create_rectangle(20 * z, 20 * z, 100 * z, 60 * z, fill="#b3ffb3", outline="black", tags='fixed')
+        self.canvas.create_text(60 * z, 40 * z, text="ENTRY", tags='fixed')
+        self.canvas.create_rectangle(exit_x * z, 20 * z, (exit_x + 80) * z, 60 * z, 
+                                     fill="#ffb3b3", outline="black", tags='fixed')
+        self.canvas.create_text((exit_x + 40) * z, 40 * z, text="EXIT", tags='fixed')
+        self.canvas.create_line(100 * z, 40 * z, exit_x * z, 40 * z, width=3, fill="gray", tags='fixed')
+        self.canvas.tag_lower('fixed')
+    
+    def set_zoom(self, zoom, x=None, y=None):
+        """Zoom keeping the point at window position (x, y), by default the centre, in place"""
+        zoom = min(self.MAX_ZOOM, max(self.MIN_ZOOM, zoom))
+        if zoom == self.zoom:
+            return
+        if x is None:
+            x = self.canvas.winfo_width() / 2
+            y = self.canvas.winfo_height() / 2
+        world_x = self.canvas.canvasx(x) / self.zoom
+        world_y = self.canvas.canvasy(y) / self.zoom
+        
+        self.zoom = zoom
+        self.apply_zoom()
+        
+        left, top, right, bottom = (float(v) for v in self.canvas.cget('scrollregion').split())
+        self.canvas.xview_moveto((world_x * zoom - x - left) / (right - left))
+        self.canvas.yview_moveto((world_y * zoom - y - top) / (bottom - top))
+    
+    def zoom_by(self, factor, x=None, y=None):
+        self.set_zoom(self.zoom * factor, x, y)
+    
+    def zoom_to_fit(self):
+        self.set_zoom(self.fit_zoom())
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+    
+    def on_xscroll(self, first, last):
+        self.xscrollbar.set(first, last)
+        self.schedule_refresh()
+    
+    def on_yscroll(self, first, last):
+        self.yscrollbar.set(first, last)
+        self.schedule_refresh()
+    
+    def on_resize(self, event):
+        if self.version is not None:
+            self.update_scrollregion()
+            self.schedule_refresh()
+    
+    def on_wheel(self, event):
+        """Scroll with the wheel, Shift+wheel scrolls sideways and Ctrl+wheel zooms"""
+        step = -1 if event.num == 4 or getattr(event, 'delta', 0) > 0 else 1
+        if event.state & 0x4:
+            self.zoom_by(1.25 if step < 0 else 0.8, event.x, event.y)
+        elif event.state & 0x1:
+            self.canvas.xview_scroll(step * 3, 'units')
+        else:
+            self.canvas.yview_scroll(step * 3, 'units')
+    
+    def schedule_refresh(self):
+        """Refresh once when the event loop is idle, however many scroll events arrived"""
+        if not self.refresh_pending and self.version is not None:
+            self.refresh_pending = True
+            self.canvas.after_idle(self.refresh)
+    
+    def visible_cells(self):
+        """(first row, last row, first column, last column) of the lot's grid in view"""
+        left = self.canvas.canvasx(0) / self.zoom
+        top = self.canvas.canvasy(0) / self.zoom
+        right = left + self.canvas.winfo_width() / self.zoom
+        bottom = top + self.canvas.winfo_height() / self.zoom
+        
+        first_col = max(0, int((left - self.GRID_X) // self.SLOT_WIDTH))
+        last_col = min(self.cols - 1, int((right - self.GRID_X) // self.SLOT_WIDTH))
+        first_row = max(0, int((top - self.GRID_Y) // self.SLOT_HEIGHT))
+        last_row = min(self.rows - 1, int((bottom - self.GRID_Y) // self.SLOT_HEIGHT))
+        return first_row, last_row, first_col, last_col
+    
+    def visible_zones(self, first_row, last_row, first_col, last_col):
+        """Yield (zone index, zone) for the zones overlapping the given cells"""
+        for index, zone in enumerate(self.layout_model.zones):
+            if (zone.x <= last_col and zone.x + zone.cols > first_col and
+                    zone.y <= last_row and zone.y + zone.rows > first_row):
+                yield index, zone
+    
+    def refresh(self):
+        """Create items for slots or zones that came into view and delete those that left it"""
+        self.refresh_pending = False
+        first_row, last_row, first_col, last_col = self.visible_cells()
+        
+        if self.detailed():
+            visible = set()
+            for _, zone in self.visible_zones(first_row, last_row, first_col, last_col):
+                end = zone.first + zone.count
+                for row in range(max(0, first_row - zone.y), min(zone.rows, last_row - zone.y + 1)):
+                    start = zone.first + row * zone.cols
+                    visible.update(range(max(start, start + first_col - zone.x),
+                                         min(end, start + zone.cols, start + last_col - zone.x + 1)))
+            for slot in [slot for slot in self.slot_items if slot not in visible]:
+                self.canvas.delete(*self.slot_items.pop(slot))
+                self.shown.pop(slot, None)
+            for slot in visible:
+                if slot not in self.slot_items:
+                    self.create_slot(slot)
+        else:
+            visible = {index for index, _ in self.visible_zones(first_row, last_row, first_col, last_col)}
+            for zone in [zone for zone in self.zone_items if zone not in visible]:
+                image_item, label_item, _ = self.zone_items.pop(zone)
+                self.canvas.delete(image_item, label_item)
+            for zone in visible:
+                if zone not in self.zone_items:
+                    self.create_zone(zone)
+    
+    def slot_box(self, slot):
+        """Zoomed canvas coordinates of a slot's rectangle"""
+        col, row = self.layout_model.cell(slot)
+        x1 = self.GRID_X + col * self.SLOT_WIDTH
+        y1 = self.GRID_Y + row * self.SLOT_HEIGHT
+        z = self.zoom
+        return x1 * z, y1 * z, (x1 + self.SLOT_WIDTH - 5) * z, (y1 + self.SLOT_HEIGHT - 5) * z
+    
+    def slot_center(self, slot):
+        x1, y1, x2, y2 = self.slot_box(slot)
+        return (x1 + x2) / 2, (y1 + y2) / 2
+    
+    def entry_point(self):
+        return 60 * self.zoom, 40 * self.zoom
+    
+    def create_slot(self, slot):
+        """Draw one slot in detail"""
+        x1, y1, x2, y2 = self.slot_box(slot)
+        center_x = (x1 + x2) / 2
         
-        for license_plate, record in self.vehicle_records.items():
-            if record['exit_time'] is None:  # If vehicle hasn't exited yet
-                # Check if expected stay time has elapsed
-                if current_time - record['entry_time'] > record['expected_stay']:
-                    vehicles_to_exit.append(license_plate)
+        rect = self.canvas.create_rectangle(x1, y1, x2, y2, outline="black", fill="lightgray", width=2)
+        label = self.canvas.create_text(center_x, y1 + 15 * self.zoom, text=f"Slot {slot + 1}")
+        
+        # Vehicle info stays on the canvas and is updated or hidden as the slot changes
+        info = self.canvas.create_text(center_x, (y1 + y2) / 2, font=('Arial', 8), state=tk.HIDDEN)
+        
+        # Dashed lane to the road (first row) or to the row above
+        lane_end = 40 * self.zoom if self.layout_model.cell(slot)[1] == 0 else y1 - 30 * self.zoom
+        road = self.canvas.create_line(center_x, y1, center_x, lane_end, width=1, fill="gray", dash=(4, 4))
         
-        return vehicles_to_exit
+        self.slot_items[slot] = (rect, label, info, road)
+        self.paint_slot(slot)
     
-    def get_statistics(self):
-        """Get current parking statistics"""
-        return {
-            'total_entries': self.stats['total_entries'],
-            'total_exits': self.stats['total_exits'],
-            'current_occupancy': sum(self.slot_status),
-            'peak_occupancy': self.stats['peak_occupancy'],
-            'avg_stay_time': self.stats['avg_stay_time'],
-            'revenue': self.revenue,
-            'queue_length': len(self.entry_queue),
-            'available_slots': self.slot_status.count(False)
-        }
+    def paint_slot(self, slot):
+        """Bring a drawn slot up to date, touching its items only when its appearance changed"""
+        slot_status = self.parking_system.get_slot_status(slot)
+        
+        # What the slot should show: (fill, vehicle info text, text color)
+        vehicle = slot_status['vehicle'] if slot_status['occupied'] else None
+        if vehicle:
+            shown = (VEHICLE_FILL_COLORS.get(vehicle['color'], '#888888'),
+                     f"{vehicle['license']}\n{vehicle['type']}",
+                     "black" if vehicle['color'] in LIGHT_VEHICLE_COLORS else "white")
+        elif slot_status['occupied']:
+            shown = ("#ff9999", None, None)
+        elif slot_status['closed']:
+            shown = (self.CLOSED_HEAT, "Closed", "white")
+        else:
+            shown = ("lightgray", None, None)
+        
+        if shown == self.shown.get(slot):
+            return
+        self.shown[slot] = shown
+        
+        rect, _, info, _ = self.slot_items[slot]
+        fill, text, text_fill = shown
+        self.canvas.itemconfig(rect, fill=fill)
+        if text is None:
+            self.canvas.itemconfig(info, state=tk.HIDDEN)
+        else:
+            self.canvas.itemconfig(info, text=text, fill=text_fill, state=tk.NORMAL)
+    
+    def zone_image(self, zone):
+        """Unscaled heatmap of a zone and its occupied fraction, cached until one of its slots changes"""
+        cached = self.zone_images.get(zone)
+        if cached is not None:
+            return cached
+        
+        zone_model = self.layout_model.zones[zone]
+        image = Image.new('RGB', (zone_model.cols * self.CELL_WIDTH, zone_model.rows * self.CELL_HEIGHT), 'white')
+        draw = ImageDraw.Draw(image)
+        slot_status = self.parking_system.slot_status
+        closed = self.parking_system.slot_allocator.closed
+        occupied = 0
+        count = zone_model.count
+        for k in range(count):
+            row, col = divmod(k, zone_model.cols)
+            x = col * self.CELL_WIDTH
+            y = row * self.CELL_HEIGHT
+            slot = zone_model.first + k
+            taken = slot_status[slot]
+            fill = self.OCCUPIED_HEAT if taken else self.CLOSED_HEAT if slot in closed else self.FREE_HEAT
+            draw.rectangle((x, y, x + self.CELL_WIDTH - 2, y + self.CELL_HEIGHT - 2), fill=fill)
+            occupied += taken
+        
+        cached = self.zone_images[zone] = (image, occupied / count if count else 0.0)
+        return cached
+    
+    def create_zone(self, zone):
+        """Draw one zone as its heatmap scaled to the current zoom"""
+        zone_model = self.layout_model.zones[zone]
+        x = (self.GRID_X + zone_model.x * self.SLOT_WIDTH) * self.zoom
+        y = (self.GRID_Y + zone_model.y * self.SLOT_HEIGHT) * self.zoom
+        width = max(1, round(zone_model.cols * self.SLOT_WIDTH * self.zoom))
+        height = max(1, round(zone_model.rows * self.SLOT_HEIGHT * self.zoom))
+        
+        image, fraction = self.zone_image(zone)
+        # Shrinking averages the cells into a heat color; growing keeps them sharp
+        resample = Image.BOX if width < image.width else Image.NEAREST
+        photo = ImageTk.PhotoImage(image.resize((width, height), resample))
+        
+        image_item = self.canvas.create_image(x, y, image=photo, anchor=tk.NW)
+        label_item = self.canvas.create_text(x + width / 2, y + height / 2, text=f"{fraction:.0%}",
+                                             font=('Arial', 8, 'bold'))
+        self.zone_items[zone] = (image_item, label_item, photo)
+    
+    def update(self):
+        """Repaint the slots and zones whose status changed since the last update"""
+        if self.version is None:
+            return
+        
+        self.version, changed = self.parking_system.get_changed_slots(self.version)
+        dirty_zones = set()
+        for slot in changed:
+            if slot >= self.total_slots:
+                continue
+            if slot in self.slot_items:
+                self.paint_slot(slot)
+            dirty_zones.add(self.layout_model.zone_index(slot))
+        
+        for zone in dirty_zones:
+            self.zone_images.pop(zone, None)
+            if zone in self.zone_items:
+                image_item, label_item, _ = self.zone_items.pop(zone)
+                self.canvas.delete(image_item, label_item)
+                self.create_zone(zone)
 
 class ModernParkingGUI:
+    # TkNotifier event for plates read by the ANPR workers
+    ANPR_RESULT = 'anpr_result'
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Smart Parking Management System")
@@ -256,8 +3164,18 @@ class ModernParkingGUI:
         self.entry_rate = 8000  # milliseconds between automated entries
         self.exit_check_rate = 5000  # milliseconds between exit checks
         
-        # Initialize the parking system
-        self.parking_system = ParkingManagementSystem(total_slots=20)
+        # Initialize the parking system, recovering the previous run's state from parking_data
+        # Vehicles get the free slot nearest to the entrance, drawn next to slot 1, and completed
+        # sessions beyond the newest 10,000 are spilled to parking_data so memory stays bounded
+        self.parking_system = ParkingManagementSystem(
+            total_slots=20, data_dir='parking_data', entry_nodes=[0], history_in_memory=10000,
+            history_spill_path=os.path.join('parking_data', 'history.tsv'))
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Activity log files are written in the background; the widgets show the newest entries
+        self.activity_log = ActivityLog()
+        self.log_seen = 0
+        self.log_refresh_pending = False
         
         # Create main container
         self.main_container = ttk.Frame(root, padding="10")
@@ -269,12 +3187,27 @@ class ModernParkingGUI:
         # Create tab system
         self.create_tabs()
         
-        # Start the update loop
+        # Start the automation timer
         self.update_timer()
         
+        # Displays repaint from change notifications, at most once per frame
+        self.notifier = TkNotifier(root, self.repaint)
+        self.parking_system.subscribe(self.notifier.notify)
+        
+        # Entry camera frames are read on the ANPR workers; results wait here for the next frame
+        self.camera = SyntheticCamera()
+        self.anpr_results = deque()
+        self.anpr = AnprPipeline(self.on_anpr_result, workers=2, max_pending=16)
+        
         # Initialize dynamic elements
         self.update_statistics()
         self.update_parking_display()
+        self.update_queue_display()
+        self.update_stack_display()
+        
+        recovered = len(self.parking_system.vehicle_records)
+        if recovered:
+            self.log_activity(f"Recovered {recovered} parked vehicles from the previous session.")
         
         # Create car animation variables
         self.car_animation_active = False
@@ -367,6 +3300,31 @@ class ModernParkingGUI:
             
             self.stats_labels[key] = value_label
         
+        # Metrics over the last 5 minutes, hour and day
+        window_frame = ttk.LabelFrame(left_frame, text="Recent Activity", padding=10)
+        window_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        
+        self.window_labels = {}
+        windows = [("5m", "5 min"), ("1h", "1 hour"), ("24h", "24 hours")]
+        metrics = [
+            ("arrival_rate", "Arrivals / hour"),
+            ("avg_occupancy", "Avg Occupancy"),
+            ("turnover", "Turnover"),
+            ("revenue", "Revenue"),
+            ("stay_p50", "Stay p50"),
+            ("stay_p90", "Stay p90"),
+            ("stay_p99", "Stay p99")
+        ]
+        
+        for col, (name, text) in enumerate(windows, start=1):
+            ttk.Label(window_frame, text=text, style='Info.TLabel').grid(row=0, column=col, sticky="e", padx=10)
+        for row, (key, text) in enumerate(metrics, start=1):
+            ttk.Label(window_frame, text=text, style='Info.TLabel').grid(row=row, column=0, sticky="w")
+            for col, (name, _) in enumerate(windows, start=1):
+                value_label = ttk.Label(window_frame, text="0")
+                value_label.grid(row=row, column=col, sticky="e", padx=10)
+                self.window_labels[name, key] = value_label
+        
         # ANPR Camera simulation
         anpr_frame = ttk.LabelFrame(left_frame, text="ANPR Camera", padding=10)
         anpr_frame.pack(fill=tk.BOTH, expand=True)
@@ -393,6 +3351,17 @@ class ModernParkingGUI:
         ttk.Button(control_frame, text="Process Exit Stack", command=self.process_exit_stack, 
                   style='Info.TButton').pack(side=tk.LEFT, padx=5)
         
+        # Priority class of manual entries, used if they have to wait in the entry queue
+        queue_control_frame = ttk.Frame(right_frame)
+        queue_control_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(queue_control_frame, text="Entry Class:").pack(side=tk.LEFT, padx=5)
+        self.priority_class_var = tk.StringVar(value='regular')
+        ttk.Combobox(queue_control_frame, textvariable=self.priority_class_var, values=PRIORITY_CLASSES,
+                     state='readonly', width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Button(queue_control_frame, text="Leave Queue", command=self.leave_queue_dialog, 
+                  style='Warning.TButton').pack(side=tk.LEFT, padx=5)
+        
         # Recent activities log
         log_frame = ttk.LabelFrame(right_frame, text="Recent Activities", padding=10)
         log_frame.pack(fill=tk.BOTH, expand=True)
@@ -431,12 +3400,33 @@ class ModernParkingGUI:
     
     def setup_parking_tab(self):
         """Set up the parking map tab"""
+        # Zoom controls
+        control_frame = ttk.Frame(self.parking_tab)
+        control_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        ttk.Button(control_frame, text="Zoom In", 
+                  command=lambda: self.parking_map.zoom_by(1.25)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Zoom Out", 
+                  command=lambda: self.parking_map.zoom_by(0.8)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Fit", 
+                  command=lambda: self.parking_map.zoom_to_fit()).pack(side=tk.LEFT, padx=5)
+        ttk.Label(control_frame, text="Ctrl+wheel zooms, wheel and Shift+wheel scroll").pack(side=tk.LEFT, padx=10)
+        
         # Create canvas for parking visualization
-        self.parking_canvas = tk.Canvas(self.parking_tab, bg="white")
-        self.parking_canvas.pack(fill=tk.BOTH, expand=True)
+        map_frame = ttk.Frame(self.parking_tab)
+        map_frame.pack(fill=tk.BOTH, expand=True)
+        map_frame.rowconfigure(0, weight=1)
+        map_frame.columnconfigure(0, weight=1)
+        
+        self.parking_canvas = tk.Canvas(map_frame, bg="white")
+        self.parking_canvas.grid(row=0, column=0, sticky="nsew")
+        yscrollbar = ttk.Scrollbar(map_frame, orient=tk.VERTICAL)
+        yscrollbar.grid(row=0, column=1, sticky="ns")
+        xscrollbar = ttk.Scrollbar(map_frame, orient=tk.HORIZONTAL)
+        xscrollbar.grid(row=1, column=0, sticky="ew")
         
         # Set up the parking visualization
-        self.parking_slots = []
+        self.parking_map = ParkingMapView(self.parking_canvas, self.parking_system, xscrollbar, yscrollbar)
         self.draw_parking_layout()
     
     def setup_queue_tab(self):
@@ -450,6 +3440,8 @@ class ModernParkingGUI:
         
         self.queue_canvas = tk.Canvas(queue_frame, height=150, bg="white")
         self.queue_canvas.pack(fill=tk.X)
+        self.queue_strip = CarStrip(self.queue_canvas, "#66b3ff", "Queue is empty")
+        self.queue_canvas.bind('<Configure>', lambda event: self.update_queue_display())
         
         # Exit stack section
         stack_frame = ttk.LabelFrame(self.queue_tab, text="Exit Stack (LIFO)", padding=10)
@@ -457,6 +3449,8 @@ class ModernParkingGUI:
         
         self.stack_canvas = tk.Canvas(stack_frame, height=150, bg="white")
         self.stack_canvas.pack(fill=tk.X)
+        self.stack_strip = CarStrip(self.stack_canvas, "#ff9980", "Stack is empty", more_first=True)
+        self.stack_canvas.bind('<Configure>', lambda event: self.update_stack_display())
     
     def setup_logs_tab(self):
         """Set up the activity logs tab"""
@@ -478,6 +3472,7 @@ class ModernParkingGUI:
         
         ttk.Button(control_frame, text="Clear Logs", command=self.clear_logs).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="Export Logs", command=self.export_logs).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Export Sessions", command=self.export_sessions).pack(side=tk.LEFT, padx=5)
     
     def setup_settings_tab(self):
         """Set up the settings tab"""
@@ -525,18 +3520,35 @@ class ModernParkingGUI:
         self.root.after(1000, self.update_time)
     
     def update_timer(self):
-        """Timer for updating dynamic elements"""
-        self.update_statistics()
-        self.update_parking_display()
-        self.update_queue_display()
-        self.update_stack_display()
-        
+        """Timer for automated exits and windowed statistics; other displays repaint from change notifications"""
         # Check for automated operations if automation is active
         if self.automation_active:
             self.check_automatic_exits()
         
+        # Windowed metrics change as time passes, not only when vehicles move
+        self.update_window_statistics()
+        
         self.root.after(1000, self.update_timer)
     
+    def repaint(self, events):
+        """Repaint the displays affected by the changes since the last frame"""
+        if ChangeBus.LAYOUT_CHANGED in events:
+            self.parking_map.relayout()
+        elif ChangeBus.SLOT_OCCUPIED in events or ChangeBus.SLOT_FREED in events:
+            self.update_parking_display()
+        
+        if self.ANPR_RESULT in events:
+            while self.anpr_results:
+                self.complete_car_entry(*self.anpr_results.popleft())
+        
+        if ChangeBus.QUEUE_CHANGED in events:
+            self.update_queue_display()
+        if ChangeBus.STACK_CHANGED in events:
+            self.update_stack_display()
+        
+        # Occupancy, queue length and available slots are statistics too
+        self.update_statistics()
+    
     def update_statistics(self):
         """Update statistics display"""
         stats = self.parking_system.get_statistics()
@@ -554,208 +3566,88 @@ class ModernParkingGUI:
             
             label.config(text=value)
     
-    def draw_parking_layout(self):
-        """Draw the parking lot layout"""
-        self.parking_canvas.delete("all")
-        
-        width = self.parking_canvas.winfo_width()
-        height = self.parking_canvas.winfo_height()
-        
-        if width <= 1:  # Canvas not fully initialized yet
-            self.root.after(100, self.draw_parking_layout)
-            return
-        
-        # Calculate slot dimensions and layout
-        slots = self.parking_system.total_slots
-        cols = 5
-        rows = math.ceil(slots / cols)
+    def update_window_statistics(self):
+        """Update the recent activity table"""
+        windows = self.parking_system.get_windowed_statistics()
         
-        slot_width = min(width / (cols + 1), 100)
-        slot_height = min(height / (rows + 1), 80)
-        
-        margin_x = (width - (cols * slot_width)) / 2
-        margin_y = (height - (rows * slot_height)) / 2
-        
-        # Draw entry and exit points
-        entry_x = margin_x - 100
-        entry_y = margin_y + slot_height
-        
-        self.parking_canvas.create_rectangle(entry_x, entry_y, entry_x + 80, entry_y + 40, 
-                                           fill="#b3ffb3", outline="black")
-        self.parking_canvas.create_text(entry_x + 40, entry_y + 20, text="ENTRY")
-        
-        exit_x = margin_x + (cols * slot_width) + 20
-        exit_y = margin_y + slot_height
-        
-        self.parking_canvas.create_rectangle(exit_x, exit_y, exit_x + 80, exit_y + 40, 
-                                           fill="#ffb3b3", outline="black")
-        self.parking_canvas.create_text(exit_x + 40, exit_y + 20, text="EXIT")
-        
-        # Draw road
-        road_y = entry_y + 20
-        self.parking_canvas.create_line(entry_x + 80, road_y, exit_x, road_y, 
-                                      width=3, fill="gray")
-        
-        # Draw parking slots
-        self.parking_slots = []
-        
-        for i in range(slots):
-            row = i // cols
-            col = i % cols
+        for (name, key), label in self.window_labels.items():
+            value = windows[name][key]
             
-            x1 = margin_x + (col * slot_width)
-            y1 = margin_y + ((row + 1) * slot_height) + 50
-            x2 = x1 + slot_width - 5
-            y2 = y1 + slot_height - 5
-            
-            slot = self.parking_canvas.create_rectangle(x1, y1, x2, y2, outline="black", 
-                                                     fill="lightgray", width=2)
-            slot_text = self.parking_canvas.create_text(x1 + slot_width/2, y1 + 15, 
-                                                      text=f"Slot {i+1}")
-            
-            self.parking_slots.append({
-                'id': i,
-                'rect': slot,
-                'text': slot_text,
-                'coords': (x1, y1, x2, y2),
-                'center': (x1 + slot_width/2, y1 + slot_height/2)
-            })
-            
-            # Draw road to each slot
-            if row == 0:
-                self.parking_canvas.create_line(x1 + slot_width/2, y1, 
-                                              x1 + slot_width/2, road_y, 
-                                              width=1, fill="gray", dash=(4, 4))
+            if key == 'revenue':
+                value = f"${value:.2f}"
+            elif key.startswith('stay_'):
+                value = f"{value / 60:.1f} min"
+            elif key == 'turnover':
+                value = f"{value:.2f}"
             else:
-                self.parking_canvas.create_line(x1 + slot_width/2, y1, 
-                                              x1 + slot_width/2, y1 - 30, 
-                                              width=1, fill="gray", dash=(4, 4))
-        
-        self.update_parking_display()
+                value = f"{value:.1f}"
+            
+            label.config(text=value)
+    
+    def draw_parking_layout(self):
+        """Draw the parking lot layout"""
+        self.parking_map.layout()
     
     def update_parking_display(self):
         """Update the parking slot display with current status"""
-        if not hasattr(self, 'parking_slots') or not self.parking_slots:
-            return
-        
-        status = self.parking_system.get_parking_status()
-        
-        for slot_info, slot_status in zip(self.parking_slots, status):
-            slot_rect = slot_info['rect']
-            
-            if slot_status['occupied']:
-                vehicle = slot_status['vehicle']
-                if vehicle:
-                    # Map color name to hex color
-                    color_map = {
-                        'Red': '#ff6666', 'Blue': '#6666ff', 'Green': '#66ff66',
-                        'Yellow': '#ffff66', 'Black': '#333333', 'White': '#f0f0f0',
-                        'Silver': '#cccccc'
-                    }
-                    color = color_map.get(vehicle['color'], '#888888')
-                    
-                    self.parking_canvas.itemconfig(slot_rect, fill=color)
-                    
-                    # Display license plate and vehicle type on the slot
-                    x1, y1, x2, y2 = slot_info['coords']
-                    
-                    # Remove old vehicle info if exists
-                    self.parking_canvas.delete(f"vehicle_info_{slot_info['id']}")
-                    
-                    # Add new vehicle info
-                    self.parking_canvas.create_text(
-                        (x1 + x2) / 2, (y1 + y2) / 2,
-                        text=f"{vehicle['license']}\n{vehicle['type']}",
-                        tags=(f"vehicle_info_{slot_info['id']}"),
-                        fill="black" if vehicle['color'] in ['Yellow', 'White', 'Silver'] else "white",
-                        font=('Arial', 8)
-                    )
-                else:
-                    self.parking_canvas.itemconfig(slot_rect, fill="#ff9999")
-            else:
-                self.parking_canvas.itemconfig(slot_rect, fill="lightgray")
-                
-                # Remove any vehicle info
-                self.parking_canvas.delete(f"vehicle_info_{slot_info['id']}")
+        self.parking_map.update()
     
     def update_queue_display(self):
         """Update the entry queue display"""
-        self.queue_canvas.delete("all")
-        
-        queue = list(self.parking_system.entry_queue)
-        if not queue:
-            self.queue_canvas.create_text(self.queue_canvas.winfo_width() / 2, 
-                                         self.queue_canvas.winfo_height() / 2, 
-                                         text="Queue is empty", fill="gray")
-            return
-        
-        width = self.queue_canvas.winfo_width()
-        if width <= 1:  # Canvas not fully initialized yet
-            return
-        
-        car_width = min(80, width / (len(queue) + 1))
-        margin = (width - (len(queue) * car_width)) / (len(queue) + 1)
+        queue = self.parking_system.entry_queue
         
-        for i, license_plate in enumerate(queue):
-            x = margin + i * (car_width + margin)
-            y = self.queue_canvas.winfo_height() / 2
-            
-            # Draw car
-            self.queue_canvas.create_rectangle(x, y - 20, x + car_width, y + 20, 
-                                             fill="#66b3ff", outline="black")
-            
-            # Draw license plate
-            self.queue_canvas.create_text(x + car_width / 2, y, 
-                                        text=license_plate, font=('Arial', 8))
+        # Only the vehicles nearest the front fit on the canvas
+        visible = self.queue_strip.visible_count(len(queue))
+        self.queue_strip.update(list(itertools.islice(queue, visible)), len(queue))
     
     def update_stack_display(self):
         """Update the exit stack display"""
-        self.stack_canvas.delete("all")
-        
-        stack = list(self.parking_system.exit_stack)
-        if not stack:
-            self.stack_canvas.create_text(self.stack_canvas.winfo_width() / 2, 
-                                         self.stack_canvas.winfo_height() / 2, 
-                                         text="Stack is empty", fill="gray")
-            return
-        
-        width = self.stack_canvas.winfo_width()
-        if width <= 1:  # Canvas not fully initialized yet
-            return
-        
-        car_width = min(80, width / (len(stack) + 1))
-        margin = (width - (len(stack) * car_width)) / (len(stack) + 1)
+        stack = self.parking_system.exit_stack
         
-        for i, license_plate in enumerate(stack):
-            x = margin + i * (car_width + margin)
-            y = self.stack_canvas.winfo_height() / 2
-            
-            # Draw car
-            self.stack_canvas.create_rectangle(x, y - 20, x + car_width, y + 20, 
-                                             fill="#ff9980", outline="black")
-            
-            # Draw license plate
-            self.stack_canvas.create_text(x + car_width / 2, y, 
-                                        text=license_plate, font=('Arial', 8))
+        # Only the vehicles nearest the top fit on the canvas
+        visible = self.stack_strip.visible_count(len(stack))
+        self.stack_strip.update(stack[len(stack) - visible:], len(stack))
     
     def manual_car_entry(self):
         """Handle manual car entry"""
         license_plate = self.parking_system.generate_license_plate()
+        frame = self.camera.capture(license_plate)
         
-        # ANPR animation
-        self.anpr_canvas.itemconfig(self.anpr_text, text="Vehicle detected...")
-        self.anpr_canvas.itemconfig(self.license_text, text=license_plate)
-        
-        # Simulate entry delay
-        self.root.after(1000, lambda: self.complete_car_entry(license_plate))
+        # The plate is read on the ANPR workers; with a full backlog the vehicle is turned
+        # away instead of the GUI waiting
+        if self.anpr.submit(frame, self.priority_class_var.get()):
+            self.anpr_canvas.itemconfig(self.anpr_text, text="Vehicle detected...")
+            self.anpr_canvas.itemconfig(self.license_text, text="")
+        else:
+            self.anpr_canvas.itemconfig(self.anpr_text, text="Camera backlog full!")
+            self.log_activity(f"Vehicle {license_plate} sent to the manual lane: ANPR backlog is full.")
+            self.root.after(2000, self.reset_anpr)
+    
+    def on_anpr_result(self, license_plate, priority_class, latency):
+        """ANPR worker callback: park the vehicle whose plate was read and pass the outcome to the GUI"""
+        slot, queued = None, False
+        if license_plate is not None:
+            slot = self.parking_system.vehicle_entry(license_plate, priority_class)
+            queued = slot is None and license_plate in self.parking_system.entry_queue
+        self.anpr_results.append((license_plate, priority_class, slot, queued))
+        self.notifier.notify(self.ANPR_RESULT)
     
-    def complete_car_entry(self, license_plate):
-        """Complete car entry after ANPR animation"""
-        slot = self.parking_system.vehicle_entry(license_plate)
+    def complete_car_entry(self, license_plate, priority_class, slot, queued):
+        """Show the outcome of an entry once its plate has been read"""
+        if license_plate is None:
+            self.anpr_canvas.itemconfig(self.anpr_text, text="Plate unreadable!")
+            self.log_activity("ANPR could not read a plate; vehicle sent to the manual lane.")
+            self.root.after(2000, self.reset_anpr)
+            return
         
+        self.anpr_canvas.itemconfig(self.license_text, text=license_plate)
         if slot is None:
-            self.anpr_canvas.itemconfig(self.anpr_text, text="Parking full! Added to queue.")
-            self.log_activity(f"Vehicle {license_plate} added to entry queue.")
+            if queued:
+                self.anpr_canvas.itemconfig(self.anpr_text, text="Parking full! Added to queue.")
+                self.log_activity(f"Vehicle {license_plate} added to {priority_class} entry queue.")
+            else:
+                self.anpr_canvas.itemconfig(self.anpr_text, text="Parking and queue full!")
+                self.log_activity(f"Vehicle {license_plate} turned away: {priority_class} entry queue is full.")
         else:
             self.anpr_canvas.itemconfig(self.anpr_text, text=f"Vehicle assigned to slot {slot+1}")
             self.log_activity(f"Vehicle {license_plate} entered and parked in slot {slot+1}.")
@@ -774,10 +3666,7 @@ class ModernParkingGUI:
     def manual_car_exit(self):
         """Handle manual car exit"""
         # Get list of vehicles currently in the parking
-        vehicles = []
-        for lp, record in self.parking_system.vehicle_records.items():
-            if record['exit_time'] is None:
-                vehicles.append(lp)
+        vehicles = list(self.parking_system.vehicle_records)
         
         if not vehicles:
             messagebox.showinfo("Exit", "No vehicles in parking.")
@@ -814,10 +3703,11 @@ class ModernParkingGUI:
     
     def process_exit(self, license_plate):
         """Process a vehicle exit"""
-        result, fee, duration = self.parking_system.vehicle_exit(license_plate)
+        result = self.parking_system.vehicle_exit(license_plate)
         
         if result:
-            slot = self.parking_system.vehicle_records[license_plate]['slot']
+            _, fee, duration = result
+            slot = self.parking_system.get_vehicle_record(license_plate)['slot']
             duration_mins = duration / 60
             
             # Show exit information
@@ -834,10 +3724,7 @@ class ModernParkingGUI:
     def add_to_exit_stack_dialog(self):
         """Show dialog to add vehicle to exit stack"""
         # Get list of vehicles currently in the parking
-        vehicles = []
-        for lp, record in self.parking_system.vehicle_records.items():
-            if record['exit_time'] is None:
-                vehicles.append(lp)
+        vehicles = list(self.parking_system.vehicle_records)
         
         if not vehicles:
             messagebox.showinfo("Exit Stack", "No vehicles in parking.")
@@ -879,6 +3766,47 @@ class ModernParkingGUI:
         
         ttk.Button(dialog, text="Add to Stack", command=on_select).pack(pady=10)
     
+    def leave_queue_dialog(self):
+        """Show dialog to take a waiting vehicle out of the entry queue"""
+        vehicles = self.parking_system.entry_queue.entries()
+        
+        if not vehicles:
+            messagebox.showinfo("Entry Queue", "No vehicles waiting.")
+            return
+        
+        # Create a dialog to select a vehicle
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Leave Entry Queue")
+        dialog.geometry("300x300")
+        dialog.resizable(False, False)
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        ttk.Label(dialog, text="Select a vehicle that stopped waiting:").pack(pady=10)
+        
+        listbox = tk.Listbox(dialog, width=40, height=10)
+        listbox.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
+        
+        now = self.parking_system.clock()
+        for lp, priority_class, queued_at in vehicles:
+            listbox.insert(tk.END, f"{lp} ({priority_class}, waiting {(now - queued_at) / 60:.0f} min)")
+        
+        def on_select():
+            selection = listbox.curselection()
+            if selection:
+                index = selection[0]
+                license_plate = vehicles[index][0]
+                dialog.destroy()
+                
+                if self.parking_system.cancel_queued_vehicle(license_plate):
+                    self.log_activity(f"Vehicle {license_plate} left the entry queue.")
+                else:
+                    messagebox.showerror("Error", "Vehicle is no longer waiting.")
+            else:
+                messagebox.showwarning("Selection", "Please select a vehicle.")
+        
+        ttk.Button(dialog, text="Leave Queue", command=on_select).pack(pady=10)
+    
     def process_exit_stack(self):
         """Process the next vehicle in the exit stack"""
         if not self.parking_system.exit_stack:
@@ -888,8 +3816,11 @@ class ModernParkingGUI:
         license_plate = self.parking_system.process_exit_stack()
         
         if license_plate:
-            slot = self.parking_system.vehicle_records[license_plate]['slot']
-            result, fee, duration = self.parking_system.vehicle_exit(license_plate)
+            # The vehicle already exited; read the fee and duration back from its session
+            record = self.parking_system.get_vehicle_record(license_plate)
+            slot = record['slot']
+            fee = record['fee']
+            duration = record['exit_time'] - record['entry_time']
             duration_mins = duration / 60
             
             messagebox.showinfo("Exit Stack", 
@@ -904,29 +3835,46 @@ class ModernParkingGUI:
     
     def log_activity(self, message):
         """Log an activity to both logs"""
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
+        self.activity_log.log(message)
+        
+        # Entries logged in the same event-loop pass reach the widgets in one insert
+        if not self.log_refresh_pending:
+            self.log_refresh_pending = True
+            self.root.after_idle(self.update_log_display)
+    
+    def update_log_display(self):
+        """Append the entries logged since the last refresh to both log widgets"""
+        self.log_refresh_pending = False
+        self.log_seen, entries = self.activity_log.entries_since(self.log_seen)
+        if not entries:
+            return
+        text = ''.join(entries)
         
-        # Add to full log
+        # Add to full log, keeping only as many lines as the in-memory tail
         self.full_log_text.config(state=tk.NORMAL)
-        self.full_log_text.insert(tk.END, log_entry)
+        self.full_log_text.insert(tk.END, text)
+        num_lines = int(self.full_log_text.index('end-1c').split('.')[0]) - 1
+        if num_lines > self.activity_log.tail.maxlen:
+            self.full_log_text.delete('1.0', f'{num_lines - self.activity_log.tail.maxlen + 1}.0')
         self.full_log_text.see(tk.END)
         self.full_log_text.config(state=tk.DISABLED)
         
         # Add to dashboard log
         self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, log_entry)
+        self.log_text.insert(tk.END, text)
         
         # Limit dashboard log to last 10 entries
-        num_lines = int(self.log_text.index('end-1c').split('.')[0])
+        num_lines = int(self.log_text.index('end-1c').split('.')[0]) - 1
         if num_lines > 10:
-            self.log_text.delete('1.0', '2.0')
+            self.log_text.delete('1.0', f'{num_lines - 9}.0')
         
         self.log_text.see(tk.END)
         self.log_text.config(state=tk.DISABLED)
     
     def clear_logs(self):
         """Clear the logs"""
+        self.activity_log.clear()
+        
         self.full_log_text.config(state=tk.NORMAL)
         self.full_log_text.delete('1.0', tk.END)
         self.full_log_text.config(state=tk.DISABLED)
@@ -939,11 +3887,27 @@ class ModernParkingGUI:
         """Export logs to a file"""
         filename = f"parking_logs_{time.strftime('%Y%m%d_%H%M%S')}.txt"
         
-        with open(filename, 'w') as f:
-            f.write(self.full_log_text.get('1.0', tk.END))
+        self.activity_log.export(filename)
         
         messagebox.showinfo("Export", f"Logs exported to {filename}")
     
+    def export_sessions(self):
+        """Export completed sessions to a columnar archive for analytics"""
+        filename = f"parking_sessions_{time.strftime('%Y%m%d_%H%M%S')}.parc"
+        
+        count = write_archive(filename, self.parking_system.history)
+        
+        messagebox.showinfo("Export", f"{count} sessions exported to {filename}")
+    
+    def on_close(self):
+        """Save a snapshot of the parking system and flush the activity log before closing the window"""
+        self.anpr.close()
+        self.parking_system.unsubscribe(self.notifier.notify)
+        self.notifier.close()
+        self.parking_system.close()
+        self.activity_log.close()
+        self.root.destroy()
+    
     def toggle_automation(self):
         """Toggle automation simulation"""
         self.automation_active = not self.automation_active
@@ -969,13 +3933,19 @@ class ModernParkingGUI:
         """Check for vehicles that should exit based on their expected stay time"""
         vehicles_to_exit = self.parking_system.check_vehicles_to_exit()
         
-        for license_plate in vehicles_to_exit:
-            slot = self.parking_system.vehicle_records[license_plate]['slot']
-            self.log_activity(f"Vehicle {license_plate} automatically exiting from slot {slot+1}.")
+        # Exit all due vehicles in one batch
+        results = self.parking_system.vehicle_exit_batch(vehicles_to_exit)
+        
+        for license_plate, result in zip(vehicles_to_exit, results):
+            # A vehicle that already left through another gate or worker is skipped
+            if not result:
+                continue
+            _, fee, duration = result
             
-            result, fee, duration = self.parking_system.vehicle_exit(license_plate)
+            record = self.parking_system.get_vehicle_record(license_plate)
+            if record is not None:
+                self.log_activity(f"Vehicle {license_plate} automatically exiting from slot {record['slot']+1}.")
             duration_mins = duration / 60
-            
             self.log_activity(f"Vehicle {license_plate} exited. "
                             f"Duration: {duration_mins:.1f} min. Fee: ${fee:.2f}")
     
@@ -994,49 +3964,23 @@ class ModernParkingGUI:
         """Apply general settings"""
         try:
             new_capacity = int(self.capacity_var.get())
-            
-            # Verify capacity can only be increased
-            if new_capacity < self.parking_system.total_slots:
-                messagebox.showerror("Error", "Parking capacity can only be increased.")
-                return
+            if new_capacity < 0:
+                raise ValueError
             
             # Update parking system capacity
             old_capacity = self.parking_system.total_slots
             
-            # Add new slots to slot_status
-            additional_slots = new_capacity - old_capacity
-            if additional_slots > 0:
-                self.parking_system.slot_status.extend([False] * additional_slots)
-                self.parking_system.total_slots = new_capacity
-                
-                # Update graph
-                for i in range(old_capacity, new_capacity):
-                    self.parking_system.parking_graph[i] = []
-                
-                # Rebuild slot connections
-                rows = 4
-                cols = new_capacity // rows
-                for i in range(new_capacity):
-                    row, col = i // cols, i % cols
-                    
-                    # Clear previous connections
-                    self.parking_system.parking_graph[i] = []
-                    
-                    # Connect to spots in same row
-                    if col > 0:
-                        self.parking_system.parking_graph[i].append(i-1)
-                    if col < cols - 1:
-                        self.parking_system.parking_graph[i].append(i+1)
-                    # Connect to spots in same column
-                    if row > 0:
-                        self.parking_system.parking_graph[i].append(i-cols)
-                    if row < rows - 1:
-                        self.parking_system.parking_graph[i].append(i+cols)
-            
-            # Redraw the parking layout
-            self.draw_parking_layout()
-            
-            self.log_activity(f"Parking capacity increased from {old_capacity} to {new_capacity}.")
+            # Slots are added or removed at the end of the layout (only their connections change;
+            # the map draws the difference when the layout change notification arrives)
+            if new_capacity > old_capacity:
+                self.parking_system.add_slots(new_capacity - old_capacity)
+                self.log_activity(f"Parking capacity increased from {old_capacity} to {new_capacity}.")
+            elif new_capacity < old_capacity:
+                if not self.parking_system.remove_slots(old_capacity - new_capacity):
+                    messagebox.showerror("Error", f"Slots {new_capacity + 1} to {old_capacity} must be empty "
+                                         "to reduce the capacity.")
+                    return
+                self.log_activity(f"Parking capacity reduced from {old_capacity} to {new_capacity}.")
             
             messagebox.showinfo("Settings", "Parking capacity updated successfully.")
         except ValueError:
@@ -1044,36 +3988,24 @@ class ModernParkingGUI:
     
     def animate_car_entry(self, license_plate, slot):
         """Animate a car entering the parking lot"""
-        # Get the target slot coordinates
-        target_slot = None
-        for slot_info in self.parking_slots:
-            if slot_info['id'] == slot:
-                target_slot = slot_info
-                break
-        
-        if target_slot is None:
+        # Cars are only animated while slots are drawn individually
+        if slot >= self.parking_map.total_slots or not self.parking_map.detailed():
             return
         
         # Get vehicle color
         vehicle_record = self.parking_system.vehicle_records[license_plate]
-        color_map = {
-            'Red': '#ff6666', 'Blue': '#6666ff', 'Green': '#66ff66',
-            'Yellow': '#ffff66', 'Black': '#333333', 'White': '#f0f0f0',
-            'Silver': '#cccccc'
-        }
-        color = color_map.get(vehicle_record['color'], '#888888')
+        color = VEHICLE_FILL_COLORS.get(vehicle_record['color'], '#888888')
         
         # Create car at entry point
-        entry_x = 50  # Left side of canvas
-        entry_y = 100  # Near the top
+        entry_x, entry_y = self.parking_map.entry_point()
         
-        car = self.parking_canvas.create_rectangle(entry_x, entry_y, entry_x + 40, entry_y + 30, 
+        car = self.parking_canvas.create_rectangle(entry_x - 20, entry_y - 15, entry_x + 20, entry_y + 15, 
                                                  fill=color, outline="black")
-        car_text = self.parking_canvas.create_text(entry_x + 20, entry_y + 15, 
+        car_text = self.parking_canvas.create_text(entry_x, entry_y, 
                                                 text=license_plate[:3], font=('Arial', 8))
         
         # Animate car movement
-        self.animate_car_movement(car, car_text, target_slot['center'])
+        self.animate_car_movement(car, car_text, self.parking_map.slot_center(slot))
     
     def animate_car_movement(self, car, car_text, target_pos, step=0):
         """Animate car movement to target position"""
@@ -1082,8 +4014,11 @@ class ModernParkingGUI:
             self.parking_canvas.delete(car_text)
             return
         
-        # Get current position
-        x1, y1, x2, y2 = self.parking_canvas.coords(car)
+        # Get current position; zooming the map clears the canvas and ends the animation
+        coords = self.parking_canvas.coords(car)
+        if not coords:
+            return
+        x1, y1, x2, y2 = coords
         current_x = (x1 + x2) / 2
         current_y = (y1 + y2) / 2
         
@@ -0,0 +1,422 @@
+"""Columnar archive of completed parking sessions for analytics.
+
+Sessions are written in chunks of columns: plate, slot, entry and exit times,
+vehicle type, color and fee. Vehicle types and colors are dictionary-encoded
+as small integer codes, and every chunk records the min/max of its numeric
+columns and the codes it contains, so scans over a time range (or any other
+column range) skip chunks that cannot match. The chunk directory is a footer
+at the end of the file, like Parquet, so an archive is written in one
+streaming pass. Columns are read as NumPy arrays when NumPy is installed and
+as array.array columns otherwise.
+
+    python session_archive.py from-logs sessions.parc parking_logs_*.txt
+    python session_archive.py stats sessions.parc --start "2025-04-26 18:00" --end "2025-04-27"
+
+An archive of a running system's history is written with
+write_archive(path, parking_system.history), and SessionArchive iterates
+record dicts like SessionHistory, so billing.rerate_history accepts either.
+"""
+import os
+import sys
+import json
+import mmap
+import math
+import struct
+import argparse
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b'PARKARC1'
+FOOTER_LENGTH = struct.Struct('<Q')
+
+# Fixed-width columns and their array type codes, stored little-endian; slot is -1 when unknown
+COLUMNS = {
+    'slot': 'i',
+    'entry_time': 'd',
+    'exit_time': 'd',
+    'fee': 'd',
+    'vehicle_type': 'H',
+    'color': 'H'
+}
+
+# Dictionary-encoded columns; chunk statistics list the codes present instead of min/max
+CATEGORICAL = ('vehicle_type', 'color')
+
+FIELDS = ('license', 'slot', 'entry_time', 'exit_time', 'vehicle_type', 'color', 'fee')
+
+def to_bytes(column):
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+class ArchiveWriter:
+    """Streams sessions into an archive file one chunk at a time"""
+    def __init__(self, path, chunk_rows=65536):
+        self.path = path
+        self.temp_path = path + '.tmp'
+        self.file = open(self.temp_path, 'wb')
+        self.file.write(MAGIC)
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        
+        # Dictionary of each categorical column (values in code order) and its reverse lookup
+        self.dictionaries = {name: [] for name in CATEGORICAL}
+        self.codes = {name: {} for name in CATEGORICAL}
+        
+        self.chunks = []
+        self.pending = {name: [] for name in FIELDS}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+            os.remove(self.temp_path)
+    
+    def encode(self, name, value):
+        code = self.codes[name].get(value)
+        if code is None:
+            code = self.codes[name][value] = len(self.dictionaries[name])
+            self.dictionaries[name].append(value)
+        return code
+    
+    def append(self, license_plate, slot, entry_time, exit_time, vehicle_type, color, fee):
+        """Add one completed session"""
+        pending = self.pending
+        pending['license'].append(license_plate)
+        pending['slot'].append(-1 if slot is None else slot)
+        pending['entry_time'].append(entry_time)
+        pending['exit_time'].append(exit_time)
+        pending['vehicle_type'].append(self.encode('vehicle_type', vehicle_type))
+        pending['color'].append(self.encode('color', color))
+        pending['fee'].append(fee)
+        
+        if len(pending['license']) >= self.chunk_rows:
+            self.write_chunk()
+    
+    def align(self):
+        """Pad the file to an 8-byte boundary so columns can be viewed in place"""
+        self.file.write(bytes(-self.file.tell() % 8))
+    
+    def write_column(self, blob):
+        self.align()
+        offset = self.file.tell()
+        self.file.write(blob)
+        return [offset, len(blob)]
+    
+    def write_chunk(self):
+        """Write the pending sessions as one chunk of columns"""
+        pending = self.pending
+        rows = len(pending['license'])
+        if not rows:
+            return
+        
+        columns = {}
+        stats = {}
+        for name, typecode in COLUMNS.items():
+            values = pending[name]
+            columns[name] = self.write_column(to_bytes(array(typecode, values)))
+            if name in CATEGORICAL:
+                stats[name] = sorted(set(values))
+            else:
+                stats[name] = [min(values), max(values)]
+        
+        # Plates as one UTF-8 blob with row offsets
+        plates = [license_plate.encode() for license_plate in pending['license']]
+        offsets = array('I', [0])
+        offset = 0
+        for plate in plates:
+            offset += len(plate)
+            offsets.append(offset)
+        columns['license_offsets'] = self.write_column(to_bytes(offsets))
+        columns['license'] = self.write_column(b''.join(plates))
+        
+        self.chunks.append({'rows': rows, 'columns': columns, 'stats': stats})
+        self.rows += rows
+        self.pending = {name: [] for name in FIELDS}
+    
+    def close(self):
+        """Write the last chunk and the footer, then move the archive into place"""
+        self.write_chunk()
+        footer = json.dumps({
+            'rows': self.rows,
+            'dictionaries': self.dictionaries,
+            'chunks': self.chunks
+        }).encode()
+        self.file.write(footer + FOOTER_LENGTH.pack(len(footer)) + MAGIC)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+
+def write_archive(path, records, chunk_rows=65536):
+    """Write record dicts (e.g. a SessionHistory) to an archive; returns the number of sessions"""
+    with ArchiveWriter(path, chunk_rows) as writer:
+        for record in records:
+            writer.append(*[record[name] for name in FIELDS])
+    return writer.rows
+
+class SessionArchive:
+    """Reader for archives written by ArchiveWriter"""
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        trailer = len(self.data) - len(MAGIC) - FOOTER_LENGTH.size
+        if self.data[:len(MAGIC)] != MAGIC or self.data[-len(MAGIC):] != MAGIC:
+            raise ValueError(f"{path} is not a session archive")
+        footer_length = FOOTER_LENGTH.unpack_from(self.data, trailer)[0]
+        footer = json.loads(self.data[trailer - footer_length:trailer])
+        
+        self.rows = footer['rows']
+        self.dictionaries = footer['dictionaries']
+        self.chunks = footer['chunks']
+    
+    def __len__(self):
+        return self.rows
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def chunk_matches(self, chunk, ranges):
+        """Whether a chunk can hold rows with every column in its [low, high) range"""
+        for name, (low, high) in ranges.items():
+            if name in CATEGORICAL:
+                if not any((low is None or code >= low) and (high is None or code < high)
+                           for code in chunk['stats'][name]):
+                    return False
+                continue
+            
+            minimum, maximum = chunk['stats'][name]
+            if (low is not None and maximum < low) or (high is not None and minimum >= high):
+                return False
+        return True
+    
+    def matching_chunks(self, ranges=None):
+        """Chunks whose statistics overlap the ranges"""
+        return [chunk for chunk in self.chunks if not ranges or self.chunk_matches(chunk, ranges)]
+    
+    def column(self, chunk, name):
+        """One column of a chunk; categorical columns stay as codes"""
+        offset, length = chunk['columns'][name]
+        blob = self.data[offset:offset + length]
+        
+        if name == 'license':
+            offsets = self.column(chunk, 'license_offsets')
+            return [blob[offsets[row]:offsets[row + 1]].decode() for row in range(chunk['rows'])]
+        
+        typecode = COLUMNS.get(name, 'I')
+        if np is not None:
+            return np.frombuffer(blob, dtype=np.dtype(typecode).newbyteorder('<'))
+        
+        column = array(typecode)
+        column.frombytes(blob)
+        if sys.byteorder == 'big':
+            column.byteswap()
+        return column
+    
+    def row_filter(self, chunk, ranges):
+        """Rows of a chunk inside every range: None for all, else a NumPy mask or a list of rows"""
+        keep = None
+        for name, (low, high) in ranges.items():
+            if name not in CATEGORICAL:
+                minimum, maximum = chunk['stats'][name]
+                if (low is None or minimum >= low) and (high is None or maximum < high):
+                    continue
+            
+            values = self.column(chunk, name)
+            if np is not None:
+                mask = np.ones(len(values), dtype=bool)
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values < high
+                keep = mask if keep is None else keep & mask
+            else:
+                rows = range(len(values)) if keep is None else keep
+                keep = [row for row in rows
+                        if (low is None or values[row] >= low) and (high is None or values[row] < high)]
+        return keep
+    
+    def scan(self, columns=FIELDS, ranges=None):
+        """Yield {column: values} for the rows of each matching chunk inside every range"""
+        ranges = ranges or {}
+        for chunk in self.matching_chunks(ranges):
+            keep = self.row_filter(chunk, ranges)
+            batch = {}
+            for name in columns:
+                values = self.column(chunk, name)
+                if keep is not None:
+                    if np is not None and name != 'license':
+                        values = values[keep]
+                    elif np is not None:
+                        values = [value for value, kept in zip(values, keep) if kept]
+                    else:
+                        values = [values[row] for row in keep]
+                batch[name] = values
+            yield batch
+    
+    def time_ranges(self, start, end, by='exit_time'):
+        if start is None and end is None:
+            return {}
+        return {by: (start, end)}
+    
+    def records(self, start=None, end=None, by='exit_time'):
+        """Sessions with `by` in [start, end) as record dicts, in archive order"""
+        for batch in self.scan(FIELDS, self.time_ranges(start, end, by)):
+            vehicle_types = self.dictionaries['vehicle_type']
+            colors = self.dictionaries['color']
+            for license_plate, slot, entry_time, exit_time, vehicle_type, color, fee in zip(
+                    *[batch[name] for name in FIELDS]):
+                yield {
+                    'license': license_plate,
+                    'slot': int(slot) if slot >= 0 else None,
+                    'entry_time': float(entry_time),
+                    'exit_time': float(exit_time),
+                    'vehicle_type': vehicle_types[vehicle_type],
+                    'color': colors[color],
+                    'fee': float(fee)
+                }
+    
+    def __iter__(self):
+        return self.records()
+    
+    def peak_occupancy(self, start=None, end=None):
+        """Most archived sessions parked at once during [start, end)"""
+        ranges = {}
+        if start is not None:
+            ranges['exit_time'] = (start, None)
+        if end is not None:
+            ranges['entry_time'] = (None, end)
+        batches = list(self.scan(('entry_time', 'exit_time'), ranges))
+        if not batches:
+            return 0
+        
+        # Exits sort before entries at the same time, as a slot is freed before it is reused
+        if np is not None:
+            entry_times = np.concatenate([batch['entry_time'] for batch in batches])
+            exit_times = np.concatenate([batch['exit_time'] for batch in batches])
+            if start is not None:
+                entry_times = np.maximum(entry_times, start)
+            times = np.concatenate([exit_times, entry_times])
+            changes = np.concatenate([np.full(len(exit_times), -1), np.ones(len(entry_times), dtype=np.int64)])
+            order = np.lexsort((changes, times))
+            return int(np.cumsum(changes[order]).max())
+        
+        events = []
+        for batch in batches:
+            events.extend((max(entry_time, start) if start is not None else entry_time, 1)
+                          for entry_time in batch['entry_time'])
+            events.extend((exit_time, -1) for exit_time in batch['exit_time'])
+        events.sort()
+        occupancy = peak = 0
+        for _, change in events:
+            occupancy += change
+            peak = max(peak, occupancy)
+        return peak
+    
+    def statistics(self, start=None, end=None):
+        """get_statistics-style totals for the archived sessions in [start, end)"""
+        total_entries = 0
+        for batch in self.scan(('entry_time',), self.time_ranges(start, end, 'entry_time')):
+            total_entries += len(batch['entry_time'])
+        
+        vehicle_types = self.dictionaries['vehicle_type']
+        by_type = [0.0] * len(vehicle_types)
+        sessions_by_type = [0] * len(vehicle_types)
+        total_exits = 0
+        fee_sums = []
+        stay_sums = []
+        for batch in self.scan(('entry_time', 'exit_time', 'fee', 'vehicle_type'),
+                               self.time_ranges(start, end)):
+            total_exits += len(batch['fee'])
+            if np is not None:
+                fee_sums.append(float(batch['fee'].sum()))
+                stay_sums.append(float((batch['exit_time'] - batch['entry_time']).sum()))
+                for code, amount in enumerate(np.bincount(batch['vehicle_type'], weights=batch['fee'],
+                                                          minlength=len(vehicle_types))):
+                    by_type[code] += float(amount)
+                for code, count in enumerate(np.bincount(batch['vehicle_type'], minlength=len(vehicle_types))):
+                    sessions_by_type[code] += int(count)
+            else:
+                fee_sums.append(math.fsum(batch['fee']))
+                stay_sums.append(math.fsum(map(float.__sub__, batch['exit_time'], batch['entry_time'])))
+                for code, fee in zip(batch['vehicle_type'], batch['fee']):
+                    by_type[code] += fee
+                    sessions_by_type[code] += 1
+        
+        return {
+            'total_entries': total_entries,
+            'total_exits': total_exits,
+            'peak_occupancy': self.peak_occupancy(start, end),
+            'avg_stay_time': math.fsum(stay_sums) / total_exits if total_exits else 0,
+            'revenue': math.fsum(fee_sums),
+            'by_vehicle_type': {name: by_type[code] for code, name in enumerate(vehicle_types)
+                                if sessions_by_type[code]},
+            'sessions_by_vehicle_type': {name: sessions_by_type[code] for code, name in enumerate(vehicle_types)
+                                         if sessions_by_type[code]}
+        }
+    
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+def archive_logs(paths, archive_path, workers=None):
+    """Archive the sessions of exported parking logs in exit order; type and color are not logged"""
+    from concurrent.futures import ProcessPoolExecutor
+    from log_index import parse_log_file
+    
+    sessions = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for plates, slots, entry_times, exit_times, fees in executor.map(parse_log_file, paths):
+            sessions.extend(zip(plates, slots, entry_times, exit_times, fees))
+    sessions.sort(key=lambda session: session[3])
+    
+    with ArchiveWriter(archive_path) as writer:
+        for plate, slot, entry_time, exit_time, fee in sessions:
+            writer.append(plate.decode(), slot if slot >= 0 else None, entry_time, exit_time, None, None, fee)
+    return writer.rows
+
+def main():
+    from log_index import parse_time
+    
+    parser = argparse.ArgumentParser(description="Write and query columnar session archives")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    from_logs = commands.add_parser('from-logs', help="archive the sessions of exported log files")
+    from_logs.add_argument('archive', help="archive file")
+    from_logs.add_argument('logs', nargs='+', help="parking_logs_*.txt files")
+    
+    stats = commands.add_parser('stats', help="statistics of the sessions in a time range")
+    stats.add_argument('archive', help="archive file")
+    stats.add_argument('--start', type=parse_time, help="start time (YYYY-MM-DD HH:MM)")
+    stats.add_argument('--end', type=parse_time, help="end time (YYYY-MM-DD HH:MM)")
+    
+    args = parser.parse_args()
+    
+    if args.command == 'from-logs':
+        rows = archive_logs(args.logs, args.archive)
+        print(f"Archived {rows:,} sessions ({os.path.getsize(args.archive) / 1e6:,.1f} MB)")
+        return
+    
+    with SessionArchive(args.archive) as archive:
+        statistics = archive.statistics(args.start, args.end)
+        print(f"Entries: {statistics['total_entries']:,}  Exits: {statistics['total_exits']:,}  "
+              f"Peak occupancy: {statistics['peak_occupancy']:,}")
+        print(f"Average stay: {statistics['avg_stay_time'] / 60:.1f} min  Revenue: ${statistics['revenue']:,.2f}")
+        for vehicle_type, revenue in statistics['by_vehicle_type'].items():
+            sessions = statistics['sessions_by_vehicle_type'][vehicle_type]
+            print(f"  {vehicle_type or 'Unknown'}: {sessions:,} sessions, ${revenue:,.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Headless discrete-event simulation of the parking system.
+
+Drives ParkingManagementSystem (entries, automatic exits, the entry queue and the
+priority exit stack) on a simulated clock, so long periods of traffic can be
+fast-forwarded without Tkinter.
+
+    python simulation.py --slots 5000 --days 30 --entry-interval 0.5
+"""
+import time
+import random
+import heapq
+import argparse
+
+from project import ParkingManagementSystem, EntryQueue, PRIORITY_CLASSES
+
+class SimulationClock:
+    """Manually advanced clock that can be injected into ParkingManagementSystem"""
+    def __init__(self, start=0.0):
+        self.now = start
+    
+    def __call__(self):
+        return self.now
+    
+    def advance_to(self, when):
+        """Move the clock forward to the given time"""
+        if when > self.now:
+            self.now = when
+
+class HeadlessSimulation:
+    """Discrete-event simulation of automated entries and exits"""
+    def __init__(self, total_slots=20, entry_interval=8.0, poisson_arrivals=True,
+                 exit_check_interval=None, priority_exit_interval=None, seed=None, stay_sampler=None,
+                 queue_limit=None):
+        self.rng = random.Random(seed)
+        self.clock = SimulationClock()
+        
+        # Arrivals that find queue_limit vehicles of their class already waiting are turned away
+        # (None: never); the limit applies to every priority class
+        limits = dict.fromkeys(PRIORITY_CLASSES, queue_limit) if queue_limit is not None else None
+        entry_queue = EntryQueue(limits=limits)
+        self.parking_system = ParkingManagementSystem(total_slots=total_slots, clock=self.clock,
+                                                      rng=self.rng, entry_queue=entry_queue,
+                                                      stay_sampler=stay_sampler)
+        
+        # Mean seconds between arrivals (exponential gaps when poisson_arrivals, fixed otherwise)
+        self.entry_interval = entry_interval
+        self.poisson_arrivals = poisson_arrivals
+        
+        # None processes departures exactly when due; a number polls like the GUI timer does
+        self.exit_check_interval = exit_check_interval
+        
+        # Mean seconds between priority exits through the exit stack (None disables them)
+        self.priority_exit_interval = priority_exit_interval
+        
+        # Event queue (Min-Heap) of (time, sequence, kind)
+        self.events = []
+        self.sequence = 0
+        
+        self.counts = {
+            'arrivals': 0,
+            'queued': 0,
+            'rejected': 0,
+            'exits': 0,
+            'priority_exits': 0,
+            'exit_checks': 0
+        }
+    
+    def schedule(self, when, kind):
+        """Add an event to the event queue"""
+        self.sequence += 1
+        heapq.heappush(self.events, (when, self.sequence, kind))
+    
+    def next_gap(self, mean):
+        """Time until the next recurring event"""
+        if self.poisson_arrivals:
+            return self.rng.expovariate(1.0 / mean)
+        return mean
+    
+    def handle_arrival(self):
+        """A vehicle arrives at the entry gate"""
+        self.counts['arrivals'] += 1
+        system = self.parking_system
+        license_plate = system.generate_license_plate()
+        if system.vehicle_entry(license_plate) is None:
+            # Not parked: waiting in the queue, or turned away by a full one
+            if license_plate in system.entry_queue:
+                self.counts['queued'] += 1
+            else:
+                self.counts['rejected'] += 1
+        self.schedule(self.clock.now + self.next_gap(self.entry_interval), 'arrival')
+    
+    def handle_exit_check(self):
+        """Exit every vehicle whose expected stay has elapsed"""
+        self.counts['exit_checks'] += 1
+        results = self.parking_system.vehicle_exit_batch(self.parking_system.check_vehicles_to_exit())
+        self.counts['exits'] += len(results) - results.count(False)
+        
+        if self.exit_check_interval is not None:
+            self.schedule(self.clock.now + self.exit_check_interval, 'exit_check')
+    
+    def handle_priority_exit(self):
+        """Push a random parked vehicle on the exit stack and process it"""
+        system = self.parking_system
+        slot = self.rng.randrange(system.total_slots)
+        license_plate = system.slot_vehicles.get(slot)
+        
+        if license_plate is not None and system.add_to_exit_stack(license_plate):
+            if system.process_exit_stack():
+                self.counts['priority_exits'] += 1
+        
+        self.schedule(self.clock.now + self.next_gap(self.priority_exit_interval), 'priority_exit')
+    
+    def run(self, duration):
+        """Simulate duration seconds of traffic and return a report"""
+        end_time = self.clock.now + duration
+        self.schedule(self.clock.now + self.next_gap(self.entry_interval), 'arrival')
+        if self.exit_check_interval is not None:
+            self.schedule(self.clock.now + self.exit_check_interval, 'exit_check')
+        if self.priority_exit_interval is not None:
+            self.schedule(self.clock.now + self.next_gap(self.priority_exit_interval), 'priority_exit')
+        
+        handlers = {
+            'arrival': self.handle_arrival,
+            'exit_check': self.handle_exit_check,
+            'priority_exit': self.handle_priority_exit
+        }
+        departures = self.parking_system.departures
+        events_processed = 0
+        started = time.perf_counter()
+        
+        while self.events:
+            when, _, kind = self.events[0]
+            
+            # Without polling, departures are processed exactly at their due time
+            if self.exit_check_interval is None:
+                due_time = departures.next_due_time()
+                if due_time is not None and due_time <= when and due_time <= end_time:
+                    self.clock.advance_to(due_time)
+                    self.handle_exit_check()
+                    events_processed += 1
+                    continue
+            
+            if when > end_time:
+                break
+            
+            heapq.heappop(self.events)
+            self.clock.advance_to(when)
+            handlers[kind]()
+            events_processed += 1
+        
+        self.clock.advance_to(end_time)
+        elapsed = time.perf_counter() - started
+        
+        return {
+            'simulated_seconds': duration,
+            'wall_seconds': elapsed,
+            'events': events_processed,
+            'events_per_second': events_processed / elapsed if elapsed > 0 else float('inf'),
+            'counts': dict(self.counts),
+            'statistics': self.parking_system.get_statistics(),
+            'windows': self.parking_system.get_windowed_statistics()
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless parking simulation")
+    parser.add_argument('--slots', type=int, default=20, help="number of parking slots")
+    parser.add_argument('--days', type=float, default=1.0, help="simulated days")
+    parser.add_argument('--entry-interval', type=float, default=8.0, help="mean seconds between arrivals")
+    parser.add_argument('--fixed-arrivals', action='store_true', help="use fixed instead of exponential gaps")
+    parser.add_argument('--exit-check-interval', type=float, default=None,
+                        help="poll for departures every N seconds instead of exactly when due")
+    parser.add_argument('--priority-exit-interval', type=float, default=None,
+                        help="mean seconds between priority exits through the exit stack")
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    args = parser.parse_args()
+    
+    simulation = HeadlessSimulation(total_slots=args.slots, entry_interval=args.entry_interval,
+                                    poisson_arrivals=not args.fixed_arrivals,
+                                    exit_check_interval=args.exit_check_interval,
+                                    priority_exit_interval=args.priority_exit_interval,
+                                    seed=args.seed)
+    report = simulation.run(args.days * 86400)
+    
+    stats = report['statistics']
+    print(f"Simulated {args.days:g} days on {args.slots} slots in {report['wall_seconds']:.2f} s")
+    print(f"Events: {report['events']} ({report['events_per_second']:,.0f} events/sec)")
+    print(f"Entries: {stats['total_entries']}, Exits: {stats['total_exits']}, "
+          f"Priority exits: {report['counts']['priority_exits']}")
+    print(f"Queued on arrival: {report['counts']['queued']}, Turned away: {report['counts']['rejected']}")
+    print(f"Peak occupancy: {stats['peak_occupancy']}, Queue length: {stats['queue_length']}")
+    print(f"Average stay: {stats['avg_stay_time']:.1f} sec, Revenue: ${stats['revenue']:.2f}")
+    for name, window in report['windows'].items():
+        print(f"Last {name}: {window['arrival_rate']:.1f} arrivals/h, occupancy {window['avg_occupancy']:.1f}, "
+              f"turnover {window['turnover']:.2f}, revenue ${window['revenue']:.2f}, "
+              f"stay p50/p90/p99 {window['stay_p50']:.0f}/{window['stay_p90']:.0f}/{window['stay_p99']:.0f} sec")
+
+if __name__ == "__main__":
+    main()
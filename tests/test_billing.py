@@ -0,0 +1,19 @@
+import pytest
+
+import billing
+from project import VEHICLE_TYPES, FEE_MULTIPLIERS
+
+def test_codes_and_names_mix():
+    names, codes = billing.encode_vehicle_types([1, VEHICLE_TYPES[2], 'Tractor', 'Tractor'])
+    assert names == list(VEHICLE_TYPES) + ['Tractor']
+    assert list(codes) == [1, 2, len(VEHICLE_TYPES), len(VEHICLE_TYPES)]
+
+def test_numpy_integer_codes_in_a_list():
+    np = pytest.importorskip('numpy')
+    codes = [np.int64(code) for code in range(len(VEHICLE_TYPES))]
+    names, encoded = billing.encode_vehicle_types(codes)
+    assert names == list(VEHICLE_TYPES)
+    assert list(encoded) == list(range(len(VEHICLE_TYPES)))
+    
+    fees = billing.calculate_fees([600.0] * len(codes), codes)
+    assert list(fees) == [10 * FEE_MULTIPLIERS.get(name, 1.0) for name in VEHICLE_TYPES]
@@ -0,0 +1,88 @@
+import pytest
+
+from project import EntryQueue, ParkingManagementSystem
+
+def test_higher_classes_first_and_fifo_within_a_class():
+    queue = EntryQueue()
+    for plate, priority_class, now in [('R1', 'regular', 0), ('E1', 'ev', 1), ('R2', 'regular', 2),
+                                       ('D1', 'disabled', 3), ('P1', 'permit', 4), ('E2', 'ev', 5)]:
+        assert queue.push(plate, priority_class, now)
+    
+    assert [queue.pop(10) for _ in range(6)] == ['D1', 'P1', 'E1', 'E2', 'R1', 'R2']
+    assert queue.pop(10) is None
+
+def test_long_waits_go_ahead_of_newer_higher_classes():
+    queue = EntryQueue(max_wait=900)
+    queue.push('R1', 'regular', 0)
+    queue.push('D1', 'disabled', 500)
+    
+    assert queue.pop(899) == 'D1'
+    queue.push('D2', 'disabled', 950)
+    assert queue.pop(1000) == 'R1'
+    assert queue.pop(1000) == 'D2'
+
+def test_longest_waiting_overdue_vehicle_goes_first():
+    queue = EntryQueue(max_wait=100)
+    queue.push('R1', 'regular', 0)
+    queue.push('E1', 'ev', 50)
+    queue.push('D1', 'disabled', 300)
+    assert [queue.pop(300) for _ in range(3)] == ['R1', 'E1', 'D1']
+
+def test_aging_can_be_turned_off():
+    queue = EntryQueue(max_wait=None)
+    queue.push('R1', 'regular', 0)
+    queue.push('D1', 'disabled', 10000)
+    assert queue.pop(20000) == 'D1'
+
+def test_class_limits_turn_vehicles_away():
+    queue = EntryQueue(limits={'ev': 2})
+    assert queue.push('E1', 'ev', 0)
+    assert queue.push('E2', 'ev', 0)
+    assert not queue.push('E3', 'ev', 0)
+    assert queue.push('R1', 'regular', 0)
+    
+    statistics = queue.statistics(10)
+    assert statistics['ev']['waiting'] == 2 and statistics['ev']['limit'] == 2
+    assert statistics['ev']['rejected'] == 1
+    assert statistics['regular']['limit'] is None
+
+def test_cancel_and_duplicates():
+    queue = EntryQueue()
+    for n, plate in enumerate(['R1', 'R2', 'R3']):
+        queue.push(plate, 'regular', n)
+    assert not queue.push('R2', 'ev', 5)
+    
+    assert queue.cancel('R2')
+    assert not queue.cancel('R2')
+    assert 'R2' not in queue and len(queue) == 2
+    assert list(queue) == ['R1', 'R3']
+    assert queue.statistics(5)['regular']['cancelled'] == 1
+
+def test_wait_statistics():
+    queue = EntryQueue()
+    queue.push('R1', 'regular', 0)
+    queue.push('R2', 'regular', 10)
+    queue.pop(30)
+    
+    statistics = queue.statistics(40)['regular']
+    assert statistics['served'] == 1 and statistics['avg_wait'] == 30 and statistics['max_wait'] == 30
+    assert statistics['waiting'] == 1 and statistics['longest_wait'] == 30
+
+def test_unknown_class_is_an_error():
+    with pytest.raises(ValueError):
+        EntryQueue().push('X1', 'vip', 0)
+
+def test_parking_system_serves_the_queue_by_class():
+    now = [0.0]
+    system = ParkingManagementSystem(total_slots=1, clock=lambda: now[0],
+                                     entry_queue=EntryQueue(limits={'ev': 1}))
+    system.vehicle_entry('AAA-1111')
+    assert system.vehicle_entry('REG-0001') is None
+    assert system.vehicle_entry('EVX-0001', 'ev') is None
+    assert system.vehicle_entry('EVX-0002', 'ev') is None
+    assert 'EVX-0002' not in system.entry_queue
+    
+    now[0] = 60
+    system.vehicle_exit('AAA-1111')
+    assert system.vehicle_records['EVX-0001']['slot'] == 0
+    assert system.get_queue_statistics()['ev']['rejected'] == 1
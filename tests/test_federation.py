@@ -0,0 +1,59 @@
+import pytest
+
+from federation import ParkingFederation, LocalShard, ProcessShard
+
+def test_vehicles_exit_from_the_shard_they_entered():
+    federation = ParkingFederation([LocalShard(f"lot-{n}", total_slots=2) for n in range(2)])
+    try:
+        names = {federation.vehicle_entry(plate)[0] for plate in ('AAA-1111', 'BBB-2222', 'CCC-3333')}
+        assert names == {'lot-0', 'lot-1'}
+        assert federation.vehicle_exit('BBB-2222')[0]
+        assert federation.vehicle_exit('BBB-2222') is False
+        
+        statistics = federation.get_statistics()
+        assert statistics['total_entries'] == 3 and statistics['total_exits'] == 1
+        assert statistics['current_occupancy'] == 2 and statistics['available_slots'] == 2
+    finally:
+        federation.close()
+
+def test_failing_shard_leaves_no_stale_replies():
+    federation = ParkingFederation([ProcessShard(f"lot-{n}", total_slots=1) for n in range(2)])
+    try:
+        parked = dict(federation.run_batch([('entry', 'AAA-1111', 'regular', None),
+                                            ('entry', 'BBB-2222', 'regular', None)]))
+        first, second = (parked[name][0] for name in ('lot-0', 'lot-1'))
+        
+        # Both lots are full, so the unknown class fails in lot-0's entry queue, while lot-1
+        # still has a reply to send for the exit
+        with pytest.raises(ValueError):
+            federation.run_batch([('entry', 'CCC-3333', 'bogus', None), ('exit', second)])
+        
+        # lot-1's exit went through and is tracked
+        assert second not in federation.locations
+        
+        # Replies still pair up with their operations
+        name, (plate, slot, queued) = federation.run_batch([('entry', 'DDD-4444', 'regular', None)])[0]
+        assert (name, plate, slot, queued) == ('lot-1', 'DDD-4444', 0, False)
+        name, result = federation.run_batch([('exit', first)])[0]
+        assert name == 'lot-0' and result[0] is True
+        
+        statistics = federation.get_statistics()
+        assert statistics['total_entries'] == 3 and statistics['total_exits'] == 2
+        assert statistics['current_occupancy'] == 1
+    finally:
+        federation.close()
+
+def test_duplicate_entry_keeps_the_parked_vehicle_reachable():
+    federation = ParkingFederation([LocalShard('lot-0', total_slots=2)])
+    try:
+        assert federation.vehicle_entry('AAA-1111') == ('lot-0', 0)
+        assert federation.vehicle_entry('AAA-1111') == ('lot-0', None)
+        assert federation.locations == {'AAA-1111': 0}
+        
+        # Twice more in one batch, then the exit
+        federation.run_batch([('entry', 'AAA-1111', 'regular', None)] * 2)
+        assert federation.vehicle_exit('AAA-1111')[0] is True
+        assert federation.locations == {}
+        assert federation.get_statistics()['current_occupancy'] == 0
+    finally:
+        federation.close()
@@ -0,0 +1,174 @@
+import json
+import random
+import asyncio
+
+import pytest
+
+from project import ParkingManagementSystem
+from gate_server import GateServer
+from test_recovery import crash, state
+
+class FakeWriter:
+    """Collects the messages a client would receive"""
+    def __init__(self):
+        self.messages = []
+    
+    def is_closing(self):
+        return False
+    
+    def write(self, data):
+        self.messages.append(json.loads(data))
+
+def make_server(total_slots=2, **options):
+    system = ParkingManagementSystem(total_slots=total_slots, rng=random.Random(1), **options)
+    return GateServer(system), system
+
+def request(server, writer, **message):
+    response = server.process(json.dumps(message), writer)
+    assigned, server.assigned = server.assigned, []
+    server.notify_assigned(assigned)
+    return response
+
+def test_entry_exit_and_stats():
+    server, system = make_server()
+    writer = FakeWriter()
+    
+    response = request(server, writer, id=1, op='entry', plate='ABC-1234')
+    assert response == {'id': 1, 'ok': True, 'plate': 'ABC-1234', 'slot': 0, 'queued': False}
+    
+    response = request(server, writer, id=2, op='exit', plate='ABC-1234')
+    assert response['ok'] and response['id'] == 2 and response['fee'] >= 0
+    
+    response = request(server, writer, op='stats')
+    assert response['ok'] and response['total_entries'] == 1 and response['total_exits'] == 1
+    assert set(response['windows']) == {'5m', '1h', '24h'}
+    assert 'regular' in response['queue']
+
+def test_queued_vehicle_is_told_its_slot():
+    server, system = make_server(total_slots=1)
+    first, second = FakeWriter(), FakeWriter()
+    request(server, first, op='entry', plate='AAA-1111')
+    
+    response = request(server, second, op='entry', plate='EVX-0001', **{'class': 'ev'})
+    assert response == {'ok': True, 'plate': 'EVX-0001', 'slot': None, 'queued': True}
+    
+    request(server, first, op='exit', plate='AAA-1111')
+    assert second.messages == [{'event': 'assigned', 'plate': 'EVX-0001', 'slot': 0}]
+
+def test_cancel_queued_vehicle():
+    server, system = make_server(total_slots=1)
+    writer = FakeWriter()
+    request(server, writer, op='entry', plate='AAA-1111')
+    request(server, writer, op='entry', plate='BBB-2222')
+    
+    assert request(server, writer, op='cancel', plate='BBB-2222') == {'ok': True, 'plate': 'BBB-2222'}
+    assert not request(server, writer, op='cancel', plate='BBB-2222')['ok']
+    assert len(system.entry_queue) == 0
+
+def test_duplicate_entry_is_rejected():
+    server, system = make_server(total_slots=3)
+    writer = FakeWriter()
+    assert request(server, writer, op='entry', plate='AAA-1111')['slot'] == 0
+    
+    response = request(server, writer, id=7, op='entry', plate='AAA-1111')
+    assert response == {'id': 7, 'ok': False, 'plate': 'AAA-1111', 'error': "already parked"}
+    assert system.get_statistics()['current_occupancy'] == 1
+    
+    assert request(server, writer, op='exit', plate='AAA-1111')['ok']
+    assert system.slot_status == [False, False, False]
+
+@pytest.mark.parametrize('line', ['not json', '[1, 2]', '{"plate": "AAA-1111"}', '{"op": "fly"}',
+                                  '{"op": "entry", "plate": 42}', '{"op": "entry", "class": ["ev"]}'])
+def test_invalid_requests(line):
+    server, system = make_server()
+    assert server.process(line, FakeWriter()) == {'ok': False, 'error': "invalid request"}
+    assert system.get_statistics()['available_slots'] == 2
+
+def test_unknown_priority_class_and_vehicle():
+    server, system = make_server()
+    writer = FakeWriter()
+    assert request(server, writer, op='entry', plate='AAA-1111', **{'class': 'vip'})['error'] == \
+        "unknown priority class"
+    assert request(server, writer, op='exit', plate='NOT-HERE')['error'] == "vehicle is not parked"
+    assert request(server, writer, op='priority_exit', plate='NOT-HERE')['error'] == "vehicle is not parked"
+
+def test_non_string_plate_does_not_leak_a_slot(tmp_path):
+    server, system = make_server(data_dir=str(tmp_path))
+    try:
+        response = request(server, FakeWriter(), id=3, op='entry', plate=12345)
+        assert response == {'id': 3, 'ok': False, 'error': "invalid request"}
+        assert system.get_statistics()['available_slots'] == 2
+    finally:
+        system.close()
+
+def test_priority_exit_raced_by_another_exit():
+    server, system = make_server()
+    writer = FakeWriter()
+    request(server, writer, op='entry', plate='AAA-1111')
+    
+    # Another connection exits the vehicle between pushing and popping the exit stack
+    process_exit_stack = system.process_exit_stack
+    def racing_process_exit_stack():
+        system.vehicle_exit('AAA-1111')
+        return process_exit_stack()
+    system.process_exit_stack = racing_process_exit_stack
+    
+    response = request(server, writer, op='priority_exit', plate='AAA-1111')
+    assert response == {'ok': False, 'plate': 'AAA-1111', 'error': "vehicle is not parked"}
+
+def test_failing_handler_keeps_the_connection():
+    server, system = make_server()
+    
+    def broken(request, writer):
+        raise RuntimeError("disk full")
+    server.handlers['stats'] = broken
+    
+    async def session():
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'{"id": 1, "op": "stats"}\n{"id": 2, "op": "entry", "plate": "AAA-1111"}\n')
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(2)]
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return responses
+    
+    failed, parked = asyncio.run(session())
+    assert failed == {'id': 1, 'ok': False, 'error': "request failed: disk full"}
+    assert parked == {'id': 2, 'ok': True, 'plate': 'AAA-1111', 'slot': 0, 'queued': False}
+
+def test_acknowledged_entries_and_exits_survive_a_crash(tmp_path):
+    server, system = make_server(total_slots=5, data_dir=str(tmp_path))
+    # Group commits far apart, so an acknowledgement sent before its fsync would be lost
+    system.event_log.sync_interval = 0.2
+    
+    async def session():
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'{"op": "entry", "plate": "AAA-1111"}\n{"op": "entry", "plate": "BBB-2222"}\n'
+                     b'{"op": "exit", "plate": "AAA-1111"}\n')
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(3)]
+        # Crash as soon as the last response arrives, losing records that weren't fsynced yet
+        with system.event_log.lock:
+            system.event_log.buffer.clear()
+        crash(system)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return responses
+    
+    responses = asyncio.run(session())
+    assert all(response['ok'] for response in responses)
+    
+    recovered = ParkingManagementSystem(total_slots=5, rng=random.Random(1), data_dir=str(tmp_path))
+    try:
+        assert list(recovered.vehicle_records) == ['BBB-2222']
+        statistics = recovered.get_statistics()
+        assert statistics['total_entries'] == 2 and statistics['total_exits'] == 1
+        assert statistics['revenue'] == responses[2]['fee']
+    finally:
+        recovered.close()
@@ -0,0 +1,131 @@
+import math
+import random
+from collections import deque
+
+import pytest
+
+from project import ParkingManagementSystem
+
+def bfs(graph, sources, size):
+    """Hops from the nearest source to every slot, computed from scratch"""
+    distances = [math.inf] * size
+    frontier = deque()
+    for node in sources:
+        if node < size:
+            distances[node] = 0
+            frontier.append(node)
+    while frontier:
+        node = frontier.popleft()
+        for neighbor in graph[node]:
+            if distances[neighbor] == math.inf:
+                distances[neighbor] = distances[node] + 1
+                frontier.append(neighbor)
+    return distances
+
+def check(system):
+    """Graph is symmetric and covers the lot, and every route's distances match a fresh search"""
+    graph = system.parking_graph
+    assert set(graph) == set(range(system.total_slots)) and len(system.slot_status) == system.total_slots
+    for node, neighbors in graph.items():
+        assert all(node in graph[neighbor] for neighbor in neighbors)
+    
+    allocator = system.slot_allocator
+    for route, nodes in allocator.routes.items():
+        assert list(allocator.distances[route]) == bfs(graph, nodes, system.total_slots), route
+
+def assert_nearest(system, slot, destination):
+    """slot is free and in service and no other such slot is nearer"""
+    allocator = system.slot_allocator
+    distances = bfs(system.parking_graph, allocator.routes[destination], system.total_slots)
+    free = [x for x in range(system.total_slots)
+            if not system.slot_status[x] and x not in allocator.closed and x != slot]
+    assert slot not in allocator.closed
+    assert all(distances[slot] <= distances[x] for x in free)
+
+def test_vehicles_get_the_slot_nearest_the_gate():
+    system = ParkingManagementSystem(total_slots=20, entry_nodes=[0], destinations={'exit': [19]})
+    check(system)
+    distances = bfs(system.parking_graph, [0], 20)
+    
+    slots = [system.vehicle_entry(f"NEAR-{n}") for n in range(6)]
+    assert [distances[slot] for slot in slots] == sorted(distances[slot] for slot in slots)
+    assert slots[0] == 0
+    
+    slot = system.vehicle_entry('EXIT-1', destination='exit')
+    assert slot == 19
+
+def test_freed_slot_is_handed_out_again():
+    system = ParkingManagementSystem(total_slots=20, entry_nodes=[0])
+    for n in range(10):
+        system.vehicle_entry(f"NEAR-{n}")
+    system.vehicle_exit('NEAR-0')
+    assert system.vehicle_entry('AGAIN') == 0
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_distances_follow_layout_changes(seed):
+    rng = random.Random(seed)
+    system = ParkingManagementSystem(total_slots=20, entry_nodes=[0], destinations={'exit': [150, 5]})
+    allocator = system.slot_allocator
+    parked = []
+    for _ in range(150):
+        roll = rng.random()
+        if roll < 0.15:
+            system.add_slots(rng.randint(1, 60))
+        elif roll < 0.25:
+            system.add_zone(rng.randint(1, 8), rng.randint(1, 12))
+        elif roll < 0.4:
+            count = min(rng.randint(1, 40), system.total_slots)
+            tail = system.slot_status[system.total_slots - count:]
+            assert system.remove_slots(count) == (not any(tail))
+        elif roll < 0.45 and system.total_slots:
+            slot = rng.randrange(system.total_slots)
+            (system.close_slot if rng.random() < 0.6 else system.open_slot)(slot)
+        else:
+            for _ in range(rng.randint(1, 20)):
+                if rng.random() < 0.6:
+                    destination = rng.choice([None, 'exit'])
+                    slot = allocator.allocate(destination)
+                    if slot != -1:
+                        assert_nearest(system, slot, destination)
+                        parked.append(slot)
+                elif parked:
+                    allocator.release(parked.pop(rng.randrange(len(parked))))
+        
+        parked = [slot for slot in parked if slot < system.total_slots and system.slot_status[slot]]
+        check(system)
+        in_service = sum(1 for x in range(system.total_slots)
+                         if not system.slot_status[x] and x not in allocator.closed)
+        assert allocator.free_count() == in_service
+
+def test_closed_slots_are_skipped_until_reopened():
+    system = ParkingManagementSystem(total_slots=20, entry_nodes=[0])
+    assert system.close_slot(0)
+    assert not system.close_slot(0)
+    slot = system.vehicle_entry('SKIP-1')
+    assert slot != 0
+    
+    assert system.open_slot(0)
+    assert system.vehicle_entry('SKIP-2') == 0
+
+def test_occupied_slots_block_removal():
+    system = ParkingManagementSystem(total_slots=30, entry_nodes=[29])
+    system.vehicle_entry('LAST-1')
+    assert not system.remove_slots(5)
+    assert system.total_slots == 30
+    check(system)
+
+def test_destinations_need_nearest_slot_assignment():
+    with pytest.raises(ValueError):
+        ParkingManagementSystem(total_slots=20, destinations={'exit': [19]})
+    
+    system = ParkingManagementSystem(total_slots=20)
+    with pytest.raises(ValueError):
+        system.vehicle_entry('DEST-1', destination='exit')
+    with pytest.raises(ValueError):
+        system.get_available_slot('exit')
+    assert not system.is_vehicle_present('DEST-1')
+    
+    system = ParkingManagementSystem(total_slots=20, entry_nodes=[0], destinations={'exit': [19]})
+    with pytest.raises(ValueError):
+        system.vehicle_entry('DEST-2', destination='lift')
+    assert system.vehicle_entry('DEST-3', destination='exit') == 19
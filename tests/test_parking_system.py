@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from project import ParkingManagementSystem, SlotAllocator
+
+def make_system(total_slots=3, **options):
+    now = [1000.0]
+    system = ParkingManagementSystem(total_slots=total_slots, rng=random.Random(1), clock=lambda: now[0],
+                                     **options)
+    return system, now
+
+def test_duplicate_entry_is_rejected():
+    system, now = make_system()
+    assert system.vehicle_entry('AAA-1111') == 0
+    assert system.vehicle_entry('AAA-1111') is None
+    assert system.get_statistics()['current_occupancy'] == 1
+    
+    now[0] += 60
+    assert system.vehicle_exit('AAA-1111')[0]
+    assert system.slot_status == [False, False, False]
+    assert system.get_statistics()['current_occupancy'] == 0
+    assert system.vehicle_entry('AAA-1111') == 0
+
+def test_duplicate_of_queued_or_stacked_vehicle_is_rejected():
+    system, _ = make_system(total_slots=1)
+    assert system.vehicle_entry('AAA-1111') == 0
+    assert system.vehicle_entry('BBB-2222') is None
+    assert 'BBB-2222' in system.entry_queue
+    
+    assert system.vehicle_entry('BBB-2222') is None
+    assert len(system.entry_queue) == 1
+    
+    assert system.add_to_exit_stack('AAA-1111')
+    assert system.vehicle_entry('AAA-1111') is None
+    assert system.get_statistics()['total_entries'] == 1
+    
+    assert system.process_exit_stack() == 'AAA-1111'
+    assert system.vehicle_records['BBB-2222']['slot'] == 0
+
+def test_duplicate_parked_concurrently_gives_its_slot_back():
+    system, _ = make_system()
+    assert system.vehicle_entry('AAA-1111') == 0
+    
+    # The second gate allocated a slot before the first one recorded the vehicle
+    slot = system.slot_allocator.allocate()
+    assert not system.park_vehicle('AAA-1111', slot)
+    assert system.slot_allocator.free_count() == 2
+    assert system.vehicle_records['AAA-1111']['slot'] == 0
+
+@pytest.mark.parametrize('lowest_first', [True, False])
+def test_slot_allocator_tracks_which_slots_are_listed(lowest_first):
+    rng = random.Random(4)
+    allocator = SlotAllocator(30, lowest_first)
+    taken = set()
+    for _ in range(3000):
+        roll = rng.random()
+        size = len(allocator.slot_status)
+        if roll < 0.35:
+            slot = allocator.allocate()
+            if slot != -1:
+                assert slot not in taken and slot not in allocator.closed
+                taken.add(slot)
+        elif roll < 0.65 and taken:
+            slot = rng.choice(sorted(taken))
+            allocator.release(slot)
+            taken.discard(slot)
+        elif roll < 0.8:
+            allocator.close_slot(rng.randrange(size))
+        elif roll < 0.95:
+            allocator.open_slot(rng.randrange(size))
+        elif roll < 0.975:
+            allocator.add_slots(rng.randint(1, 5))
+        elif allocator.remove_slots(rng.randint(1, 5)):
+            taken = {slot for slot in taken if slot < len(allocator.slot_status)}
+        
+        assert len(allocator.free_slots) == len(set(allocator.free_slots))
+        assert [slot for slot, listed in enumerate(allocator.listed) if listed] == sorted(allocator.free_slots)
+        free = {slot for slot in range(len(allocator.slot_status))
+                if slot not in taken and slot not in allocator.closed}
+        assert allocator.free_count() == len(free) and free <= set(allocator.free_slots)
@@ -0,0 +1,173 @@
+import os
+import random
+
+import pytest
+
+from project import ParkingManagementSystem
+from simulation import SimulationClock
+
+def open_system(data_dir, clock, total_slots=5):
+    return ParkingManagementSystem(total_slots=total_slots, clock=clock, rng=random.Random(7),
+                                   data_dir=str(data_dir))
+
+def crash(system):
+    """Stop the group commit thread without the snapshot a clean close() would take"""
+    system.event_log.stopping.set()
+    system.event_log.flusher.join()
+    system.event_log.file.close()
+
+def state(system):
+    records = {plate: (record.slot, record.entry_time, record.expected_stay, record.vehicle_type, record.color)
+               for plate, record in system.vehicle_records.items()}
+    return (records, system.entry_queue.entries(), list(system.exit_stack), system.get_statistics(),
+            len(system.history), system.total_slots, sorted(system.slot_allocator.closed),
+            list(system.slot_status))
+
+def drive(system, clock, count, seed):
+    """Entries, exits, cancellations and priority exits on a lot that fills up"""
+    rng = random.Random(seed)
+    for n in range(count):
+        clock.advance_to(clock.now + rng.uniform(1, 30))
+        roll = rng.random()
+        parked = list(system.vehicle_records)
+        if roll < 0.55:
+            system.vehicle_entry(f"WAL-{seed}-{n:04d}", rng.choice(['regular', 'ev', 'disabled']))
+        elif roll < 0.85 and parked:
+            system.vehicle_exit(rng.choice(parked))
+        elif roll < 0.92 and len(system.entry_queue):
+            system.cancel_queued_vehicle(next(iter(system.entry_queue)))
+        elif parked:
+            system.add_to_exit_stack(rng.choice(parked))
+            if rng.random() < 0.5:
+                system.process_exit_stack()
+
+@pytest.mark.parametrize('snapshot', [False, True])
+def test_recovery_after_crash_matches(tmp_path, snapshot):
+    clock = SimulationClock(1000.0)
+    system = open_system(tmp_path, clock)
+    drive(system, clock, 150, seed=1)
+    if snapshot:
+        system.save_snapshot()
+    drive(system, clock, 150, seed=2)
+    expected = state(system)
+    crash(system)
+    
+    recovered = open_system(tmp_path, clock)
+    recovered.history.loaded.wait()
+    try:
+        assert state(recovered) == expected
+        assert len(recovered.departures) == len(recovered.vehicle_records)
+        
+        # The recovered lot keeps working and logging
+        free = recovered.slot_allocator.free_count()
+        if free:
+            assert recovered.vehicle_entry('NEW-0001') is not None
+    finally:
+        recovered.close()
+
+def test_recovery_replays_layout_changes(tmp_path):
+    clock = SimulationClock(1000.0)
+    system = open_system(tmp_path, clock, total_slots=20)
+    for n in range(5):
+        system.vehicle_entry(f"LAY-{n}")
+    system.add_zone(4, 5)
+    system.add_slots(3)
+    assert system.remove_slots(2)
+    system.close_slot(7)
+    system.vehicle_entry('LAY-LATE')
+    expected = state(system)
+    crash(system)
+    
+    recovered = open_system(tmp_path, clock, total_slots=20)
+    try:
+        assert state(recovered) == expected
+        assert recovered.layout.zone_shapes() == system.layout.zone_shapes()
+    finally:
+        recovered.close()
+
+def test_torn_write_at_the_tail_is_dropped(tmp_path):
+    clock = SimulationClock(1000.0)
+    system = open_system(tmp_path, clock)
+    system.vehicle_entry('TORN-001')
+    expected = state(system)
+    system.vehicle_entry('TORN-002')
+    crash(system)
+    
+    # The last record was only partly written when the process died
+    segment = system.event_log.segment_path(system.event_log.segment)
+    with open(segment, 'r+b') as f:
+        f.truncate(os.path.getsize(segment) - 3)
+    
+    recovered = open_system(tmp_path, clock)
+    try:
+        assert state(recovered) == expected
+        assert recovered.vehicle_entry('TORN-002') == 1
+    finally:
+        recovered.close()
+
+def test_clean_close_recovers_from_the_snapshot(tmp_path):
+    clock = SimulationClock(1000.0)
+    system = open_system(tmp_path, clock)
+    drive(system, clock, 100, seed=3)
+    expected = state(system)
+    system.close()
+    
+    recovered = open_system(tmp_path, clock)
+    recovered.history.loaded.wait()
+    try:
+        assert state(recovered) == expected
+    finally:
+        recovered.close()
+
+def test_wait_synced_returns_once_the_record_is_on_disk(tmp_path):
+    clock = SimulationClock()
+    system = open_system(tmp_path, clock)
+    event_log = system.event_log
+    event_log.sync_interval = 0.05
+    system.vehicle_entry('WAL-SYNC')
+    sequence = event_log.appended
+    
+    assert event_log.wait_synced(sequence)
+    assert event_log.synced >= sequence and not event_log.buffer
+    expected = state(system)
+    crash(system)
+    
+    recovered = open_system(tmp_path, clock)
+    assert state(recovered) == expected
+    event_log = recovered.event_log
+    recovered.close()
+    
+    # Nothing will commit a record that was never appended once the log is closed
+    assert not event_log.wait_synced(event_log.appended + 1)
+
+@pytest.mark.parametrize('snapshot', [False, True])
+def test_spilled_history_survives_a_crash(tmp_path, snapshot):
+    clock = SimulationClock()
+    
+    def open_spilling():
+        return ParkingManagementSystem(total_slots=5, clock=clock, rng=random.Random(7), data_dir=str(tmp_path),
+                                       history_in_memory=10,
+                                       history_spill_path=str(tmp_path / 'history.tsv'))
+    
+    system = open_spilling()
+    drive(system, clock, 150, seed=5)
+    if snapshot:
+        system.save_snapshot()
+        drive(system, clock, 100, seed=6)
+    system.event_log.sync()
+    sessions = list(system.history)
+    assert system.history.spilled_count > 0
+    crash(system)
+    system.history.close()
+    
+    # Twice, as a second crash replays over the spill file the first recovery wrote
+    for _ in range(2):
+        recovered = open_spilling()
+        assert list(recovered.history) == sessions
+        assert len(recovered.history.sessions) <= 10
+        recovered.history.loaded.wait()
+        with open(tmp_path / 'history.tsv') as f:
+            assert sum(1 for _ in f) == recovered.history.spilled_count
+        recovered.event_log.sync()
+        crash(recovered)
+        recovered.history.close()
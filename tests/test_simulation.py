@@ -0,0 +1,24 @@
+from project import PRIORITY_CLASSES
+from simulation import HeadlessSimulation
+
+def test_queue_limit_applies_to_every_class():
+    simulation = HeadlessSimulation(total_slots=1, seed=1, queue_limit=2)
+    system = simulation.parking_system
+    system.vehicle_entry('FULL-0001')
+    
+    for name in PRIORITY_CLASSES:
+        for n in range(3):
+            system.vehicle_entry(f"{name.upper()}-{n}", name)
+    
+    statistics = system.get_queue_statistics()
+    assert all(statistics[name]['waiting'] == 2 and statistics[name]['rejected'] == 1 for name in PRIORITY_CLASSES)
+
+def test_turned_away_arrivals_are_not_counted_as_queued():
+    simulation = HeadlessSimulation(total_slots=2, entry_interval=1.0, seed=3, queue_limit=3,
+                                    stay_sampler=lambda rng: 1000.0)
+    report = simulation.run(50)
+    counts = report['counts']
+    
+    rejected = simulation.parking_system.get_queue_statistics()['regular']['rejected']
+    assert counts['queued'] == 3 and counts['rejected'] == rejected > 0
+    assert counts['arrivals'] == report['statistics']['total_entries'] + counts['queued'] + counts['rejected']